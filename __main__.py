@@ -1,130 +1,290 @@
 """An AWS Python Pulumi program"""
 
+import sys
 import pulumi
-from kms.kms import KmsModule
-from ssm_parameter.ssm import SsmParameter
-from secret_manager.secret_manager import SecretManagerSecret
-from vpc.vpc import VpcOnly
-from vpc_subnet.subnets import VpcSubnets
-from vpc_nat.natgw import NatGateway
-from vpc_endpoints.endpoint import VpcEndpoint
-from vpc_acl.acl import VpcAcl
-
-kms = KmsModule(name="myapp", enable_iam_permissions=True, enable_key_rotation=True)
-
-pulumi.export("kms_key_arn", kms.kms_key.arn)
-
-# Call ssm Param and add some parameter into ssm
-param = SsmParameter("db-password",
-    value="super-secret-password",
-    type="SecureString",
-    key_id= kms.kms_key.id,
-    tags={"App": "backend"},
-)
-pulumi.export("ssm_param_name", param.parameter.name)
-pulumi.export("ssm_param_version", param.parameter.version)
-
-secret = SecretManagerSecret("db-credentialsv2",
-    secret_value={"username": "admin", "password": "super-secret"},
-    description="Database credentials for app",
-    kms_key_id=kms.kms_key.arn,
-    tags={"App": "backend", "Env": "prod"},
-)
-
-pulumi.export("secret_arn", secret.secret.arn)
-
-
-
-vpc = VpcOnly("core-vpc",
-    cidr_block="10.0.0.0/16",
-    enable_dns_support=True,
-    enable_dns_hostnames=True,
-    tags={"Environment": "dev", "Owner": "team-network"}
-)
-
-pulumi.export("vpc_id", vpc.vpc.id)
-pulumi.export("vpc_cidr", vpc.vpc.cidr_block)
+from composition.composition import StackComposition
+from preflight.quotas import QuotaTable
 
 config = pulumi.Config()
 
+# AWS quotas of the program's region, as adjusted by the "quotas" stack config
+aws_region = pulumi.Config("aws").get("region")
+quotas = QuotaTable(config.get_object("quotas"))
+
 # Retrieve the subnetDefinitions from the config
 subnet_definitions = config.require_object("subnetDefinitions")
 
+# Components are only imported and built when selected by the "components"
+# stack config (all of them when unset), e.g. `pulumi config set --path components[0] vpc`
+stack = StackComposition()
+selected_components = config.get_object("components")
+
+# Inputs shared by the component builders and their preflight checks
+AZ_COUNT = 3
+NAT_MODE = "per_az"
+DB_PASSWORD = "super-secret-password"
+DB_CREDENTIALS = {"username": "admin", "password": "super-secret"}
+PUBLIC_ACL_RULES = {
+    "allow_all_egress": {
+        "number": 100,
+        "action": "allow",
+        "direction": "egress",
+        "ipv4_cidr": "0.0.0.0/0",
+        "protocol": "-1",
+        "from_port": 0,
+        "to_port": 0
+    },
+    "allow_all_ingress": {
+        "number": 100,
+        "action": "allow",
+        "direction": "ingress",
+        "ipv4_cidr": "0.0.0.0/0",
+        "protocol": "-1",
+        "from_port": 0,
+        "to_port": 0
+    }
+}
 
 
-subnet_module = VpcSubnets("app-network",
-    vpc_id=vpc.vpc.id,
-    cidr_block_public="10.0.1.0/24",
-    cidr_block_private="10.0.101.0/24",
-    azs=["us-east-2a", "us-east-2b", "us-east-2c"],
-    create_public_subnets=True,
-    enable_ipv6=False,
-    tags={"Environment": "dev"}
-)
+@stack.component("kms", "kms.kms")
+def build_kms(kms_module, built):
+    kms = kms_module.KmsModule(name="myapp", enable_iam_permissions=True, enable_key_rotation=True,
+        enabled_flow_log_delivery="flow_logs" in (selected_components or []),
+        multi_region=config.get_bool("kmsMultiRegion") or False,
+        replica_regions=config.get_object("kmsReplicaRegions") or [],
+        tags={"Environment": "dev"})
 
-pulumi.export("public_subnet_ids", subnet_module.public_subnet_ids)
-pulumi.export("private_subnet_ids", subnet_module.private_subnet_ids)
+    pulumi.export("kms_key_arn", kms.kms_key.arn)
+    pulumi.export("kms_key_arns_by_region", kms.key_arns_by_region)
+    return kms
 
-natgw = NatGateway("my-nat",
-    public_subnet_ids=subnet_module.public_subnet_ids,
-    private_route_table_ids=subnet_module.private_route_table_ids,
-    tags={"Environment": "dev"}
-)
 
-acl = VpcAcl(
-    name=f"{pulumi.get_stack()}-public-acl",
-    vpc=vpc.vpc,
-    subnets={
-        f"subnet-{i}": {"id": subnet} for i, subnet in enumerate(subnet_module.public_subnet_ids)
-    },
-    rules={
-        "allow_all_egress": {
-            "number": 100,
-            "action": "allow",
-            "direction": "egress",
-            "ipv4_cidr": "0.0.0.0/0",
-            "protocol": "-1",
-            "from_port": 0,
-            "to_port": 0
+@stack.component("ssm", "ssm_parameter.ssm", requires=["kms"])
+def build_ssm(ssm_module, built):
+    # Call ssm Param and add some parameter into ssm
+    param = ssm_module.SsmParameter("db-password",
+        value=DB_PASSWORD,
+        type="SecureString",
+        key_id=built["kms"].key_ids_by_region,  # the key in this program's region
+        tags={"App": "backend"},
+    )
+    pulumi.export("ssm_param_name", param.parameter.name)
+    pulumi.export("ssm_param_version", param.parameter.version)
+    return param
+
+
+@stack.preflight("ssm")
+def preflight_ssm(checks):
+    checks.ssm_parameter("db-password", value=DB_PASSWORD)
+
+
+@stack.component("secrets", "secret_manager.secret_manager", requires=["kms"])
+def build_secrets(secret_module, built):
+    secret = secret_module.SecretManagerSecret("db-credentialsv2",
+        secret_value=DB_CREDENTIALS,
+        description="Database credentials for app",
+        kms_key_id=built["kms"].key_arns_by_region,
+        tags={"App": "backend", "Env": "prod"},
+    )
+
+    pulumi.export("secret_arn", secret.secret.arn)
+    return secret
+
+
+@stack.preflight("secrets")
+def preflight_secrets(checks):
+    checks.secret("db-credentialsv2", DB_CREDENTIALS)
+
+
+@stack.component("vpc", "vpc.vpc")
+def build_vpc(vpc_module, built):
+    vpc = vpc_module.VpcOnly("core-vpc",
+        cidr_block="10.0.0.0/16",
+        enable_dns_support=True,
+        enable_dns_hostnames=True,
+        tags={"Environment": "dev", "Owner": "team-network"}
+    )
+
+    pulumi.export("vpc_id", vpc.vpc.id)
+    pulumi.export("vpc_cidr", vpc.vpc.cidr_block)
+    return vpc
+
+
+@stack.preflight("vpc")
+def preflight_vpc(checks):
+    checks.vpc("core-vpc")
+
+
+@stack.component("subnets", "vpc_subnet.subnets", requires=["vpc"])
+def build_subnets(subnets_module, built):
+    subnet_module = subnets_module.VpcSubnets("app-network",
+        vpc_id=built["vpc"].vpc.id,
+        vpc_cidr_block="10.0.0.0/16",
+        cidr_block_public="10.0.1.0/24",
+        cidr_block_private="10.0.101.0/24",
+        az_count=AZ_COUNT,  # AZs of the provider's region, looked up once
+        create_public_subnets=True,
+        enable_ipv6=False,
+        tags={"Environment": "dev"}
+    )
+
+    pulumi.export("public_subnet_ids", subnet_module.public_subnet_ids)
+    pulumi.export("private_subnet_ids", subnet_module.private_subnet_ids)
+    return subnet_module
+
+
+@stack.preflight("subnets")
+def preflight_subnets(checks):
+    checks.subnets("app-network", vpc="core-vpc", azs=AZ_COUNT)
+
+
+@stack.component("nat", "vpc_nat.natgw", requires=["subnets"])
+def build_nat(natgw_module, built):
+    # Keyed by AZ so every private route table uses the NAT gateway in its own AZ
+    return natgw_module.NatGateway("my-nat",
+        public_subnet_ids_by_az=built["subnets"].public_subnet_ids_by_az,
+        private_route_table_ids_by_az=built["subnets"].private_route_table_ids_by_az,
+        mode=NAT_MODE,
+        tags={"Environment": "dev"}
+    )
+
+
+@stack.preflight("nat")
+def preflight_nat(checks):
+    checks.nat_gateways("my-nat", public_azs=AZ_COUNT, mode=NAT_MODE)
+
+
+@stack.component("acl", "vpc_acl.acl", requires=["vpc", "subnets"])
+def build_acl(acl_module, built):
+    return acl_module.VpcAcl(
+        name=f"{pulumi.get_stack()}-public-acl",
+        vpc=built["vpc"].vpc,
+        subnets={
+            f"subnet-{i}": {"id": subnet} for i, subnet in enumerate(built["subnets"].public_subnet_ids)
         },
-        "allow_all_ingress": {
-            "number": 100,
-            "action": "allow",
-            "direction": "ingress",
-            "ipv4_cidr": "0.0.0.0/0",
-            "protocol": "-1",
-            "from_port": 0,
-            "to_port": 0
-        }
-    },
-    tags={"Environment": "dev"}
-)
-
-vpc_endpoint = VpcEndpoint(
-    name="s3-gateway",
-    vpc=vpc.vpc,
-    endpoint_service="com.amazonaws.__REGION__.s3",
-    endpoint_type="Gateway",
-    gateway_route_tables=subnet_module.private_route_table_ids,
-    tags={"Environment": "dev"}
-)
-
-interface_endpoint = VpcEndpoint(
-    name="ssm-endpoint",
-    vpc=vpc.vpc,
-    endpoint_service="com.amazonaws.__REGION__.ssm",
-    endpoint_type="Interface",
-    allowed_subnets=subnet_module.private_subnet_ids,
-    tags={"Environment": "dev"}
-)
-#
-# # Create an AWS resource (S3 Bucket)
-# bucket = s3.BucketV2('my-bucket-x234591')
-#
-# with open("text.txt", "r") as f:
-#     content = f.read()
-#
-# obj =  s3.BucketObject('my-text-file', bucket=bucket.id, content=content)
-#
-# # Export the name of the bucket
-# pulumi.export('bucket_name', bucket.id)
+        rules=PUBLIC_ACL_RULES,
+        max_rules_per_direction=quotas.limit("rules_per_network_acl", aws_region),
+        tags={"Environment": "dev"}
+    )
+
+
+@stack.preflight("acl")
+def preflight_acl(checks):
+    checks.network_acl(f"{pulumi.get_stack()}-public-acl", vpc="core-vpc", rules=PUBLIC_ACL_RULES)
+
+
+@stack.component("endpoints", "vpc_endpoints.nat_bypass", requires=["vpc", "subnets", "nat"])
+def build_endpoints(endpoint_module, built):
+    # S3/DynamoDB gateway endpoints on every route table that egresses through NAT.
+    # The S3 one keeps the name (and, via the alias, the resources) of the former s3-gateway endpoint.
+    nat_bypass = endpoint_module.NatBypassEndpoints("nat-bypass",
+        vpc=built["vpc"].vpc,
+        nat_route_table_ids=built["nat"].routed_route_table_ids,
+        endpoint_names={"s3": "s3-gateway"},
+        endpoint_opts={"s3": pulumi.ResourceOptions(aliases=[pulumi.Alias(parent=pulumi.ROOT_STACK_RESOURCE)])},
+        tags={"Environment": "dev"}
+    )
+
+    interface_endpoint = endpoint_module.VpcEndpoint(
+        name="ssm-endpoint",
+        vpc=built["vpc"].vpc,
+        endpoint_service="com.amazonaws.__REGION__.ssm",
+        endpoint_type="Interface",
+        allowed_subnets=built["subnets"].private_subnet_ids,
+        tags={"Environment": "dev"}
+    )
+    return [nat_bypass, interface_endpoint]
+
+
+@stack.preflight("endpoints")
+def preflight_endpoints(checks):
+    checks.gateway_endpoints("nat-bypass", vpc="core-vpc")
+    checks.interface_endpoints("ssm-endpoint", vpc="core-vpc", services=["ssm"], subnets=AZ_COUNT)
+
+
+# Parquet flow logs for core-vpc, plus per-subnet overrides keyed "{tier}-{az}"; opt-in
+@stack.component("flow_logs", "vpc_flow_logs.flow_logs", requires=["kms", "vpc", "subnets"], default=False)
+def build_flow_logs(flow_logs_module, built):
+    flow_logs = flow_logs_module.VpcFlowLogs("core-vpc-flow-logs",
+        vpc_id=built["vpc"].vpc.id,
+        subnet_ids=built["subnets"].subnet_ids_by_key,
+        subnet_overrides=config.get_object("flowLogSubnetOverrides"),
+        kms_key_arn=built["kms"].kms_key.arn,
+        tags={"Environment": "dev"}
+    )
+
+    pulumi.export("flow_logs_bucket_arn", flow_logs.destination_bucket_arn)
+    return flow_logs
+
+
+# The VPC topology in every region of the "regions" config, each through its own provider; opt-in
+@stack.component("regions", "regions.fanout", default=False)
+def build_regions(fanout_module, built):
+    networks = fanout_module.build_regional_networks("edge",
+        regions=config.require_object("regions"),
+        supernet=config.get("regionSupernet") or "10.0.0.0/8",
+        tags={"Environment": "dev"}
+    )
+
+    pulumi.export("regional_vpc_ids", {region: network.vpc.vpc.id for region, network in networks.items()})
+    return networks
+
+
+@stack.preflight("regions")
+def preflight_regions(checks):
+    checks.regional_networks("edge", regions=config.require_object("regions"))
+
+
+# Declarative VPCs from subnetDefinitions; opt-in because it builds its own VPCs
+@stack.component("vpc_factory", "vpc_factory.vpc_factory", default=False)
+def build_vpc_factory(factory_module, built):
+    environments = factory_module.build_vpcs(subnet_definitions)
+
+    pulumi.export("factory_vpc_ids", {name: env.vpc.vpc.id for name, env in environments.items()})
+    return environments
+
+
+@stack.preflight("vpc_factory")
+def preflight_vpc_factory(checks):
+    from vpc_factory.planner import plan_vpcs
+    for plan in plan_vpcs(subnet_definitions):
+        checks.vpc_plan(plan)
+
+
+# Quotas are checked against what the selected components will create before anything is registered
+if config.get_bool("preflight") is not False:
+    from preflight.preflight import Preflight
+    checks = Preflight(quotas, region=aws_region, azs=config.get_object("preflightAzs"))
+    preflight_report = stack.run_preflight(checks, selected_components).check()
+    pulumi.log.info(preflight_report.summary())
+    preflight_report.raise_for_violations()
+
+# Registration tracing is only imported and hooked in when enabled
+trace_registrations = config.get_bool("traceRegistrations")
+if trace_registrations:
+    from tracing.tracer import tracer
+    tracer.install()
+
+# Default tags and the required-tag check apply to every taggable resource through a stack transformation
+default_tags = config.get_object("defaultTags")
+required_tags = config.get_object("requiredTags")
+if default_tags or required_tags:
+    from tagging.tagging import tag_engine
+    tag_engine.configure(default_tags, required_tags or [])
+    tag_engine.install()
+
+stack.build(selected_components)
+
+if default_tags or required_tags:
+    if tag_engine.missing:
+        pulumi.log.warn(tag_engine.summary())
+    else:
+        pulumi.log.info(tag_engine.summary())
+
+if trace_registrations:
+    tracer.write(config.get("traceReportPath") or "trace-report", folded=True)
+    pulumi.log.info(tracer.summary())
+
+# Only report invoke cache usage when a selected component actually loaded it
+if "invoke_cache.invoke_cache" in sys.modules:
+    pulumi.log.debug(f"Provider invoke cache: {sys.modules['invoke_cache.invoke_cache'].invoke_cache.stats()}")
@@ -0,0 +1,307 @@
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import pulumi
+import pulumi_aws as aws
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mocks.mocks import AwsMocks, set_aws_mocks
+from invoke_cache.invoke_cache import invoke_cache
+from tagging.tagging import tag_engine
+from kms.kms import KmsModule
+from ssm_parameter.ssm import SsmParameter
+from secret_manager.secret_manager import SecretManagerSecret
+from vpc.vpc import VpcOnly
+from vpc_subnet.subnets import VpcSubnets
+from vpc_nat.natgw import NatGateway
+from vpc_endpoints.endpoint import VpcEndpoint, VpcEndpointSet
+from vpc_acl.acl import VpcAcl
+from vpc_flow_logs.flow_logs import VpcFlowLogs
+from regions import fanout
+from regions.providers import clear_providers, regional_provider
+
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+# Resource, component and invoke counts are deterministic and must never grow.
+# Wall time and memory depend on the machine that recorded the baseline, so
+# they are reported for information and only fail with --gate-timings, past a
+# relative tolerance and an absolute floor.
+COUNT_METRICS = ("resources", "components", "invokes")
+TIMING_METRICS = ("wall_seconds", "peak_bytes")
+DEFAULT_TOLERANCE = 0.25
+MIN_WALL_SECONDS_DELTA = 0.05
+MIN_PEAK_BYTES_DELTA = 512 * 1024
+
+INTERFACE_SERVICES = ["ssm", "ssmmessages", "ec2messages", "kms", "logs", "sts", "ecr.api", "ecr.dkr",
+                      "secretsmanager", "sqs", "sns", "monitoring", "events", "elasticloadbalancing",
+                      "autoscaling", "ecs", "ecs-agent", "ecs-telemetry", "lambda", "states"]
+
+
+def _azs(count: int) -> List[str]:
+    return [f"us-east-2-az{i}" for i in range(count)]
+
+
+def _vpc(name: str) -> aws.ec2.Vpc:
+    return aws.ec2.Vpc(f"{name}-vpc", cidr_block="10.0.0.0/16")
+
+
+def bench_vpc(count: int):
+    for i in range(count):
+        VpcOnly(f"vpc-{i}", cidr_block=f"10.{i % 256}.0.0/16", tags={"Environment": "bench"})
+
+
+def bench_subnets(az_count: int):
+    VpcSubnets("subnets",
+        vpc_id="vpc-bench",
+        vpc_cidr_block="10.0.0.0/16",
+        subnet_prefix_lengths={"public": 24, "private": 20, "isolated": 26},
+        azs=_azs(az_count),
+        tags={"Environment": "bench"}
+    )
+
+
+def bench_subnets_ipv6(az_count: int):
+    VpcSubnets("subnets",
+        vpc_id="vpc-bench",
+        vpc_cidr_block="10.0.0.0/16",
+        subnet_prefix_lengths={"public": 24, "private": 20, "isolated": 26},
+        azs=_azs(az_count),
+        enable_ipv6=True,
+        tags={"Environment": "bench"}
+    )
+
+
+def bench_subnets_shared_rt(az_count: int):
+    VpcSubnets("subnets",
+        vpc_id="vpc-bench",
+        vpc_cidr_block="10.0.0.0/16",
+        subnet_prefix_lengths={"public": 24, "private": 20, "isolated": 26},
+        azs=_azs(az_count),
+        route_table_mode="shared",
+        private_main_route_table=True,
+        tags={"Environment": "bench"}
+    )
+
+
+def bench_nat(az_count: int):
+    NatGateway("nat",
+        public_subnet_ids=[f"subnet-public-{i}" for i in range(az_count)],
+        private_route_table_ids=[f"rtb-private-{i}" for i in range(az_count)],
+        tags={"Environment": "bench"}
+    )
+
+
+def _acl_rules(count: int) -> Dict[str, Dict]:
+    return {
+        f"rule-{i}": {
+            "action": "allow",
+            "direction": "ingress" if i < count // 2 else "egress",
+            "ipv4_cidr": f"10.{i // 256}.{i % 256}.0/24",
+            "protocol": "tcp",
+            "from_port": 443,
+            "to_port": 443,
+        }
+        for i in range(count)
+    }
+
+
+def bench_acl(rule_count: int):
+    VpcAcl("acl", vpc=_vpc("acl"), subnets={}, rules=_acl_rules(rule_count))
+
+
+def bench_acl_inline(rule_count: int):
+    VpcAcl("acl", vpc=_vpc("acl"), subnets={}, rules=_acl_rules(rule_count), inline_rules=True)
+
+
+def bench_endpoints(count: int):
+    vpc = _vpc("endpoints")
+    for i in range(count):
+        service = INTERFACE_SERVICES[i % len(INTERFACE_SERVICES)]
+        VpcEndpoint(f"endpoint-{i}",
+            vpc=vpc,
+            endpoint_service=f"com.amazonaws.__REGION__.{service}",
+            endpoint_type="Interface",
+            allowed_subnets=["subnet-a", "subnet-b"],
+        )
+
+
+def bench_endpoint_set(count: int):
+    services = [INTERFACE_SERVICES[i % len(INTERFACE_SERVICES)] + ("" if i < len(INTERFACE_SERVICES) else f"-{i}")
+                for i in range(count)]
+    VpcEndpointSet("endpoints", vpc=_vpc("endpoints"), services=services, allowed_subnets=["subnet-a", "subnet-b"])
+
+
+def bench_flow_logs(subnet_count: int):
+    subnet_ids = {f"private-{i}": f"subnet-private-{i}" for i in range(subnet_count)}
+    VpcFlowLogs("flow-logs",
+        vpc_id="vpc-bench",
+        subnet_ids=subnet_ids,
+        subnet_overrides={key: {"traffic_type": "REJECT"} for key in subnet_ids},
+        kms_key_arn="arn:aws:kms:us-east-2:123456789012:key/bench",
+        tags={"Environment": "bench"}
+    )
+
+
+def bench_regions(count: int):
+    regions = ["us-east-1", "us-east-2", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-2"][:count]
+    clear_providers()
+    fanout.build_regional_networks("bench", regions=regions, tags={"Environment": "bench"})
+
+
+def bench_kms(count: int):
+    for i in range(count):
+        KmsModule(name=f"key-{i}", enable_iam_permissions=True, enabled_cloudwatch_log_delivery=True)
+
+
+def bench_kms_replicas(count: int):
+    regions = ["us-east-1", "us-west-2", "eu-west-1", "eu-central-1", "ap-southeast-2"][:count]
+    clear_providers()
+    kms = KmsModule(name="key", enable_iam_permissions=True, enabled_service_identifiers=["ssm"],
+        multi_region=True, replica_regions=regions)
+    for region in regions:
+        SsmParameter(f"param-{region}", value="value", type="SecureString", key_id=kms.key_ids_by_region,
+            opts=pulumi.ResourceOptions(provider=regional_provider(region)))
+
+
+def bench_ssm(count: int):
+    for i in range(count):
+        SsmParameter(f"bench/param-{i}", value=f"value-{i}", tags={"Environment": "bench"})
+
+
+def bench_secrets(count: int):
+    for i in range(count):
+        SecretManagerSecret(f"bench-secret-{i}",
+            secret_value={"username": f"user-{i}", "password": "x" * 32},
+            tags={"Environment": "bench"}
+        )
+
+
+CASES: Dict[str, Dict] = {
+    "vpc": {"build": bench_vpc, "param": "vpcs", "scales": [1, 10, 50]},
+    "subnets": {"build": bench_subnets, "param": "azs", "scales": [3, 6, 12]},
+    "subnets_ipv6": {"build": bench_subnets_ipv6, "param": "azs", "scales": [3, 6, 12]},
+    "subnets_shared_rt": {"build": bench_subnets_shared_rt, "param": "azs", "scales": [3, 6, 12]},
+    "nat": {"build": bench_nat, "param": "azs", "scales": [1, 3, 6]},
+    "acl": {"build": bench_acl, "param": "rules", "scales": [10, 100, 500]},
+    "acl_inline": {"build": bench_acl_inline, "param": "rules", "scales": [10, 100, 500]},
+    "endpoints": {"build": bench_endpoints, "param": "endpoints", "scales": [1, 10, 40]},
+    "endpoint_set": {"build": bench_endpoint_set, "param": "endpoints", "scales": [1, 10, 40]},
+    "flow_logs": {"build": bench_flow_logs, "param": "subnets", "scales": [0, 6, 24]},
+    "regions": {"build": bench_regions, "param": "regions", "scales": [1, 3, 6]},
+    "kms": {"build": bench_kms, "param": "keys", "scales": [1, 5, 20]},
+    "kms_replicas": {"build": bench_kms_replicas, "param": "replicas", "scales": [0, 1, 5]},
+    "ssm": {"build": bench_ssm, "param": "parameters", "scales": [10, 100, 1000]},
+    "secrets": {"build": bench_secrets, "param": "secrets", "scales": [10, 100]},
+}
+
+
+def run_case(build: Callable[[int], None], scale: int) -> Dict[str, float]:
+    mocks = set_aws_mocks(AwsMocks())
+    invoke_cache.clear()
+    tag_engine.clear()
+    # Garbage left by the previous case would otherwise be collected (or not) inside this one
+    gc.collect()
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    pulumi.runtime.test(lambda: build(scale))()
+    wall_seconds = time.perf_counter() - started
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "wall_seconds": round(wall_seconds, 6),
+        "peak_bytes": peak_bytes,
+        "resources": mocks.resource_count,
+        "components": mocks.component_count,
+        "invokes": mocks.invoke_count,
+    }
+
+
+def run_all(case_names: Optional[List[str]] = None, repeat: int = 1, warmup: int = 1) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for case_name, case in CASES.items():
+        if case_names and case_name not in case_names:
+            continue
+        for scale in case["scales"]:
+            # Warm-up runs pay for first imports and SDK caches and are discarded
+            for _ in range(warmup):
+                run_case(case["build"], scale)
+            runs = [run_case(case["build"], scale) for _ in range(repeat)]
+            # Keep the fastest run; counts are identical across repeats
+            results[f"{case_name}[{case['param']}={scale}]"] = min(runs, key=lambda r: r["wall_seconds"])
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float = DEFAULT_TOLERANCE,
+            gate_timings: bool = False) -> Tuple[List[str], List[str]]:
+    # Returns (regressions, notes); slower timings are notes unless gate_timings is set
+    regressions, notes = [], []
+    for case, current in results.items():
+        previous = baseline.get(case)
+        if previous is None:
+            continue
+
+        for metric in COUNT_METRICS:
+            if current[metric] > previous.get(metric, current[metric]):
+                regressions.append(f"{case}: {metric} grew from {previous[metric]} to {current[metric]}")
+
+        for metric, floor in zip(TIMING_METRICS, (MIN_WALL_SECONDS_DELTA, MIN_PEAK_BYTES_DELTA)):
+            if metric not in previous:
+                continue
+            limit = max(previous[metric] * (1 + tolerance), previous[metric] + floor)
+            if current[metric] > limit:
+                message = f"{case}: {metric} {current[metric]} exceeds baseline {previous[metric]} (limit {round(limit, 6)})"
+                (regressions if gate_timings else notes).append(message)
+    return regressions, notes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline build benchmarks for the Pulumi components (runs under mocks)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file to compare against or update")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--output", help="also write the raw results to this JSON file")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="only run the given case(s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded runs per case before the measured ones")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed relative slowdown")
+    parser.add_argument("--gate-timings", action="store_true",
+                        help="also fail on wall time and memory, e.g. on the machine that recorded the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.case, args.repeat, args.warmup)
+    for case, metrics in results.items():
+        print(f"{case:32} {metrics['wall_seconds']:9.4f}s {metrics['peak_bytes'] / 1024:10.1f} KiB "
+              f"{metrics['resources']:6} resources {metrics['invokes']:4} invokes")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    regressions, notes = compare(results, baseline, args.tolerance, args.gate_timings)
+    for note in notes:
+        print(f"slower (informational) {note}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import importlib
+import time
+import pulumi
+from dataclasses import dataclass
+from types import ModuleType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+
+@dataclass
+class ComponentSpec:
+    name: str
+    module: str
+    build: Callable[[ModuleType, Dict[str, Any]], Any]
+    requires: Sequence[str] = ()
+    default: bool = True  # built when the stack config selects nothing
+    # Adds the component's expected resources to a Preflight, without importing its module
+    preflight: Optional[Callable[[Any], None]] = None
+
+
+class StackComposition:
+    # Components are declared by name with the module that implements them;
+    # only the selected ones (plus what they require) are imported and built.
+    def __init__(self):
+        self.components: Dict[str, ComponentSpec] = {}
+        self.import_timings: Dict[str, float] = {}
+        self.build_timings: Dict[str, float] = {}
+        self.built: Dict[str, Any] = {}
+
+    def component(self, name: str, module: str, requires: Sequence[str] = (), default: bool = True):
+        def register(build: Callable[[ModuleType, Dict[str, Any]], Any]):
+            if name in self.components:
+                raise ValueError(f"Component '{name}' is already declared")
+            self.components[name] = ComponentSpec(name, module, build, tuple(requires), default)
+            return build
+        return register
+
+    def preflight(self, name: str):
+        def register(check: Callable[[Any], None]):
+            if name not in self.components:
+                raise ValueError(f"Component '{name}' must be declared before its preflight check")
+            self.components[name].preflight = check
+            return check
+        return register
+
+    def run_preflight(self, checks: Any, selected: Optional[Iterable[str]] = None) -> Any:
+        # Runs the preflight checks of the components build() would build, in the same order
+        for name in self.resolve(selected):
+            check = self.components[name].preflight
+            if check is not None:
+                check(checks)
+        return checks
+
+    def resolve(self, selected: Optional[Iterable[str]] = None) -> List[str]:
+        if selected is None:
+            selected = [name for name, spec in self.components.items() if spec.default]
+        wanted = set(selected)
+        unknown = wanted - set(self.components)
+        if unknown:
+            raise ValueError(f"Unknown components {sorted(unknown)}; declared: {sorted(self.components)}")
+
+        pending = list(wanted)
+        while pending:
+            spec = self.components[pending.pop()]
+            for dependency in spec.requires:
+                if dependency not in self.components:
+                    raise ValueError(f"Component '{spec.name}' requires undeclared component '{dependency}'")
+                if dependency not in wanted:
+                    wanted.add(dependency)
+                    pending.append(dependency)
+
+        # Declaration order is the build order, so dependencies must be declared first
+        order = [name for name in self.components if name in wanted]
+        for position, name in enumerate(order):
+            late = [d for d in self.components[name].requires if order.index(d) > position]
+            if late:
+                raise ValueError(f"Component '{name}' is declared before its dependencies {late}")
+        return order
+
+    def build(self, selected: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        for name in self.resolve(selected):
+            spec = self.components[name]
+            module = self._import(spec.module)
+
+            started = time.perf_counter()
+            self.built[name] = spec.build(module, self.built)
+            self.build_timings[name] = time.perf_counter() - started
+
+        self.report()
+        return self.built
+
+    def report(self):
+        # The first module to import a shared dependency (pulumi_aws) carries its cost
+        for module, seconds in self.import_timings.items():
+            pulumi.log.info(f"import {module}: {seconds * 1000:.1f} ms")
+        for name, seconds in self.build_timings.items():
+            pulumi.log.debug(f"build {name}: {seconds * 1000:.1f} ms")
+
+    def _import(self, module_name: str) -> ModuleType:
+        if module_name in self.import_timings:
+            return importlib.import_module(module_name)
+
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        self.import_timings[module_name] = time.perf_counter() - started
+        return module
@@ -0,0 +1,79 @@
+import sys
+
+import pytest
+
+from composition.composition import StackComposition
+
+
+def composition(built):
+    stack = StackComposition()
+
+    @stack.component("network", "json")
+    def build_network(module, components):
+        built.append("network")
+        return module.dumps({"vpc": 1})
+
+    @stack.component("endpoints", "json", requires=["network"])
+    def build_endpoints(module, components):
+        built.append("endpoints")
+        return f"endpoints in {components['network']}"
+
+    @stack.component("logs", "composition.test_composition_optional", requires=["network"], default=False)
+    def build_logs(module, components):
+        built.append("logs")
+        return module
+
+    return stack
+
+
+def test_defaults_are_built_in_declaration_order():
+    built = []
+    stack = composition(built)
+
+    assert stack.build() == {"network": '{"vpc": 1}', "endpoints": 'endpoints in {"vpc": 1}'}
+    assert built == ["network", "endpoints"]
+    assert list(stack.import_timings) == ["json"]
+
+
+def test_selection_adds_requirements_and_skips_other_modules():
+    stack = composition([])
+
+    assert stack.resolve(["endpoints"]) == ["network", "endpoints"]
+    assert stack.resolve([]) == []
+    stack.build(["network"])
+    assert "composition.test_composition_optional" not in sys.modules
+
+
+def test_opt_in_components_import_their_module_when_selected():
+    stack = composition([])
+    with pytest.raises(ModuleNotFoundError, match="test_composition_optional"):
+        stack.build(["logs"])
+
+
+def test_unknown_selections_raise():
+    with pytest.raises(ValueError, match=r"Unknown components \['dns'\]"):
+        composition([]).resolve(["dns", "network"])
+
+
+def test_declaration_errors():
+    stack = StackComposition()
+    stack.component("a", "json", requires=["b"])(lambda module, built: None)
+    with pytest.raises(ValueError, match="requires undeclared component 'b'"):
+        stack.resolve(["a"])
+
+    stack.component("b", "json")(lambda module, built: None)
+    with pytest.raises(ValueError, match=r"declared before its dependencies \['b'\]"):
+        stack.resolve(["a"])
+    with pytest.raises(ValueError, match="already declared"):
+        stack.component("a", "json")(lambda module, built: None)
+    with pytest.raises(ValueError, match="must be declared before its preflight"):
+        stack.preflight("c")(lambda checks: None)
+
+
+def test_preflight_runs_for_the_components_that_would_be_built():
+    stack = composition([])
+    stack.preflight("network")(lambda checks: checks.append("network"))
+    stack.preflight("logs")(lambda checks: checks.append("logs"))
+
+    assert stack.run_preflight([]) == ["network"]
+    assert stack.run_preflight([], ["logs"]) == ["network", "logs"]
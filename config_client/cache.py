@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class TtlCache:
+    # Thread-safe LRU cache whose entries are fresh for `ttl` seconds and may
+    # still be served for another `stale_ttl` seconds while they are refreshed.
+    def __init__(self, ttl: float = 300.0, stale_ttl: float = 600.0, max_entries: int = 1024,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, MISS
+
+            value, stored_at = entry
+            age = self._clock() - stored_at
+            if age > self.ttl + self.stale_ttl:
+                del self._entries[key]
+                return None, MISS
+
+            self._entries.move_to_end(key)
+            return value, FRESH if age <= self.ttl else STALE
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put_many(self, values: Dict[Hashable, Any]):
+        for key, value in values.items():
+            self.put(key, value)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
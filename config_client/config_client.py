@@ -0,0 +1,362 @@
+import base64
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from config_client.cache import FRESH, STALE, TtlCache
+from kms.envelope import open_envelope
+from secret_manager.bundle import decode_shard, shards_for_keys
+
+# API limits per call
+GET_PARAMETERS_BATCH = 10
+GET_PARAMETERS_BY_PATH_PAGE = 10
+BATCH_GET_SECRETS_BATCH = 20
+
+
+def parameter_name(name: str) -> str:
+    # SsmParameter stores "/{name}" and SsmParameterTree full paths; both are accepted
+    return name if name.startswith("/") or name.startswith("arn:") else f"/{name}"
+
+
+def _batches(items: List[str], size: int) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _parameter_value(parameter: Dict[str, Any]) -> Any:
+    if parameter.get("Type") == "StringList":
+        return parameter["Value"].split(",")
+    return parameter["Value"]
+
+
+class EnvelopeDecryptor:
+    # Opens values sealed with an EnvelopeKey. Unwrapped data keys are kept in a
+    # small TTL/LRU cache, so KMS sees one Decrypt per data key and TTL instead
+    # of one per value read.
+    def __init__(self,
+                 kms_client=None,
+                 region_name: Optional[str] = None,
+                 ttl: float = 300.0,
+                 max_keys: int = 64,
+                 cache: Optional[TtlCache] = None):
+        self._kms = kms_client
+        self._region_name = region_name
+        self.cache = cache if cache is not None else TtlCache(ttl=ttl, stale_ttl=0.0, max_entries=max_keys)
+        self._lock = threading.Lock()
+        self._metrics = {"decrypts": 0, "key_hits": 0, "kms_calls": 0}
+
+    @property
+    def kms(self):
+        if self._kms is None:
+            self._kms = _client("kms", self._region_name, "EnvelopeDecryptor")
+        return self._kms
+
+    def decrypt(self, envelope: str, context: Optional[str] = None) -> bytes:
+        # context, when given, must match what the value was sealed for (e.g. the parameter path)
+        self._count("decrypts")
+        return open_envelope(envelope, self._unwrap, context)
+
+    def decrypt_text(self, envelope: str, context: Optional[str] = None) -> str:
+        return self.decrypt(envelope, context).decode("utf-8")
+
+    def _unwrap(self, wrapped_key: bytes, kms_context: Dict[str, str]) -> bytes:
+        key = ("data-key", hashlib.sha256(wrapped_key).hexdigest())
+        data_key, state = self.cache.get(key)
+        if state == FRESH:
+            self._count("key_hits")
+            return data_key
+
+        self._count("kms_calls")
+        response = self.kms.decrypt(CiphertextBlob=wrapped_key, EncryptionContext=kms_context)
+        # EnvelopeKey wraps the base64 text of the data key
+        data_key = base64.b64decode(response["Plaintext"])
+        self.cache.put(key, data_key)
+        return data_key
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._metrics, "cached_keys": len(self.cache), "evictions": self.cache.evictions}
+
+
+class ConfigClient:
+    # Runtime reader for the values SsmParameter, SsmParameterTree and
+    # SecretManagerSecret provision. Lookups are batched, cached with a TTL
+    # and served stale while a background refresh runs.
+    def __init__(self,
+                 ssm_client=None,
+                 secrets_client=None,
+                 region_name: Optional[str] = None,
+                 ttl: float = 300.0,
+                 stale_ttl: float = 600.0,  # how long past ttl a value may still be served while refreshing
+                 max_entries: int = 1024,
+                 refresh_workers: int = 2,
+                 cache: Optional[TtlCache] = None,
+                 envelopes: Optional[EnvelopeDecryptor] = None):
+        self._ssm = ssm_client
+        self._secrets = secrets_client
+        self._envelopes = envelopes
+        self._region_name = region_name
+        self.cache = cache if cache is not None else TtlCache(ttl=ttl, stale_ttl=stale_ttl, max_entries=max_entries)
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="config-refresh")
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        self._api_calls: Dict[str, int] = {}
+
+    @property
+    def ssm(self):
+        if self._ssm is None:
+            self._ssm = self._client("ssm")
+        return self._ssm
+
+    @property
+    def secrets(self):
+        if self._secrets is None:
+            self._secrets = self._client("secretsmanager")
+        return self._secrets
+
+    @property
+    def envelopes(self) -> EnvelopeDecryptor:
+        if self._envelopes is None:
+            self._envelopes = EnvelopeDecryptor(region_name=self._region_name)
+        return self._envelopes
+
+    # SSM parameters
+
+    def get_parameter(self, name: str, decrypt: bool = True) -> Any:
+        values = self.get_parameters([name], decrypt=decrypt)
+        if name not in values:
+            raise KeyError(f"SSM parameter {parameter_name(name)} not found")
+        return values[name]
+
+    def get_parameters(self, names: Iterable[str], decrypt: bool = True) -> Dict[str, Any]:
+        # Missing parameters are left out of the result
+        requested = {name: parameter_name(name) for name in names}
+        found, missing, stale = self._lookup({name: ("parameter", full, decrypt) for name, full in requested.items()})
+
+        if missing:
+            fetched = self._fetch_parameters([requested[name] for name in missing], decrypt)
+            found.update({name: fetched[requested[name]] for name in missing if requested[name] in fetched})
+        if stale:
+            stale_names = sorted(requested[name] for name in stale)
+            self._refresh(("parameters", tuple(stale_names), decrypt),
+                          lambda: self._fetch_parameters(stale_names, decrypt))
+        return found
+
+    def get_sealed_parameter(self, name: str) -> str:
+        # A parameter written by SsmParameter(envelope=...): a plain String, opened with a cached data key
+        return self.envelopes.decrypt_text(self.get_parameter(name, decrypt=False), context=parameter_name(name))
+
+    def get_parameters_by_path(self, path: str, recursive: bool = True, decrypt: bool = True) -> Dict[str, Any]:
+        # e.g. the prefix of an SsmParameterTree; returns full name -> value
+        path = parameter_name(path)
+        key = ("path", path, recursive, decrypt)
+        found, missing, stale = self._lookup({path: key})
+        if stale:
+            self._refresh(key, lambda: self._fetch_path(path, recursive, decrypt))
+        if missing:
+            return self._fetch_path(path, recursive, decrypt)
+        return dict(found[path])
+
+    def _fetch_parameters(self, names: List[str], decrypt: bool) -> Dict[str, Any]:
+        values = {}
+        for batch in _batches(sorted(set(names)), GET_PARAMETERS_BATCH):
+            response = self._call("ssm:GetParameters", self.ssm.get_parameters, Names=batch, WithDecryption=decrypt)
+            for parameter in response.get("Parameters", []):
+                value = _parameter_value(parameter)
+                # Requests by ARN come back under the parameter name
+                requested = parameter["ARN"] if parameter.get("ARN") in batch else parameter["Name"]
+                values[requested] = value
+                self.cache.put(("parameter", requested, decrypt), value)
+        return values
+
+    def _fetch_path(self, path: str, recursive: bool, decrypt: bool) -> Dict[str, Any]:
+        values = {}
+        kwargs = {"Path": path, "Recursive": recursive, "WithDecryption": decrypt,
+                  "MaxResults": GET_PARAMETERS_BY_PATH_PAGE}
+        while True:
+            response = self._call("ssm:GetParametersByPath", self.ssm.get_parameters_by_path, **kwargs)
+            for parameter in response.get("Parameters", []):
+                values[parameter["Name"]] = _parameter_value(parameter)
+            if not response.get("NextToken"):
+                break
+            kwargs["NextToken"] = response["NextToken"]
+
+        self.cache.put_many({("parameter", name, decrypt): value for name, value in values.items()})
+        self.cache.put(("path", path, recursive, decrypt), values)
+        return dict(values)
+
+    # Secrets Manager
+
+    def get_secret(self, secret_id: str) -> Any:
+        values = self.get_secrets([secret_id])
+        if secret_id not in values:
+            raise KeyError(f"Secret {secret_id} not found")
+        return values[secret_id]
+
+    def get_secret_json(self, secret_id: str) -> Any:
+        # SecretManagerSecret stores dict values as JSON
+        return json.loads(self.get_secret(secret_id))
+
+    def get_sealed_secret(self, secret_id: str) -> str:
+        # A secret written by SecretManagerSecret(envelope=...); values are sealed for the secret name
+        context = None if secret_id.startswith("arn:") else secret_id
+        return self.envelopes.decrypt_text(self.get_secret(secret_id), context=context)
+
+    def get_secrets(self, secret_ids: Iterable[str]) -> Dict[str, Any]:
+        # Values are SecretString, or SecretBinary bytes; missing secrets are left out
+        secret_ids = list(secret_ids)
+        found, missing, stale = self._lookup({secret_id: ("secret", secret_id) for secret_id in secret_ids})
+
+        if missing:
+            fetched = self._fetch_secrets(missing)
+            found.update({secret_id: fetched[secret_id] for secret_id in missing if secret_id in fetched})
+        if stale:
+            stale_ids = sorted(stale)
+            self._refresh(("secrets", tuple(stale_ids)), lambda: self._fetch_secrets(stale_ids))
+        return found
+
+    def _fetch_secrets(self, secret_ids: List[str]) -> Dict[str, Any]:
+        values = {}
+        for batch in _batches(sorted(set(secret_ids)), BATCH_GET_SECRETS_BATCH):
+            kwargs = {"SecretIdList": batch}
+            while True:
+                response = self._call("secretsmanager:BatchGetSecretValue",
+                                      self.secrets.batch_get_secret_value, **kwargs)
+                for secret in response.get("SecretValues", []):
+                    value = secret["SecretString"] if "SecretString" in secret else secret.get("SecretBinary")
+                    # Match the id the caller used, which may be the name or the ARN
+                    requested = secret["ARN"] if secret.get("ARN") in batch else secret["Name"]
+                    values[requested] = value
+                    self.cache.put(("secret", requested), value)
+                if not response.get("NextToken"):
+                    break
+                kwargs["NextToken"] = response["NextToken"]
+        return values
+
+    def get_bundle(self, name: str, keys: Optional[Iterable[str]] = None, max_workers: int = 4) -> Dict[str, Any]:
+        # Reads a SecretBundle: the manifest, then only the shards holding `keys`
+        # (all shards when None), fetched concurrently in BatchGetSecretValue batches.
+        manifest = self.get_secret_json(name)
+        keys = list(keys) if keys is not None else None
+        indices = shards_for_keys(manifest, keys) if keys is not None else range(manifest["shard_count"])
+        shards = [manifest["shards"][i] for i in indices]
+
+        batches = list(_batches([shard["name"] for shard in shards], BATCH_GET_SECRETS_BATCH))
+        payloads = {}
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+                for result in pool.map(self.get_secrets, batches):
+                    payloads.update(result)
+        else:
+            for batch in batches:
+                payloads.update(self.get_secrets(batch))
+
+        values = {}
+        for shard in shards:
+            values.update(self._decode_bundle_shard(shard, payloads.get(shard["name"]), manifest["codec"]))
+        return {key: values[key] for key in keys} if keys is not None else values
+
+    def _decode_bundle_shard(self, shard: Dict[str, Any], payload: Optional[str], codec: str) -> Dict[str, Any]:
+        decoded, state = self.cache.get(("bundle-shard", shard["sha256"]))
+        if state != FRESH and state != STALE:
+            try:
+                if payload is None:
+                    raise KeyError(f"Bundle shard {shard['name']} not found")
+                decoded = decode_shard(payload, codec, shard["sha256"])
+            except (KeyError, ValueError):
+                # The cached shard predates the manifest (or vice versa); read it once more
+                self.cache.invalidate(("secret", shard["name"]))
+                payload = self._fetch_secrets([shard["name"]]).get(shard["name"])
+                if payload is None:
+                    raise KeyError(f"Bundle shard {shard['name']} not found")
+                decoded = decode_shard(payload, codec, shard["sha256"])
+            self.cache.put(("bundle-shard", shard["sha256"]), decoded)
+        return dict(decoded)
+
+    # Cache, refresh and metrics
+
+    def _lookup(self, keys: Dict[str, Hashable]):
+        found, missing, stale = {}, [], []
+        for name, key in keys.items():
+            value, state = self.cache.get(key)
+            if state == FRESH:
+                found[name] = value
+                self._count("hits")
+            elif state == STALE:
+                found[name] = value
+                stale.append(name)
+                self._count("stale_hits")
+            else:
+                missing.append(name)
+                self._count("misses")
+        return found, missing, stale
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Any]):
+        # At most one background refresh per key; the stale value is served meanwhile
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        def run():
+            try:
+                fetch()
+                self._count("refreshes")
+            except Exception:
+                self._count("refresh_errors")
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+        self._executor.submit(run)
+
+    def _call(self, operation: str, fn: Callable, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            self._api_calls[operation] = self._api_calls.get(operation, 0) + 1
+        return fn(**kwargs)
+
+    def _count(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _client(self, service: str):
+        return _client(service, self._region_name, "ConfigClient")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._metrics["hits"] + self._metrics["stale_hits"] + self._metrics["misses"]
+            return {
+                **self._metrics,
+                "hit_ratio": round((self._metrics["hits"] + self._metrics["stale_hits"]) / lookups, 4) if lookups else 0.0,
+                "api_calls": dict(self._api_calls),
+                "cached_entries": len(self.cache),
+                "evictions": self.cache.evictions,
+                "pending_refreshes": len(self._pending),
+            }
+
+    def invalidate(self):
+        self.cache.invalidate()
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _client(service: str, region_name: Optional[str], owner: str):
+    try:
+        import boto3
+    except ImportError as e:
+        raise ImportError(f"{owner} requires boto3 unless clients are passed in") from e
+    return boto3.client(service, region_name=region_name)
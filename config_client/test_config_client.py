@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from config_client.cache import TtlCache
+from config_client.config_client import GET_PARAMETERS_BATCH, ConfigClient
+from secret_manager.bundle import plan_bundle
+
+
+class FakeSsm:
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.requests = []
+
+    def get_parameters(self, Names, WithDecryption):
+        self.requests.append(list(Names))
+        return {"Parameters": [{"Name": name, "Type": "String", "Value": self.parameters[name]}
+                               for name in Names if name in self.parameters]}
+
+
+class FakeSecrets:
+    def __init__(self, secrets):
+        self.secrets = secrets
+        self.requests = []
+
+    def batch_get_secret_value(self, SecretIdList, NextToken=None):
+        self.requests.append(list(SecretIdList))
+        names = [secret_id.rpartition(":")[2] for secret_id in SecretIdList]
+        return {"SecretValues": [{"Name": name, "ARN": f"arn:aws:secretsmanager:::{name}",
+                                  "SecretString": self.secrets[name]}
+                                 for name in names if name in self.secrets]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def client(ssm=None, secrets=None, **kwargs):
+    return ConfigClient(ssm_client=ssm, secrets_client=secrets, **kwargs)
+
+
+def test_parameters_are_fetched_in_batches_of_ten():
+    ssm = FakeSsm({f"/app/p{i:02}": str(i) for i in range(25)})
+    with client(ssm) as config:
+        values = config.get_parameters([f"app/p{i:02}" for i in range(25)] + ["app/missing"])
+
+    assert values["app/p07"] == "7"
+    assert "app/missing" not in values
+    assert [len(batch) for batch in ssm.requests] == [GET_PARAMETERS_BATCH, GET_PARAMETERS_BATCH, 6]
+    assert config.stats()["api_calls"] == {"ssm:GetParameters": 3}
+
+
+def test_cached_parameters_are_not_fetched_again():
+    ssm = FakeSsm({"/app/host": "db.internal"})
+    with client(ssm) as config:
+        assert config.get_parameter("app/host") == "db.internal"
+        assert config.get_parameter("/app/host") == "db.internal"
+        stats = config.stats()
+
+    assert len(ssm.requests) == 1
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_stale_values_are_served_while_refreshing():
+    ssm = FakeSsm({"/app/host": "old"})
+    clock = Clock()
+    config = client(ssm, cache=TtlCache(ttl=10, stale_ttl=10, clock=clock))
+    config.get_parameter("app/host")
+
+    ssm.parameters["/app/host"] = "new"
+    clock.now = 15
+    assert config.get_parameter("app/host") == "old"
+    config.close()
+
+    assert config.get_parameter("app/host") == "new"
+    assert config.stats()["refreshes"] == 1
+
+
+def test_missing_parameter_raises():
+    with client(FakeSsm({})) as config, pytest.raises(KeyError, match="/app/missing"):
+        config.get_parameter("app/missing")
+
+
+def test_secrets_are_read_with_batch_get_secret_value():
+    fake = FakeSecrets({"db": '{"user": "app"}', "api": "token"})
+    with client(secrets=fake) as config:
+        assert config.get_secrets(["db", "api", "gone"]) == {"db": '{"user": "app"}', "api": "token"}
+        assert config.get_secret_json("db") == {"user": "app"}
+        assert config.get_secret("arn:aws:secretsmanager:::api") == "token"
+
+    assert fake.requests == [["api", "db", "gone"], ["arn:aws:secretsmanager:::api"]]
+
+
+def bundle_secrets(name, values, **kwargs):
+    plan = plan_bundle(name, values, **kwargs)
+    return plan, FakeSecrets({name: plan.manifest_json(), **{shard.name: shard.payload for shard in plan.shards}})
+
+
+def test_bundles_read_only_the_shards_holding_the_keys():
+    values = {f"key-{i:03d}": os.urandom(100).hex() for i in range(300)}
+    plan, fake = bundle_secrets("app/bundle", values, max_shard_bytes=4096)
+    wanted = ["key-001", "key-250"]
+    with client(secrets=fake) as config:
+        assert config.get_bundle("app/bundle", wanted) == {key: values[key] for key in wanted}
+        assert config.get_bundle("app/bundle") == values
+
+    shard_names = {plan.shards[plan.manifest["keys"][key]].name for key in wanted}
+    assert len(plan.shards) > len(shard_names)
+    assert fake.requests[:2] == [["app/bundle"], sorted(shard_names)]
+
+
+def test_bundle_shards_are_reread_when_they_predate_the_manifest():
+    plan, fake = bundle_secrets("app/bundle", {"db": "old"})
+    with client(secrets=fake) as config:
+        assert config.get_bundle("app/bundle") == {"db": "old"}
+        newer, _ = bundle_secrets("app/bundle", {"db": "new"})
+        fake.secrets = {"app/bundle": newer.manifest_json(), newer.shards[0].name: newer.shards[0].payload}
+        config.cache.invalidate(("secret", "app/bundle"))
+        assert config.get_bundle("app/bundle", ["db"]) == {"db": "new"}
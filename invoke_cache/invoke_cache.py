@@ -0,0 +1,133 @@
+import time
+import pulumi
+import pulumi_aws as aws
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class InvokeCache:
+    def __init__(self):
+        self._results: Dict[Tuple, Any] = {}
+        self._outputs: Dict[Tuple, pulumi.Output] = {}
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.calls: Dict[str, Dict[str, int]] = {}
+        # Called with (function name, hit, seconds, parent resource or None) for every lookup
+        self.listeners: List[Callable[[str, bool, float, Optional[pulumi.Resource]], None]] = []
+
+    def invoke(self, fn: Callable, opts: Optional[pulumi.InvokeOptions] = None, **kwargs) -> Any:
+        key = self._key(fn, opts, kwargs)
+        if key in self._results:
+            self._record(fn, opts, hit=True)
+            return self._results[key]
+
+        started = time.perf_counter()
+        result = fn(**kwargs, opts=opts)
+        seconds = time.perf_counter() - started
+        self.miss_seconds += seconds
+
+        self._results[key] = result
+        self._record(fn, opts, hit=False, seconds=seconds)
+        return result
+
+    def invoke_output(self, fn: Callable, opts: Optional[pulumi.InvokeOptions] = None, **kwargs) -> pulumi.Output:
+        # Non-blocking variant for the *_output invoke functions: the engine
+        # resolves all pending lookups concurrently.
+        key = self._key(fn, opts, kwargs)
+        if key in self._outputs:
+            self._record(fn, opts, hit=True)
+            return self._outputs[key]
+
+        output = fn(**kwargs, opts=opts)
+        self._outputs[key] = output
+        self._record(fn, opts, hit=False)
+        return output
+
+    def stats(self) -> Dict[str, Any]:
+        avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "miss_seconds": round(self.miss_seconds, 6),
+            "estimated_saved_seconds": round(avg_miss * self.hits, 6),
+            "calls": {name: dict(counts) for name, counts in self.calls.items()},
+        }
+
+    def clear(self):
+        self._results.clear()
+        self._outputs.clear()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+        self.calls.clear()
+
+    def _record(self, fn: Callable, opts: Optional[pulumi.InvokeOptions], hit: bool, seconds: float = 0.0):
+        name = _function_name(fn)
+        counts = self.calls.setdefault(name, {"hits": 0, "misses": 0})
+        if hit:
+            self.hits += 1
+            counts["hits"] += 1
+        else:
+            self.misses += 1
+            counts["misses"] += 1
+
+        parent = opts.parent if opts is not None else None
+        for listener in self.listeners:
+            listener(name, hit, seconds, parent)
+
+    @staticmethod
+    def _key(fn: Callable, opts: Optional[pulumi.InvokeOptions], kwargs: Dict[str, Any]) -> Tuple:
+        provider = opts.provider if opts is not None else None
+        return _function_name(fn), _freeze(kwargs), provider
+
+
+def _function_name(fn: Callable) -> str:
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_freeze(v) for v in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else items
+    return value
+
+
+# One cache per Pulumi program
+invoke_cache = InvokeCache()
+
+
+def invoke_options(resource: Optional[pulumi.Resource] = None,
+                   provider: Optional[pulumi.ProviderResource] = None) -> Optional[pulumi.InvokeOptions]:
+    # Invokes resolve against the provider a component was given (directly or
+    # through its parent), and the provider is part of the cache key, so each
+    # region is looked up once. The resource is passed on as the invoke's parent,
+    # which is what the registration tracer attributes the lookup to.
+    if provider is None and resource is not None:
+        provider = resource.get_provider("aws::")
+    if provider is None and resource is None:
+        return None
+    return pulumi.InvokeOptions(parent=resource, provider=provider)
+
+
+def get_region(opts: Optional[pulumi.InvokeOptions] = None):
+    return invoke_cache.invoke(aws.get_region, opts=opts)
+
+
+def get_availability_zones(opts: Optional[pulumi.InvokeOptions] = None):
+    # Regular AZs only; Local and Wavelength Zones need an opt-in
+    return invoke_cache.invoke(aws.get_availability_zones, opts=opts, state="available",
+                               filters=[{"name": "opt-in-status", "values": ["opt-in-not-required"]}])
+
+
+def get_caller_identity_output(opts: Optional[pulumi.InvokeOptions] = None) -> pulumi.Output:
+    return invoke_cache.invoke_output(aws.get_caller_identity_output, opts=opts)
+
+
+def get_region_output(opts: Optional[pulumi.InvokeOptions] = None) -> pulumi.Output:
+    return invoke_cache.invoke_output(aws.get_region_output, opts=opts)
+
+
+def get_partition_output(opts: Optional[pulumi.InvokeOptions] = None) -> pulumi.Output:
+    return invoke_cache.invoke_output(aws.get_partition_output, opts=opts)
@@ -0,0 +1,74 @@
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import InvokeCache, get_region, invoke_cache, invoke_options
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers, regional_provider
+
+
+def counting_lookup():
+    def lookup(opts=None, **kwargs):
+        lookup.calls.append((opts, kwargs))
+        return len(lookup.calls)
+    lookup.calls = []
+    return lookup
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def test_arguments_are_frozen_into_one_key():
+    cache, lookup = InvokeCache(), counting_lookup()
+    first = cache.invoke(lookup, filters=[{"name": "state", "values": ["a", "b"]}], tags={"x": "1", "y": "2"},
+                         ids={"b", "a"})
+    second = cache.invoke(lookup, tags={"y": "2", "x": "1"}, filters=[{"values": ["a", "b"], "name": "state"}],
+                          ids={"a", "b"})
+
+    assert first == second == 1
+    assert cache.invoke(lookup, filters=[{"name": "state", "values": ["b", "a"]}], tags={}, ids=set()) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_each_provider_is_looked_up_separately():
+    cache, lookup = InvokeCache(), counting_lookup()
+    east, west = pulumi.InvokeOptions(provider="east"), pulumi.InvokeOptions(provider="west")
+
+    assert [cache.invoke(lookup, opts) for opts in (east, west, east, None, pulumi.InvokeOptions())] == [1, 2, 1, 3, 3]
+    assert lookup.calls[0][0] is east
+
+
+def test_stats_and_listeners_see_every_lookup():
+    cache, lookup, seen = InvokeCache(), counting_lookup(), []
+    parent = object()
+    cache.listeners.append(lambda name, hit, seconds, owner: seen.append((name.rsplit(".", 1)[-1], hit, owner)))
+    cache.invoke(lookup)
+    cache.invoke(lookup, pulumi.InvokeOptions(parent=parent))
+
+    assert seen == [("lookup", False, None), ("lookup", True, parent)]
+    [counts] = cache.stats()["calls"].values()
+    assert counts == {"hits": 1, "misses": 1}
+
+    cache.clear()
+    assert cache.stats()["calls"] == {} and cache.invoke(lookup) == 2
+
+
+def test_output_lookups_share_one_pending_output():
+    cache, lookup = InvokeCache(), counting_lookup()
+    assert cache.invoke_output(lookup, name="x") is cache.invoke_output(lookup, name="x")
+    assert len(lookup.calls) == 1
+
+
+def test_regions_follow_the_provider(mocks):
+    @pulumi.runtime.test
+    def build():
+        west = invoke_options(provider=regional_provider("us-west-2"))
+        assert [get_region(opts).name for opts in (None, west, west, None)] == \
+            ["us-east-2", "us-west-2", "us-west-2", "us-east-2"]
+        assert mocks.invoke_count == 2
+        assert invoke_options() is None
+
+    build()
@@ -0,0 +1,117 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Sealed values are a small JSON document: the header (authenticated as
+# AES-GCM associated data), the KMS-wrapped data key and the ciphertext.
+# Version 2 encrypts and derives nonces with separate HKDF subkeys of the data
+# key; version 1 used the data key for both and is still opened.
+ENVELOPE_VERSION = 2
+OPENABLE_VERSIONS = (1, 2)
+ENVELOPE_ALGORITHM = "A256GCM"
+DATA_KEY_BYTES = 32
+NONCE_BYTES = 12
+TAG_BYTES = 16
+# Payloads smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 256
+# Upper bound of a base64 KMS CiphertextBlob for a 32-byte data key
+WRAPPED_KEY_MAX_CHARS = 512
+
+
+def new_data_key() -> bytes:
+    return os.urandom(DATA_KEY_BYTES)
+
+
+def envelope_context(key_name: str) -> Dict[str, str]:
+    # KMS encryption context an EnvelopeKey wraps its data key under
+    return {"envelope_key": key_name}
+
+
+def seal(plaintext: bytes,
+         data_key: bytes,
+         wrapped_key: str,  # base64 CiphertextBlob of the data key
+         context: str,  # what the value is, e.g. the parameter path; bound to the ciphertext
+         kms_context: Optional[Dict[str, str]] = None) -> str:
+    plaintext, codec = _compress(plaintext)
+    header = {"v": ENVELOPE_VERSION, "alg": ENVELOPE_ALGORITHM, "ctx": context, "dk": wrapped_key,
+              "kc": dict(sorted((kms_context or {}).items())), "zip": codec}
+    aad = _canonical(header)
+    # Synthetic nonce: equal inputs seal to equal values, so redeploying with the
+    # same data key does not rewrite unchanged parameters, and a nonce is never
+    # reused for different plaintexts. The flip side is that sealing is
+    # deterministic: anyone who can read two sealed values sees whether they
+    # hold the same plaintext under the same context, data key and KMS context.
+    encryption_key, nonce_key = derive_subkeys(data_key)
+    nonce = hmac.new(nonce_key, aad + b"\0" + plaintext, hashlib.sha256).digest()[:NONCE_BYTES]
+    ciphertext = aesgcm(encryption_key).encrypt(nonce, plaintext, aad)
+    return json.dumps({**header, "iv": _b64(nonce), "ct": _b64(ciphertext)}, sort_keys=True, separators=(",", ":"))
+
+
+def open_envelope(envelope: str,
+                  unwrap: Callable[[bytes, Dict[str, str]], bytes],  # (wrapped key, KMS context) -> data key
+                  context: Optional[str] = None) -> bytes:
+    document = json.loads(envelope)
+    if document.get("v") not in OPENABLE_VERSIONS or document.get("alg") != ENVELOPE_ALGORITHM:
+        raise ValueError(f"Unsupported envelope {document.get('v')}/{document.get('alg')}")
+    if context is not None and document["ctx"] != context:
+        raise ValueError(f"Envelope was sealed for {document['ctx']!r}, not {context!r}")
+
+    header = {name: document[name] for name in ("v", "alg", "ctx", "dk", "kc", "zip")}
+    data_key = unwrap(base64.b64decode(document["dk"]), document["kc"])
+    encryption_key = data_key if document["v"] == 1 else derive_subkeys(data_key)[0]
+    plaintext = aesgcm(encryption_key).decrypt(base64.b64decode(document["iv"]), base64.b64decode(document["ct"]),
+                                          _canonical(header))
+    if document["zip"] == "zlib":
+        plaintext = zlib.decompress(plaintext)
+    elif document["zip"] is not None:
+        raise ValueError(f"Unknown envelope codec {document['zip']!r}")
+    return plaintext
+
+
+def sealed_size(plaintext: bytes, context: str, kms_context: Optional[Dict[str, str]] = None) -> int:
+    # Upper bound of the sealed value's length before the wrapped key is known, e.g. to pick an SSM tier
+    payload, _ = _compress(plaintext)
+    header = {"v": ENVELOPE_VERSION, "alg": ENVELOPE_ALGORITHM, "ctx": context, "dk": "",
+              "kc": kms_context or {}, "zip": "zlib", "iv": "", "ct": ""}
+    ciphertext_chars = 4 * -(-(len(payload) + TAG_BYTES) // 3)
+    nonce_chars = 4 * -(-NONCE_BYTES // 3)
+    return len(json.dumps(header, separators=(",", ":"))) + WRAPPED_KEY_MAX_CHARS + nonce_chars + ciphertext_chars
+
+
+def derive_subkeys(data_key: bytes) -> Tuple[bytes, bytes]:
+    # (AES-GCM key, nonce HMAC key), so the data key itself is never used by two algorithms
+    try:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    except ImportError as e:
+        raise ImportError("Envelope encryption requires the cryptography package") from e
+    return tuple(HKDF(algorithm=hashes.SHA256(), length=DATA_KEY_BYTES, salt=None, info=info).derive(data_key)
+                 for info in (b"envelope/v2/encryption", b"envelope/v2/nonce"))
+
+
+def _compress(plaintext: bytes) -> Tuple[bytes, Optional[str]]:
+    if len(plaintext) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(plaintext, 9)
+        if len(compressed) < len(plaintext):
+            return compressed, "zlib"
+    return plaintext, None
+
+
+def _canonical(header: Dict[str, Any]) -> bytes:
+    return json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def aesgcm(data_key: bytes):
+    try:
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    except ImportError as e:
+        raise ImportError("Envelope encryption requires the cryptography package") from e
+    return AESGCM(data_key)
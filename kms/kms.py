@@ -1,8 +1,19 @@
+import base64
 import pulumi
 import pulumi_aws as aws
-from pulumi_aws import iam
+from kms.envelope import DATA_KEY_BYTES, envelope_context, seal, sealed_size
+from kms.policy import PolicyDocument, statement
+from invoke_cache.invoke_cache import get_caller_identity_output, get_partition_output, get_region, invoke_options
+from typing import Any, Mapping, Optional, Union
+from tagging.tagging import resource_tags
+from regions.providers import regional_provider
 
 class KmsModule:
+    # A CMK with its alias, plus a ReplicaKey and alias in each of replica_regions.
+    # multi_region is fixed when the key is created: turning it on for an existing
+    # key replaces it, so a stack that may need replicas opts in from the start.
+    # Enabling it later is a key migration (new key, re-encrypt, then retire the
+    # old one), not an in-place update.
     def __init__(self,
                  name: str,
                  enable_iam_permissions: bool = True,
@@ -12,63 +23,132 @@ class KmsModule:
                  key_spec: str = "SYMMETRIC_DEFAULT",
                  key_usage: str = "ENCRYPT_DECRYPT",
                  enabled_cloudwatch_log_delivery: bool = False,
+                 enabled_flow_log_delivery: bool = False,  # VPC flow logs written to SSE-KMS buckets
                  enabled_route53_dnssec: bool = False,
                  enabled_route53_dnssec_cloudwatch_logs: bool = False,
                  enabled_service_identifiers: list[str] = [],
                  additional_cloudwatch_log_delivery_arns: list[str] = [],
-                 custom_key_policy: dict = None):
-
-        # AWS identity/region info
-        identity = aws.get_caller_identity()
-        region = aws.get_region()
-        partition = aws.get_partition()
-
-        statements = []
-
-        if enable_iam_permissions:
-            statements.append(iam.GetPolicyDocumentStatementArgs(
-                sid="EnableIAMUserPermissions",
-                actions=["kms:*"],
-                resources=["*"],
-                principals=[iam.GetPolicyDocumentStatementPrincipalArgs(
-                    type="AWS",
-                    identifiers=[f"arn:{partition.partition}:iam::{identity.account_id}:root"]
-                )]
-            ))
-
-        # CloudWatch statement
-        if enabled_cloudwatch_log_delivery:
-            cw_arns = [
-                f"arn:{partition.partition}:logs:{region.name}:{identity.account_id}:*{name}*"
-            ]
-            if enabled_route53_dnssec_cloudwatch_logs:
-                cw_arns.append(f"arn:{partition.partition}:logs:{region.name}:{identity.account_id}:log-group:/aws/route53/*")
-            cw_arns += additional_cloudwatch_log_delivery_arns
-
-            statements.append(iam.GetPolicyDocumentStatementArgs(
-                sid="CloudWatchAccess",
-                actions=[
-                    "kms:Encrypt*", "kms:Decrypt*", "kms:ReEncrypt*",
-                    "kms:GenerateDataKey*", "kms:Describe*"
-                ],
-                resources=["*"],
-                principals=[iam.GetPolicyDocumentStatementPrincipalArgs(
-                    type="Service",
-                    identifiers=[f"logs.{region.name}.amazonaws.com"]
-                )],
-                conditions=[{
-                    "test": "ArnLike",
-                    "variable": "kms:EncryptionContext:aws:logs:arn",
-                    "values": cw_arns
-                }]
-            ))
-
-        # Add additional statements here for:
-        # - custom_key_policy
-        # - route53 DNSSEC
-        # - general AWS service access
-
-        policy_doc = iam.get_policy_document(statements=statements)
+                 custom_key_policy: dict = None,  # policy document (dict or JSON string) merged by Sid
+                 provider: aws.Provider = None,  # regional provider; the default provider when None
+                 tags: dict = None,
+                 multi_region: bool = False,  # required for replica_regions; cannot change after creation
+                 replica_regions: list[str] = [],  # a replica of the multi-region key in each region
+                 provider_args: dict = None):  # aws.Provider arguments of `provider`, copied into the replica providers
+
+        # AWS identity/region info. The region names the region-keyed maps, so it
+        # is resolved here (once per provider); identity and partition only feed
+        # the policies and resolve concurrently with the other pending lookups.
+        lookup_opts = invoke_options(provider=provider)
+        region = get_region(lookup_opts)
+        identity = get_caller_identity_output(lookup_opts)
+        partition = get_partition_output(lookup_opts)
+
+        def render_policy(region_name: str, account_id: str, arn_prefix: str) -> str:
+            # Region-scoped statements follow the key's region, so replicas get the same policy for their region
+            document = PolicyDocument()
+
+            if enable_iam_permissions:
+                document.add(statement(
+                    sid="EnableIAMUserPermissions",
+                    actions=["kms:*"],
+                    principals={"AWS": [f"{arn_prefix}:iam::{account_id}:root"]}
+                ))
+
+            # CloudWatch statement
+            if enabled_cloudwatch_log_delivery:
+                cw_arns = [
+                    f"{arn_prefix}:logs:{region_name}:{account_id}:*{name}*"
+                ]
+                if enabled_route53_dnssec_cloudwatch_logs:
+                    cw_arns.append(f"{arn_prefix}:logs:{region_name}:{account_id}:log-group:/aws/route53/*")
+                cw_arns += additional_cloudwatch_log_delivery_arns
+
+                document.add(statement(
+                    sid="CloudWatchAccess",
+                    actions=[
+                        "kms:Encrypt*", "kms:Decrypt*", "kms:ReEncrypt*",
+                        "kms:GenerateDataKey*", "kms:Describe*"
+                    ],
+                    principals={"Service": [f"logs.{region_name}.amazonaws.com"]},
+                    conditions=[{
+                        "test": "ArnLike",
+                        "variable": "kms:EncryptionContext:aws:logs:arn",
+                        "values": cw_arns
+                    }]
+                ))
+
+            # VPC flow log delivery to S3 buckets encrypted with this key
+            if enabled_flow_log_delivery:
+                document.add(statement(
+                    sid="FlowLogDelivery",
+                    actions=["kms:Encrypt", "kms:Decrypt", "kms:ReEncrypt*", "kms:GenerateDataKey*", "kms:DescribeKey"],
+                    principals={"Service": ["delivery.logs.amazonaws.com"]},
+                    conditions=[
+                        {"test": "StringEquals", "variable": "aws:SourceAccount", "values": [account_id]},
+                        {"test": "ArnLike", "variable": "aws:SourceArn", "values": [f"{arn_prefix}:logs:{region_name}:{account_id}:*"]},
+                    ]
+                ))
+
+            # Route53 DNSSEC signing (requires an ECC_NIST_P256 SIGN_VERIFY key)
+            if enabled_route53_dnssec:
+                dnssec_conditions = [
+                    {"test": "StringEquals", "variable": "aws:SourceAccount", "values": [account_id]},
+                    {"test": "ArnLike", "variable": "aws:SourceArn", "values": [f"{arn_prefix}:route53:::hostedzone/*"]},
+                ]
+                document.add(statement(
+                    sid="Route53DnssecService",
+                    actions=["kms:DescribeKey", "kms:GetPublicKey", "kms:Sign"],
+                    principals={"Service": ["dnssec-route53.amazonaws.com"]},
+                    conditions=dnssec_conditions
+                ))
+                document.add(statement(
+                    sid="Route53DnssecGrant",
+                    actions=["kms:CreateGrant"],
+                    principals={"Service": ["dnssec-route53.amazonaws.com"]},
+                    conditions=dnssec_conditions + [
+                        {"test": "Bool", "variable": "kms:GrantIsForAWSResource", "values": ["true"]}
+                    ]
+                ))
+
+            # General AWS service access, e.g. ["ssm", "secretsmanager"], through the services only
+            if enabled_service_identifiers:
+                via_services = [
+                    f"{identifier.removesuffix('.amazonaws.com')}.{region_name}.amazonaws.com"
+                    for identifier in enabled_service_identifiers
+                ]
+                document.add(statement(
+                    sid="AWSServiceAccess",
+                    actions=[
+                        "kms:Encrypt", "kms:Decrypt", "kms:ReEncrypt*",
+                        "kms:GenerateDataKey*", "kms:CreateGrant", "kms:DescribeKey"
+                    ],
+                    principals={"AWS": ["*"]},
+                    conditions=[
+                        {"test": "StringEquals", "variable": "kms:CallerAccount", "values": [account_id]},
+                        {"test": "StringEquals", "variable": "kms:ViaService", "values": via_services},
+                    ]
+                ))
+
+            # Custom statements replace generated ones with the same Sid
+            if custom_key_policy:
+                document.merge(custom_key_policy)
+
+            # Rendered locally: byte-stable and memoized, no provider round-trip
+            return document.to_json()
+
+        def policy_for(region_name: str) -> pulumi.Output:
+            return pulumi.Output.all(identity.account_id, partition.partition).apply(
+                lambda values: render_policy(region_name, values[0], f"arn:{values[1]}"))
+
+        if replica_regions and not multi_region:
+            raise ValueError(f"Replica regions {replica_regions} need multi_region=True, which replaces an existing "
+                             f"single-region key {name}; set it when the key is created")
+        if region.name in replica_regions:
+            raise ValueError(f"Replica regions {replica_regions} include the primary region {region.name}")
+        if len(set(replica_regions)) != len(replica_regions):
+            raise ValueError(f"Replica regions are listed more than once: {replica_regions}")
+
+        self.policy_json = policy_for(region.name)
 
         # Create KMS Key
         self.kms_key = aws.kms.Key(f"{name}-key",
@@ -78,11 +158,97 @@ class KmsModule:
             rotation_period_in_days=key_rotation_days if enable_key_rotation else None,
             customer_master_key_spec=key_spec,
             key_usage=key_usage,
-            policy=policy_doc.json,
-            tags={"Name": name}
+            policy=self.policy_json,
+            multi_region=True if multi_region else None,
+            tags=resource_tags(tags, name),
+            opts=pulumi.ResourceOptions(provider=provider)
         )
 
         self.kms_alias = aws.kms.Alias(f"{name}-alias",
             name=f"alias/{name}",
-            target_key_id=self.kms_key.key_id
+            target_key_id=self.kms_key.key_id,
+            opts=pulumi.ResourceOptions(provider=provider)
+        )
+
+        # Region-keyed views, e.g. for SsmParameter/SecretManagerSecret to pick the local key
+        self.key_ids_by_region = {region.name: self.kms_key.key_id}
+        self.key_arns_by_region = {region.name: self.kms_key.arn}
+        self.alias_arns_by_region = {region.name: self.kms_alias.arn}
+        self.replica_keys = {}
+
+        # Replicas share the primary's key material, so data encrypted in one region decrypts in the others
+        for replica_region in replica_regions:
+            replica_opts = pulumi.ResourceOptions(provider=regional_provider(replica_region, provider_args))
+            replica = aws.kms.ReplicaKey(f"{name}-key-{replica_region}",
+                description=f"CMK for stack {name} ({replica_region} replica)",
+                primary_key_arn=self.kms_key.arn,
+                deletion_window_in_days=delete_hold,
+                policy=policy_for(replica_region),
+                tags=resource_tags(tags, name),
+                opts=replica_opts
+            )
+            replica_alias = aws.kms.Alias(f"{name}-alias-{replica_region}",
+                name=f"alias/{name}",
+                target_key_id=replica.key_id,
+                opts=replica_opts
+            )
+
+            self.replica_keys[replica_region] = replica
+            self.key_ids_by_region[replica_region] = replica.key_id
+            self.key_arns_by_region[replica_region] = replica.arn
+            self.alias_arns_by_region[replica_region] = replica_alias.arn
+
+
+class EnvelopeKey(pulumi.ComponentResource):
+    # A data key from the stack config, wrapped by a KMS key with aws.kms.Ciphertext.
+    # Values are sealed locally with AES-GCM together with the wrapped key, so
+    # readers need one KMS Decrypt per data key instead of one per value. The key
+    # has to stay the same between deployments, or every sealed value would be
+    # rewritten on each `pulumi up`; rotate it by setting a new one, which
+    # re-wraps it and re-seals the values once.
+    def __init__(self,
+                 name: str,
+                 kms_key_id: pulumi.Input[str],  # e.g. KmsModule.kms_key.arn
+                 data_key: str,  # base64 of 32 random bytes, e.g. a secret stack config
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__('custom:aws:EnvelopeKey', name, None, opts)
+
+        if not data_key:
+            raise ValueError(f"EnvelopeKey {name} needs a data_key, e.g. `openssl rand -base64 {DATA_KEY_BYTES}` "
+                             "kept as a secret stack config")
+        self._data_key = base64.b64decode(data_key)
+        if len(self._data_key) != DATA_KEY_BYTES:
+            raise ValueError(f"Envelope data keys are {DATA_KEY_BYTES} bytes, got {len(self._data_key)}")
+        self.kms_context = envelope_context(name)
+
+        # The plaintext (the base64 data key) is kept in the state as a secret
+        self.ciphertext = aws.kms.Ciphertext(f"{name}-data-key",
+            key_id=kms_key_id,
+            plaintext=pulumi.Output.secret(base64.b64encode(self._data_key).decode("ascii")),
+            context=self.kms_context,
+            opts=pulumi.ResourceOptions(parent=self)
         )
+        self.wrapped_key = self.ciphertext.ciphertext_blob
+
+        self.register_outputs({
+            "wrapped_key": self.wrapped_key
+        })
+
+    def seal(self, plaintext: Union[str, bytes], context: str) -> pulumi.Output:
+        data = plaintext.encode("utf-8") if isinstance(plaintext, str) else plaintext
+        return self.wrapped_key.apply(lambda wrapped: seal(data, self._data_key, wrapped, context, self.kms_context))
+
+    def sealed_size(self, plaintext: Union[str, bytes], context: str) -> int:
+        data = plaintext.encode("utf-8") if isinstance(plaintext, str) else plaintext
+        return sealed_size(data, context, self.kms_context)
+
+
+def select_regional_key(key: Optional[Any], resource: pulumi.Resource) -> Optional[Any]:
+    # A region-keyed map (e.g. KmsModule.key_arns_by_region) resolves to the key
+    # in the region of the resource's provider; anything else is used as is.
+    if not isinstance(key, Mapping):
+        return key
+    region = get_region(invoke_options(resource)).name
+    if region not in key:
+        raise ValueError(f"No KMS key in {region}; keys exist in {sorted(key)}")
+    return key[region]
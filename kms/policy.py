@@ -0,0 +1,146 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+POLICY_VERSION = "2012-10-17"
+LIST_FIELDS = ("Action", "NotAction", "Resource", "NotResource")
+FIELD_ORDER = ("Sid", "Effect", "Principal", "NotPrincipal", "Action", "NotAction", "Resource", "NotResource", "Condition")
+
+
+def statement(sid: Optional[str] = None,
+              effect: str = "Allow",
+              actions: Optional[List[str]] = None,
+              resources: Optional[List[str]] = None,
+              principals: Optional[Dict[str, List[str]]] = None,  # e.g. {"Service": ["logs.amazonaws.com"]}
+              conditions: Optional[List[Dict[str, Any]]] = None,  # [{"test": ..., "variable": ..., "values": [...]}]
+              not_actions: Optional[List[str]] = None) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"Effect": effect}
+    if sid:
+        result["Sid"] = sid
+    if principals:
+        result["Principal"] = principals
+    if actions:
+        result["Action"] = actions
+    if not_actions:
+        result["NotAction"] = not_actions
+    result["Resource"] = resources or ["*"]
+    if conditions:
+        merged: Dict[str, Dict[str, List[Any]]] = {}
+        for condition in conditions:
+            values = merged.setdefault(condition["test"], {}).setdefault(condition["variable"], [])
+            new_values = condition["values"]
+            values += list(new_values) if isinstance(new_values, (list, tuple)) else [new_values]
+        result["Condition"] = merged
+    return result
+
+
+def canonical_statement(raw: Dict[str, Any]) -> Dict[str, Any]:
+    # Sorted, de-duplicated lists and a fixed key order, so equal statements serialize identically
+    result: Dict[str, Any] = {}
+    for key in FIELD_ORDER:
+        if key not in raw:
+            continue
+        value = raw[key]
+        if key in LIST_FIELDS:
+            value = _sorted_unique(value)
+        elif key in ("Principal", "NotPrincipal"):
+            value = value if value == "*" else {k: _sorted_unique(v) for k, v in sorted(value.items())}
+        elif key == "Condition":
+            value = {test: {variable: _sorted_unique(values) for variable, values in sorted(variables.items())}
+                     for test, variables in sorted(value.items())}
+        result[key] = value
+
+    unknown = set(raw) - set(FIELD_ORDER)
+    if unknown:
+        raise ValueError(f"Unsupported policy statement fields: {sorted(unknown)}")
+    return result
+
+
+class PolicyDocument:
+    def __init__(self, statements: Iterable[Dict[str, Any]] = (), version: str = POLICY_VERSION):
+        self.version = version
+        self._statements: List[Dict[str, Any]] = []
+        for raw in statements:
+            self.add(raw)
+
+    @property
+    def statements(self) -> List[Dict[str, Any]]:
+        return list(self._statements)
+
+    def add(self, raw: Dict[str, Any]) -> "PolicyDocument":
+        candidate = canonical_statement(raw)
+        if candidate in self._statements:
+            return self
+
+        sid = candidate.get("Sid")
+        if sid and any(s.get("Sid") == sid for s in self._statements):
+            raise ValueError(f"Policy statement Sid '{sid}' is used by two different statements")
+        self._statements.append(candidate)
+        return self
+
+    def merge(self, other: Union["PolicyDocument", Dict[str, Any], str], override: bool = True) -> "PolicyDocument":
+        # Statements from `other` replace ours with the same Sid when override is set,
+        # mirroring override_policy_documents of aws.iam.get_policy_document.
+        if isinstance(other, str):
+            other = json.loads(other)
+        if isinstance(other, dict):
+            raw_statements = other.get("Statement", [])
+            other = PolicyDocument(raw_statements if isinstance(raw_statements, list) else [raw_statements])
+
+        for candidate in other.statements:
+            sid = candidate.get("Sid")
+            existing = next((i for i, s in enumerate(self._statements) if sid and s.get("Sid") == sid), None)
+            if existing is not None and override:
+                self._statements[existing] = candidate
+            else:
+                self.add(candidate)
+        return self
+
+    def to_json(self) -> str:
+        return _render(self.version, _freeze(self._statements))
+
+
+@lru_cache(maxsize=None)
+def _render(version: str, frozen_statements: Tuple) -> str:
+    document = {"Version": version, "Statement": _thaw(frozen_statements)}
+    return json.dumps(document, indent=2)
+
+
+def _sorted_unique(value: Any) -> List[Any]:
+    # Condition values keep their JSON type (e.g. aws:SecureTransport false, not "False"),
+    # so booleans, numbers and strings are ordered by type first
+    values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+    unique = {_scalar_key(v): v for v in values}
+    return [unique[key] for key in sorted(unique)]
+
+
+def _scalar_key(value: Any) -> Tuple:
+    if isinstance(value, bool):
+        return 0, value
+    if isinstance(value, (int, float)):
+        return 1, value
+    if isinstance(value, str):
+        return 2, value
+    raise ValueError(f"Unsupported policy value {value!r}")
+
+
+def _freeze(value: Any) -> Any:
+    # dicts keep their (canonical) key order, which _thaw restores; non-string
+    # scalars keep their type, since True, 1 and 1.0 would share a cache key
+    if isinstance(value, dict):
+        return ("__dict__",) + tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (bool, int, float)):
+        return ("__scalar__", type(value).__name__, value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, tuple) and value[:1] == ("__dict__",):
+        return {k: _thaw(v) for k, v in value[1:]}
+    if isinstance(value, tuple) and value[:1] == ("__scalar__",):
+        return value[2]
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
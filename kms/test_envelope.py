@@ -0,0 +1,85 @@
+import base64
+import json
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+from kms.envelope import aesgcm, derive_subkeys, envelope_context, new_data_key, open_envelope, seal, sealed_size
+from mocks.mocks import LocalKms
+
+CONTEXT = envelope_context("app")
+
+
+@pytest.fixture
+def kms():
+    return LocalKms()
+
+
+@pytest.fixture
+def data_key():
+    return new_data_key()
+
+
+def wrap(kms, data_key):
+    # What aws.kms.Ciphertext stores: the base64 text of the data key, wrapped
+    blob = kms.encrypt(KeyId="key", Plaintext=base64.b64encode(data_key), EncryptionContext=CONTEXT)
+    return base64.b64encode(blob["CiphertextBlob"]).decode("ascii")
+
+
+def unwrapper(kms):
+    return lambda wrapped, context: base64.b64decode(
+        kms.decrypt(CiphertextBlob=wrapped, EncryptionContext=context)["Plaintext"])
+
+
+@pytest.mark.parametrize("plaintext", [b"short", b"x" * 4096])
+def test_sealed_values_open_and_fit_the_size_bound(kms, data_key, plaintext):
+    sealed = seal(plaintext, data_key, wrap(kms, data_key), "/app/db", CONTEXT)
+
+    assert open_envelope(sealed, unwrapper(kms), "/app/db") == plaintext
+    assert len(sealed) <= sealed_size(plaintext, "/app/db", CONTEXT)
+
+
+def test_equal_inputs_seal_to_equal_values(kms, data_key):
+    wrapped = wrap(kms, data_key)
+    assert seal(b"value", data_key, wrapped, "/a", CONTEXT) == seal(b"value", data_key, wrapped, "/a", CONTEXT)
+    assert seal(b"value", data_key, wrapped, "/a", CONTEXT) != seal(b"value", data_key, wrapped, "/b", CONTEXT)
+
+
+def test_data_key_is_only_used_through_subkeys(kms, data_key):
+    encryption_key, nonce_key = derive_subkeys(data_key)
+    assert len({data_key, encryption_key, nonce_key}) == 3
+    assert derive_subkeys(data_key) == (encryption_key, nonce_key)
+
+    document = json.loads(seal(b"value", data_key, wrap(kms, data_key), "/p", CONTEXT))
+    header = {name: document[name] for name in ("v", "alg", "ctx", "dk", "kc", "zip")}
+    aad = json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    nonce, ciphertext = base64.b64decode(document["iv"]), base64.b64decode(document["ct"])
+    assert document["v"] == 2
+    assert aesgcm(encryption_key).decrypt(nonce, ciphertext, aad) == b"value"
+    with pytest.raises(InvalidTag):
+        aesgcm(data_key).decrypt(nonce, ciphertext, aad)
+
+
+def test_version_1_envelopes_still_open(kms, data_key):
+    # Sealed with the data key itself, before subkeys were derived
+    header = {"v": 1, "alg": "A256GCM", "ctx": "/p", "dk": wrap(kms, data_key), "kc": CONTEXT, "zip": None}
+    aad = json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    nonce = b"\0" * 12
+    ciphertext = aesgcm(data_key).encrypt(nonce, b"value", aad)
+    sealed = json.dumps({**header, "iv": base64.b64encode(nonce).decode(), "ct": base64.b64encode(ciphertext).decode()})
+    assert open_envelope(sealed, unwrapper(kms), "/p") == b"value"
+
+
+def test_values_only_open_for_their_context(kms, data_key):
+    sealed = seal(b"value", data_key, wrap(kms, data_key), "/p", CONTEXT)
+    with pytest.raises(ValueError, match="sealed for '/p', not '/other'"):
+        open_envelope(sealed, unwrapper(kms), "/other")
+
+
+def test_local_kms_binds_the_encryption_context(kms):
+    blob = kms.encrypt(KeyId="key", Plaintext=b"data", EncryptionContext=CONTEXT)["CiphertextBlob"]
+
+    assert kms.decrypt(CiphertextBlob=blob, EncryptionContext=CONTEXT)["Plaintext"] == b"data"
+    with pytest.raises(InvalidTag):
+        kms.decrypt(CiphertextBlob=blob, EncryptionContext=envelope_context("other"))
+    assert kms.calls == {"Encrypt": 1, "Decrypt": 2}
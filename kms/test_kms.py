@@ -0,0 +1,114 @@
+import base64
+import json
+
+import pulumi
+import pytest
+
+from config_client.config_client import EnvelopeDecryptor
+from invoke_cache.invoke_cache import invoke_cache
+from kms.envelope import new_data_key
+from kms.kms import EnvelopeKey, KmsModule
+from mocks.mocks import AwsMocks, LocalKms, set_aws_mocks
+from regions.providers import clear_providers
+from ssm_parameter.ssm import SsmParameter
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks(kms=LocalKms()))
+
+
+def registered(mocks, typ):
+    return {r.name: r.inputs for r in mocks.resources if r.typ == typ}
+
+
+def test_replicas_follow_a_multi_region_primary(mocks):
+    @pulumi.runtime.test
+    def build():
+        kms = KmsModule(name="app", enabled_service_identifiers=["ssm"], multi_region=True,
+                        replica_regions=["us-west-2", "eu-west-1"])
+        return pulumi.Output.all(kms.key_ids_by_region, kms.alias_arns_by_region).apply(check)
+
+    def check(values):
+        key_ids, alias_arns = values
+        assert key_ids == {"us-east-2": "app-key-id", "us-west-2": "app-key-us-west-2-id",
+                           "eu-west-1": "app-key-eu-west-1-id"}
+        assert ":eu-west-1:" in alias_arns["eu-west-1"]
+
+        keys = registered(mocks, "aws:kms/key:Key")
+        assert keys["app-key"]["multiRegion"] is True
+        replicas = registered(mocks, "aws:kms/replicaKey:ReplicaKey")
+        assert set(replicas) == {"app-key-us-west-2", "app-key-eu-west-1"}
+
+        # Each replica carries the primary's policy rendered for its own region
+        primary_policy = keys["app-key"]["policy"]
+        replica_policy = replicas["app-key-us-west-2"]["policy"]
+        assert replica_policy == primary_policy.replace("us-east-2", "us-west-2")
+        assert json.loads(replica_policy)["Statement"][1]["Condition"]["StringEquals"]["kms:ViaService"] == \
+            ["ssm.us-west-2.amazonaws.com"]
+
+    build()
+
+
+def test_single_region_key_by_default(mocks):
+    @pulumi.runtime.test
+    def build():
+        return KmsModule(name="app").kms_key.id.apply(lambda _: check())
+
+    def check():
+        assert "multiRegion" not in registered(mocks, "aws:kms/key:Key")["app-key"]
+        assert registered(mocks, "aws:kms/replicaKey:ReplicaKey") == {}
+
+    build()
+
+
+def test_replica_providers_copy_the_provider_args(mocks):
+    @pulumi.runtime.test
+    def build():
+        kms = KmsModule(name="app", multi_region=True, replica_regions=["us-west-2"],
+                        provider_args={"profile": "deploy", "region": "us-east-2"})
+        return kms.replica_keys["us-west-2"].id.apply(lambda _: check())
+
+    def check():
+        provider = registered(mocks, "pulumi:providers:aws")["aws-us-west-2"]
+        assert (provider["region"], provider["profile"]) == ("us-west-2", "deploy")
+
+    build()
+
+
+def test_replicas_require_multi_region(mocks):
+    with pytest.raises(ValueError, match="need multi_region=True"):
+        pulumi.runtime.test(lambda: KmsModule(name="app", replica_regions=["us-west-2"]))()
+
+
+def test_replica_regions_exclude_the_primary(mocks):
+    with pytest.raises(ValueError, match="include the primary region"):
+        pulumi.runtime.test(lambda: KmsModule(name="app", multi_region=True, replica_regions=["us-east-2"]))()
+
+
+def test_sealed_parameters_open_with_one_decrypt(mocks):
+    data_key = base64.b64encode(new_data_key()).decode("ascii")
+
+    @pulumi.runtime.test
+    def build():
+        key = EnvelopeKey("app-envelope", kms_key_id="app-key-id", data_key=data_key)
+        parameters = [SsmParameter(f"app/p{i}", value=f"value-{i}", envelope=key) for i in range(20)]
+        return pulumi.Output.all(*[p.parameter.value for p in parameters]).apply(check)
+
+    def check(sealed):
+        decryptor = EnvelopeDecryptor(kms_client=mocks.kms)
+        for _ in range(5):
+            assert [decryptor.decrypt_text(value, f"/app/p{i}") for i, value in enumerate(sealed)] == \
+                [f"value-{i}" for i in range(20)]
+        assert mocks.kms.calls["Decrypt"] == 1
+        assert decryptor.stats()["key_hits"] == 99
+        assert registered(mocks, "aws:ssm/parameter:Parameter")["app/p0-param"]["type"] == "String"
+
+    build()
+
+
+def test_envelope_keys_need_a_data_key(mocks):
+    with pytest.raises(ValueError, match="needs a data_key"):
+        pulumi.runtime.test(lambda: EnvelopeKey("app-envelope", kms_key_id="app-key-id", data_key=None))()
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from kms.policy import PolicyDocument, _render, canonical_statement, statement
+
+
+def rendered(document):
+    return json.loads(document.to_json())["Statement"]
+
+
+def test_statements_are_canonical():
+    raw = {"Resource": "*", "Action": ["kms:Encrypt", "kms:Decrypt", "kms:Encrypt"], "Effect": "Allow",
+           "Principal": {"Service": ["logs.amazonaws.com"], "AWS": "arn:aws:iam::123456789012:root"}}
+    assert list(canonical_statement(raw).items()) == [
+        ("Effect", "Allow"),
+        ("Principal", {"AWS": ["arn:aws:iam::123456789012:root"], "Service": ["logs.amazonaws.com"]}),
+        ("Action", ["kms:Decrypt", "kms:Encrypt"]),
+        ("Resource", ["*"]),
+    ]
+    with pytest.raises(ValueError, match=r"Unsupported policy statement fields: \['Actions'\]"):
+        canonical_statement({"Effect": "Allow", "Actions": ["kms:*"]})
+
+
+def test_condition_values_keep_their_json_types():
+    document = PolicyDocument([statement(sid="DenyInsecure", effect="Deny", actions=["kms:*"], conditions=[
+        {"test": "Bool", "variable": "aws:SecureTransport", "values": [False]},
+        {"test": "NumericLessThan", "variable": "kms:RecipientAttestation:ImageSha384", "values": [2, 1, 2]},
+        {"test": "StringEquals", "variable": "kms:CallerAccount", "values": "123456789012"},
+    ])])
+
+    [denied] = rendered(document)
+    assert denied["Condition"] == {
+        "Bool": {"aws:SecureTransport": [False]},
+        "NumericLessThan": {"kms:RecipientAttestation:ImageSha384": [1, 2]},
+        "StringEquals": {"kms:CallerAccount": ["123456789012"]},
+    }
+    assert '"aws:SecureTransport": [\n            false' in document.to_json()
+
+
+def test_mixed_values_sort_by_type_and_stay_distinct():
+    [condition] = rendered(PolicyDocument([statement(actions=["kms:*"], conditions=[
+        {"test": "ForAnyValue:StringEquals", "variable": "x", "values": ["true", True, 1, "1", 1]},
+    ])]))
+    assert condition["Condition"]["ForAnyValue:StringEquals"]["x"] == [True, 1, "1", "true"]
+
+
+def test_equal_statements_are_added_once_and_sids_stay_unique():
+    document = PolicyDocument()
+    document.add(statement(sid="A", actions=["kms:Decrypt"]))
+    document.add(statement(sid="A", actions=["kms:Decrypt"]))
+    assert len(document.statements) == 1
+
+    with pytest.raises(ValueError, match="Sid 'A' is used by two different statements"):
+        document.add(statement(sid="A", actions=["kms:Encrypt"]))
+
+
+def test_merge_replaces_statements_by_sid():
+    document = PolicyDocument([statement(sid="A", actions=["kms:Decrypt"]), statement(sid="B", actions=["kms:*"])])
+    document.merge(json.dumps({"Statement": [
+        {"Sid": "B", "Effect": "Deny", "Action": "kms:ScheduleKeyDeletion", "Resource": "*"},
+        {"Sid": "C", "Effect": "Allow", "Action": "kms:Encrypt", "Resource": "*"},
+    ]}))
+
+    assert [(s["Sid"], s["Effect"]) for s in rendered(document)] == [("A", "Allow"), ("B", "Deny"), ("C", "Allow")]
+    with pytest.raises(ValueError, match="Sid 'A'"):
+        document.merge({"Statement": {"Sid": "A", "Effect": "Deny", "Action": "kms:*"}}, override=False)
+
+
+def test_render_is_memoized_without_mixing_up_value_types():
+    _render.cache_clear()
+    first = PolicyDocument([statement(actions=["kms:*"], conditions=[{"test": "Bool", "variable": "v", "values": [True]}])])
+    second = PolicyDocument([statement(actions=["kms:*"], conditions=[{"test": "Bool", "variable": "v", "values": [1]}])])
+
+    assert first.to_json() is first.to_json()
+    assert rendered(second)[0]["Condition"]["Bool"]["v"] == [1]
+    assert _render.cache_info().hits == 1 and _render.cache_info().misses == 2
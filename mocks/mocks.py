@@ -0,0 +1,155 @@
+import base64
+import json
+import os
+import struct
+import pulumi
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from kms.envelope import aesgcm
+
+DEFAULT_ACCOUNT_ID = "123456789012"
+DEFAULT_REGION = "us-east-2"
+IPV6_CIDR_BLOCK = "2600:1f16:abc:de00::/56"
+
+
+class LocalKms:
+    # Offline stand-in for the boto3 KMS client calls made around envelope
+    # encryption. Blobs are AES-GCM under one in-memory master key and bound to
+    # the key id and encryption context, like real KMS ciphertexts.
+    def __init__(self, master_key: Optional[bytes] = None):
+        self._master_key = master_key or os.urandom(32)
+        self.calls: Counter = Counter()
+
+    def encrypt(self, KeyId: str, Plaintext: bytes, EncryptionContext: Optional[Dict[str, str]] = None, **kwargs):
+        self.calls["Encrypt"] += 1
+        return {"CiphertextBlob": self._wrap(KeyId, Plaintext, EncryptionContext), "KeyId": KeyId}
+
+    def generate_data_key(self, KeyId: str, KeySpec: str = "AES_256",
+                          EncryptionContext: Optional[Dict[str, str]] = None, **kwargs):
+        self.calls["GenerateDataKey"] += 1
+        plaintext = os.urandom(32 if KeySpec == "AES_256" else 16)
+        return {"CiphertextBlob": self._wrap(KeyId, plaintext, EncryptionContext), "Plaintext": plaintext, "KeyId": KeyId}
+
+    def decrypt(self, CiphertextBlob: bytes, EncryptionContext: Optional[Dict[str, str]] = None, **kwargs):
+        self.calls["Decrypt"] += 1
+        (key_id_length,) = struct.unpack(">H", CiphertextBlob[:2])
+        key_id = CiphertextBlob[2:2 + key_id_length].decode("utf-8")
+        nonce, ciphertext = CiphertextBlob[2 + key_id_length:14 + key_id_length], CiphertextBlob[14 + key_id_length:]
+        # Raises InvalidTag for a different encryption context, as KMS raises InvalidCiphertextException
+        plaintext = aesgcm(self._master_key).decrypt(nonce, ciphertext, self._aad(key_id, EncryptionContext))
+        return {"Plaintext": plaintext, "KeyId": key_id}
+
+    def _wrap(self, key_id: str, plaintext: bytes, context: Optional[Dict[str, str]]) -> bytes:
+        nonce = os.urandom(12)
+        ciphertext = aesgcm(self._master_key).encrypt(nonce, plaintext, self._aad(key_id, context))
+        encoded_key_id = key_id.encode("utf-8")
+        return struct.pack(">H", len(encoded_key_id)) + encoded_key_id + nonce + ciphertext
+
+    @staticmethod
+    def _aad(key_id: str, context: Optional[Dict[str, str]]) -> bytes:
+        return json.dumps([key_id, context or {}], sort_keys=True).encode("utf-8")
+
+
+class AwsMocks(pulumi.runtime.Mocks):
+    # Offline stand-in for the engine and the AWS provider. Records every
+    # registration and invoke so callers can count them afterwards.
+    def __init__(self,
+                 region: str = DEFAULT_REGION,
+                 account_id: str = DEFAULT_ACCOUNT_ID,
+                 partition: str = "aws",
+                 az_count: int = 3,
+                 kms: Optional[LocalKms] = None):  # wraps aws.kms.Ciphertext plaintexts for real when set
+        self.region = region
+        self.account_id = account_id
+        self.partition = partition
+        self.az_count = az_count
+        self.kms = kms
+        self.resources: List[pulumi.runtime.MockResourceArgs] = []
+        self.calls: List[pulumi.runtime.MockCallArgs] = []
+        self.provider_regions: Dict[str, str] = {}
+
+    @property
+    def resource_count(self) -> int:
+        return sum(1 for r in self.resources if r.custom)
+
+    @property
+    def component_count(self) -> int:
+        return sum(1 for r in self.resources if not r.custom)
+
+    @property
+    def invoke_count(self) -> int:
+        return len(self.calls)
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        self.resources.append(args)
+        outputs = dict(args.inputs)
+
+        if args.typ == "pulumi:providers:aws" and outputs.get("region"):
+            self.provider_regions[args.name] = outputs["region"]
+
+        region = self.provider_regions.get(_provider_name(args.provider), self.region)
+        resource_id = f"{args.name}-id"
+        outputs.setdefault("arn", f"arn:{self.partition}:mock:{region}:{self.account_id}:{args.typ.split(':')[-1].lower()}/{resource_id}")
+
+        if args.typ == "aws:kms/key:Key" or args.typ == "aws:kms/replicaKey:ReplicaKey":
+            outputs.setdefault("keyId", resource_id)
+        if args.typ == "aws:ec2/vpcIpv6CidrBlockAssociation:VpcIpv6CidrBlockAssociation":
+            outputs.setdefault("ipv6CidrBlock", IPV6_CIDR_BLOCK)
+        if args.typ == "aws:ssm/parameter:Parameter":
+            outputs.setdefault("version", 1)
+        if args.typ == "aws:kms/ciphertext:Ciphertext":
+            outputs.setdefault("ciphertextBlob", self._ciphertext_blob(args.inputs))
+
+        return resource_id, outputs
+
+    def _ciphertext_blob(self, inputs: Dict[str, Any]) -> str:
+        plaintext = inputs.get("plaintext", "")
+        if isinstance(plaintext, dict):
+            # Secret inputs reach the mocks as {<secret signature>: ..., "value": ...}
+            plaintext = plaintext["value"]
+        plaintext = plaintext.encode("utf-8")
+        if self.kms is None:
+            return base64.b64encode(b"mock-ciphertext:" + plaintext).decode("ascii")
+        blob = self.kms.encrypt(KeyId=inputs.get("keyId"), Plaintext=plaintext, EncryptionContext=inputs.get("context"))
+        return base64.b64encode(blob["CiphertextBlob"]).decode("ascii")
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        self.calls.append(args)
+        region = self.provider_regions.get(_provider_name(args.provider), self.region)
+
+        if args.token == "aws:index/getRegion:getRegion":
+            return {"id": region, "name": region, "endpoint": f"ec2.{region}.amazonaws.com",
+                    "description": region}
+        if args.token == "aws:index/getCallerIdentity:getCallerIdentity":
+            return {"id": self.account_id, "accountId": self.account_id,
+                    "arn": f"arn:{self.partition}:iam::{self.account_id}:root", "userId": self.account_id}
+        if args.token == "aws:index/getPartition:getPartition":
+            return {"id": self.partition, "partition": self.partition, "dnsSuffix": "amazonaws.com",
+                    "reverseDnsPrefix": "com.amazonaws"}
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            names = [f"{region}{chr(ord('a') + i)}" for i in range(self.az_count)]
+            return {"id": region, "names": names, "zoneIds": [f"{region}-az{i + 1}" for i in range(self.az_count)],
+                    "groupNames": [region] * self.az_count}
+        if args.token == "aws:iam/getPolicyDocument:getPolicyDocument":
+            document = json.dumps({"Version": "2012-10-17", "Statement": args.args.get("statements", [])},
+                                  sort_keys=True, default=str)
+            return {"id": "policy", "json": document, "minifiedJson": document}
+
+        return {}
+
+
+def _provider_name(provider: Optional[str]) -> Optional[str]:
+    # Provider references look like "urn:pulumi:stack::project::pulumi:providers:aws::name::id"
+    if not provider:
+        return None
+    parts = provider.split("::")
+    return parts[3] if len(parts) > 3 else None
+
+
+def set_aws_mocks(mocks: Optional[AwsMocks] = None,
+                  project: str = "aws-intro",
+                  stack: str = "mock",
+                  preview: bool = False) -> AwsMocks:
+    mocks = mocks or AwsMocks()
+    pulumi.runtime.set_mocks(mocks, project=project, stack=stack, preview=preview)
+    return mocks
@@ -0,0 +1,198 @@
+import ipaddress
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
+
+from vpc_acl.rule_compiler import NaclRule
+from vpc_subnet.ipam import SubnetPlan
+from vpc_nat.placement import NatPlacement
+
+# Rule number reported when no rule matched and the implicit "*" deny applied
+DEFAULT_DENY_RULE = 32767
+# Rule number reported for subnets left on the VPC's default (allow all) ACL
+DEFAULT_ACL_RULE = 0
+NO_ROUTE = "blackhole"
+# Flows are evaluated in chunks so the rules x flows match matrix stays small
+CHUNK_SIZE = 1 << 16
+
+PROTOCOL_NUMBERS = {"all": -1, "-1": -1, "icmp": 1, "tcp": 6, "udp": 17}
+
+Addresses = Union[np.ndarray, Sequence[str], Sequence[int]]
+
+
+def to_uint32(addresses: Addresses) -> np.ndarray:
+    if isinstance(addresses, np.ndarray) and addresses.dtype != object:
+        return addresses.astype(np.uint32)
+    return np.fromiter((int(ipaddress.IPv4Address(a)) for a in addresses), dtype=np.uint32, count=len(addresses))
+
+
+def to_protocols(protocols: Union[np.ndarray, Sequence]) -> np.ndarray:
+    if isinstance(protocols, np.ndarray) and protocols.dtype != object:
+        return protocols.astype(np.int16)
+    return np.array([PROTOCOL_NUMBERS.get(str(p).lower(), p) for p in protocols], dtype=np.int16)
+
+
+def _network_arrays(cidrs: Sequence[str]):
+    networks = [ipaddress.IPv4Network(c) for c in cidrs]
+    nets = np.array([int(n.network_address) for n in networks], dtype=np.uint32)
+    masks = np.array([int(n.netmask) for n in networks], dtype=np.uint32)
+    return nets, masks
+
+
+class NaclEvaluator:
+    # Evaluates one network ACL: rules in rule-number order, first match wins.
+    # IPv4 only; ICMP rules compare their icmp_type with the flow's port field.
+    def __init__(self, rules: Optional[Sequence[NaclRule]]):
+        self.default_acl = rules is None
+        self._directions = {}
+        for egress in (False, True):
+            selected = sorted((r for r in rules or [] if r.egress == egress and r.cidr_block), key=lambda r: r.number)
+            nets, masks = _network_arrays([r.cidr_block for r in selected])
+            self._directions[egress] = {
+                "nets": nets,
+                "masks": masks,
+                "protocols": np.array([int(r.protocol) for r in selected], dtype=np.int16),
+                "from_ports": np.array([r.from_port for r in selected], dtype=np.int32),
+                "to_ports": np.array([r.to_port for r in selected], dtype=np.int32),
+                "icmp_types": np.array([r.icmp_type for r in selected], dtype=np.int32),
+                "allow": np.array([r.action == "allow" for r in selected], dtype=bool),
+                "numbers": np.array([r.number for r in selected], dtype=np.int32),
+            }
+
+    def evaluate(self, addresses: np.ndarray, protocols: np.ndarray, ports: np.ndarray, egress: bool):
+        # addresses: the remote side (source for ingress, destination for egress)
+        size = len(addresses)
+        if self.default_acl:
+            return np.ones(size, dtype=bool), np.full(size, DEFAULT_ACL_RULE, dtype=np.int32)
+
+        rules = self._directions[egress]
+        allowed = np.zeros(size, dtype=bool)
+        numbers = np.full(size, DEFAULT_DENY_RULE, dtype=np.int32)
+        if len(rules["numbers"]) == 0:
+            return allowed, numbers
+
+        is_port_protocol = np.isin(rules["protocols"], (6, 17))[:, None]
+        is_icmp = (rules["protocols"] == 1)[:, None]
+        for start in range(0, size, CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, size)
+            addr, proto, port = addresses[start:end], protocols[start:end], ports[start:end]
+
+            match = (addr[None, :] & rules["masks"][:, None]) == rules["nets"][:, None]
+            match &= (rules["protocols"][:, None] == -1) | (rules["protocols"][:, None] == proto[None, :])
+            port_ok = (rules["from_ports"][:, None] <= port[None, :]) & (port[None, :] <= rules["to_ports"][:, None])
+            icmp_ok = (rules["icmp_types"][:, None] == -1) | (rules["icmp_types"][:, None] == port[None, :])
+            match &= np.where(is_port_protocol, port_ok, np.where(is_icmp, icmp_ok, True))
+
+            matched = match.any(axis=0)
+            first = match.argmax(axis=0)
+            allowed[start:end] = matched & rules["allow"][first]
+            numbers[start:end] = np.where(matched, rules["numbers"][first], DEFAULT_DENY_RULE)
+
+        return allowed, numbers
+
+
+class PrefixTable:
+    # Vectorized longest-prefix match of addresses against a set of CIDRs
+    def __init__(self, cidrs: Sequence[str]):
+        order = sorted(range(len(cidrs)), key=lambda i: -ipaddress.IPv4Network(cidrs[i]).prefixlen)
+        self.order = np.array(order, dtype=np.int32)
+        self.nets, self.masks = _network_arrays([cidrs[i] for i in order])
+
+    def lookup(self, addresses: np.ndarray) -> np.ndarray:
+        # Index into the original cidrs, or -1 when nothing matches
+        result = np.full(len(addresses), -1, dtype=np.int32)
+        if len(self.order) == 0:
+            return result
+        for start in range(0, len(addresses), CHUNK_SIZE):
+            addr = addresses[start:start + CHUNK_SIZE]
+            match = (addr[None, :] & self.masks[:, None]) == self.nets[:, None]
+            matched = match.any(axis=0)
+            result[start:start + CHUNK_SIZE] = np.where(matched, self.order[match.argmax(axis=0)], -1)
+        return result
+
+
+@dataclass
+class SubnetModel:
+    name: str
+    cidr: str
+    # None means the subnet stays on the default ACL, which allows everything
+    acl_rules: Optional[List[NaclRule]] = None
+    # destination cidr -> target ("local", "igw", "nat-us-east-2a", ...)
+    routes: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class SimulationResult:
+    allowed: np.ndarray
+    # The rule that decided each flow: the denying rule, else the ingress rule, else the egress rule
+    deciding_rule: np.ndarray
+    egress_rule: np.ndarray
+    ingress_rule: np.ndarray
+    route_target: np.ndarray
+    src_subnet: np.ndarray
+    dst_subnet: np.ndarray
+
+
+class NetworkSimulator:
+    def __init__(self, subnets: Sequence[SubnetModel]):
+        self.subnets = list(subnets)
+        self._subnet_table = PrefixTable([s.cidr for s in self.subnets])
+        self._acls = [NaclEvaluator(s.acl_rules) for s in self.subnets]
+        self._routes = []
+        for subnet in self.subnets:
+            destinations = list(subnet.routes)
+            self._routes.append((PrefixTable(destinations), np.array([subnet.routes[d] for d in destinations] + [NO_ROUTE])))
+
+    def simulate(self, src: Addresses, dst: Addresses, protocols, ports) -> SimulationResult:
+        src, dst = to_uint32(src), to_uint32(dst)
+        protocols = to_protocols(protocols)
+        ports = np.asarray(ports, dtype=np.int32)
+        size = len(src)
+
+        src_subnet = self._subnet_table.lookup(src)
+        dst_subnet = self._subnet_table.lookup(dst)
+        egress_allowed = np.ones(size, dtype=bool)
+        ingress_allowed = np.ones(size, dtype=bool)
+        egress_rule = np.full(size, DEFAULT_ACL_RULE, dtype=np.int32)
+        ingress_rule = np.full(size, DEFAULT_ACL_RULE, dtype=np.int32)
+        route_target = np.full(size, "external", dtype=object)
+
+        # NACLs only apply when traffic crosses a subnet boundary
+        crossing = src_subnet != dst_subnet
+        for i, acl in enumerate(self._acls):
+            leaving = (src_subnet == i) & crossing
+            if leaving.any():
+                egress_allowed[leaving], egress_rule[leaving] = acl.evaluate(
+                    dst[leaving], protocols[leaving], ports[leaving], egress=True)
+                table, targets = self._routes[i]
+                route_target[leaving] = targets[table.lookup(dst[leaving])]
+
+            entering = (dst_subnet == i) & crossing
+            if entering.any():
+                ingress_allowed[entering], ingress_rule[entering] = acl.evaluate(
+                    src[entering], protocols[entering], ports[entering], egress=False)
+
+        route_target[~crossing] = "local"
+        routed = route_target != NO_ROUTE
+        allowed = egress_allowed & ingress_allowed & routed
+        deciding_rule = np.where(~egress_allowed, egress_rule, np.where(~ingress_allowed | (dst_subnet >= 0), ingress_rule, egress_rule))
+
+        return SimulationResult(allowed, deciding_rule.astype(np.int32), egress_rule, ingress_rule,
+                                route_target, src_subnet, dst_subnet)
+
+
+def model_from_plan(subnet_plan: SubnetPlan,
+                    acl_rules: Optional[Dict[str, List[NaclRule]]] = None,
+                    nat_placement: Optional[NatPlacement] = None) -> List[SubnetModel]:
+    # Mirrors the routes VpcSubnets and NatGateway create for a planned VPC
+    acl_rules = acl_rules or {}
+    models = []
+    for tier, by_az in subnet_plan.subnets.items():
+        for az, cidr in by_az.items():
+            routes = {subnet_plan.vpc_cidr: "local"} if subnet_plan.vpc_cidr else {}
+            if tier == "public":
+                routes["0.0.0.0/0"] = "igw"
+            elif tier == "private" and nat_placement is not None and az in nat_placement.routes:
+                routes["0.0.0.0/0"] = f"nat-{nat_placement.routes[az]}"
+            models.append(SubnetModel(name=f"{tier}-{az}", cidr=cidr, acl_rules=acl_rules.get(tier), routes=routes))
+    return models
@@ -0,0 +1,78 @@
+import ipaddress
+
+from network_sim.simulator import DEFAULT_ACL_RULE, DEFAULT_DENY_RULE, NO_ROUTE, NetworkSimulator, SubnetModel, model_from_plan
+from vpc_acl.rule_compiler import compile_rules
+from vpc_nat.placement import plan_nat_placement
+from vpc_subnet.ipam import plan_subnets
+
+VPC_ROUTES = {"10.0.0.0/16": "local"}
+
+
+def rule(number, action, cidr, protocol="-1", port=0, direction="ingress"):
+    return {"number": number, "action": action, "direction": direction, "ipv4_cidr": cidr,
+            "protocol": protocol, "from_port": port, "to_port": port}
+
+
+def simulator(rules):
+    return NetworkSimulator([
+        SubnetModel("app", "10.0.1.0/24", acl_rules=None, routes=VPC_ROUTES),
+        SubnetModel("db", "10.0.2.0/24", acl_rules=compile_rules(rules), routes=VPC_ROUTES),
+    ])
+
+
+def test_first_matching_rule_by_number_wins():
+    sim = simulator({
+        "allow-vpc": rule(200, "allow", "10.0.0.0/16"),
+        "deny-ssh": rule(100, "deny", "10.0.1.0/24", protocol="tcp", port=22),
+    })
+    result = sim.simulate(["10.0.1.5", "10.0.1.5"], ["10.0.2.9", "10.0.2.9"], ["tcp", "tcp"], [22, 5432])
+
+    assert result.allowed.tolist() == [False, True]
+    assert result.ingress_rule.tolist() == [100, 200]
+    assert result.deciding_rule.tolist() == [100, 200]
+
+
+def test_unmatched_flows_hit_the_implicit_deny():
+    sim = simulator({"allow-postgres": rule(100, "allow", "10.0.1.0/24", protocol="tcp", port=5432)})
+    result = sim.simulate(["10.0.1.5"], ["10.0.2.9"], ["udp"], [5432])
+
+    assert not result.allowed[0]
+    assert result.deciding_rule[0] == DEFAULT_DENY_RULE
+
+
+def test_default_acl_allows_and_reports_rule_zero():
+    sim = simulator({"allow-all-out": rule(100, "allow", "0.0.0.0/0", direction="egress")})
+    result = sim.simulate(["10.0.2.9"], ["10.0.1.5"], ["tcp"], [443])
+
+    assert result.allowed[0]
+    assert result.egress_rule[0] == 100
+    assert result.ingress_rule[0] == DEFAULT_ACL_RULE
+
+
+def test_traffic_within_a_subnet_skips_acls():
+    sim = simulator({})
+    result = sim.simulate(["10.0.2.8"], ["10.0.2.9"], ["tcp"], [22])
+
+    assert result.allowed[0]
+    assert result.route_target[0] == "local"
+
+
+def test_flows_without_a_route_are_dropped():
+    sim = simulator({})
+    result = sim.simulate(["10.0.1.5"], ["8.8.8.8"], ["udp"], [53])
+
+    assert not result.allowed[0]
+    assert result.route_target[0] == NO_ROUTE
+
+
+def test_model_from_plan_routes_private_subnets_through_their_nat():
+    azs = ["us-east-2a", "us-east-2b"]
+    plan = plan_subnets("10.0.0.0/16", azs, {"public": 24, "private": 20})
+    placement = plan_nat_placement(azs, azs, mode="single")
+    sim = NetworkSimulator(model_from_plan(plan, nat_placement=placement))
+
+    source = str(ipaddress.ip_network(plan.subnets["private"]["us-east-2b"])[10])
+    result = sim.simulate([source], ["1.1.1.1"], ["tcp"], [443])
+
+    assert result.allowed[0]
+    assert result.route_target[0] == "nat-us-east-2a"
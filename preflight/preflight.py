@@ -0,0 +1,275 @@
+import json
+import string
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from kms.envelope import envelope_context, sealed_size
+from preflight.quotas import Quota, QuotaTable
+from ssm_parameter.tree_loader import STANDARD_MAX_BYTES
+from vpc_acl.rule_compiler import MAX_RULE_NUMBER, NaclRule, compile_rules
+from vpc_factory.planner import VpcPlan
+from vpc_nat.placement import plan_nat_placement
+from vpc_subnet.routing import plan_route_tables
+
+# Region label when the program's region is not configured
+DEFAULT_REGION = "default"
+# NatBypassEndpoints attaches one gateway endpoint per service
+GATEWAY_SERVICES = ("s3", "dynamodb")
+# Contributors listed per violation, largest first
+MAX_SOURCES_SHOWN = 5
+
+Zones = Union[int, Sequence[str]]  # AZ names, or a count when they are looked up at deploy time
+
+
+class QuotaExceededError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Violation:
+    quota: Quota
+    scope: str  # e.g. "us-east-2", "us-east-2/core-vpc" or "us-east-2a"
+    limit: int
+    demand: int
+    sources: Tuple[Tuple[str, int], ...]  # (component, amount), largest first
+
+    def __str__(self) -> str:
+        shown = ", ".join(f"{source}: {amount}" for source, amount in self.sources[:MAX_SOURCES_SHOWN])
+        if len(self.sources) > MAX_SOURCES_SHOWN:
+            shown += f", +{len(self.sources) - MAX_SOURCES_SHOWN} more"
+        return f"{self.quota.description} ({self.quota.name}) in {self.scope}: {self.demand} > {self.limit} ({shown})"
+
+
+@dataclass(frozen=True)
+class PreflightReport:
+    checked: int  # (quota, scope) pairs with any demand
+    violations: Tuple[Violation, ...]
+    assumed_zones: Dict[str, Tuple[str, ...]] = field(default_factory=dict)  # region -> AZ names that were guessed
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def summary(self) -> str:
+        # Per-AZ quotas were checked against guessed AZ names unless the real ones were given
+        lines = [f"preflight: assumed the AZs of {region} are {', '.join(zones)}; set 'preflightAzs' to the "
+                 f"region's AZ names to check per-AZ quotas against the real ones"
+                 for region, zones in sorted(self.assumed_zones.items())]
+        if self.ok:
+            return "\n".join(lines + [f"preflight: {self.checked} quota checks passed"])
+        lines.append(f"preflight: {len(self.violations)} of {self.checked} quota checks failed")
+        lines.extend(f"  {violation}" for violation in self.violations)
+        lines.append("Adjusted or partly used quotas can be set with the 'quotas' stack config")
+        return "\n".join(lines)
+
+    def raise_for_violations(self):
+        if self.violations:
+            raise QuotaExceededError(self.summary())
+
+
+class Preflight:
+    # Adds up what each component will create, computed from its inputs with
+    # the same pure planners the components use, and checks the totals against
+    # a QuotaTable. Nothing is imported from pulumi_aws and no provider is
+    # called, so quota failures surface in milliseconds instead of half-way
+    # through an update. The estimators mirror the component constructors.
+    def __init__(self,
+                 quotas: Optional[QuotaTable] = None,
+                 region: Optional[str] = None,
+                 azs: Optional[Mapping[str, Sequence[str]]] = None):  # region -> AZ names, in lookup order
+        self.quotas = quotas or QuotaTable()
+        self.region = region or DEFAULT_REGION
+        self.azs = {name: list(zones) for name, zones in (azs or {}).items()}
+        self.assumed_zones: Dict[str, Tuple[str, ...]] = {}
+        # (quota, region, scope) -> component -> amount
+        self.demands: Dict[Tuple[str, str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def demand(self, quota: str, amount: int, source: str, scope: Optional[str] = None, region: Optional[str] = None):
+        # Region-scoped quotas default to the region itself as the scope
+        if quota not in self.quotas.quotas:
+            raise ValueError(f"Unknown quota {quota!r}; known quotas: {sorted(self.quotas.quotas)}")
+        region = region or self.region
+        self.demands[(quota, region, scope or region)][source] += amount
+
+    def zones(self, azs: Zones, region: Optional[str] = None) -> List[str]:
+        # VpcSubnets takes the first az_count zones the region lists. Without
+        # the region's AZ names they are assumed to be its "a", "b", "c"...,
+        # which the report states, since accounts can differ.
+        if not isinstance(azs, int):
+            return list(azs)
+        region = region or self.region
+        if region in self.azs:
+            if len(self.azs[region]) < azs:
+                raise ValueError(f"{azs} AZs are needed in {region}, but only {self.azs[region]} are given")
+            return self.azs[region][:azs]
+        zones = tuple(f"{region}{letter}" for letter in string.ascii_lowercase[:azs])
+        if len(zones) > len(self.assumed_zones.get(region, ())):
+            self.assumed_zones[region] = zones
+        return list(zones)
+
+    def _vpc_scope(self, vpc: str, region: Optional[str]) -> str:
+        return f"{region or self.region}/{vpc}"
+
+    def vpc(self, name: str, region: Optional[str] = None):
+        # VpcOnly; AWS adds a main route table, a default network ACL and a default security group
+        scope = self._vpc_scope(name, region)
+        self.demand("vpcs_per_region", 1, name, region=region)
+        self.demand("route_tables_per_vpc", 1, f"{name} (main)", scope, region)
+        self.demand("network_acls_per_vpc", 1, f"{name} (default)", scope, region)
+        self.demand("security_groups_per_region", 1, f"{name} (default)", region=region)
+
+    def subnets(self,
+                name: str,
+                vpc: str,
+                azs: Zones = 3,
+                tiers: Sequence[str] = ("public", "private"),
+                route_table_mode: str = "per_az",
+                nat_azs: Optional[Sequence[str]] = None,
+                enable_ipv6: bool = False,
+                region: Optional[str] = None) -> Dict[str, str]:
+        # VpcSubnets; returns its private route table plan (AZ -> table key)
+        zones = self.zones(azs, region)
+        route_table_keys = plan_route_tables(zones, route_table_mode, nat_azs)
+        scope = self._vpc_scope(vpc, region)
+
+        route_tables = len(set(route_table_keys.values())) + ("public" in tiers) + ("isolated" in tiers)
+        self.demand("subnets_per_vpc", len(zones) * len(tiers), name, scope, region)
+        self.demand("route_tables_per_vpc", route_tables, name, scope, region)
+        if "public" in tiers:
+            self.demand("internet_gateways_per_region", 1, name, region=region)
+        if enable_ipv6:
+            self.demand("egress_only_internet_gateways_per_region", 1, name, region=region)
+        return route_table_keys
+
+    def nat_gateways(self,
+                     name: str,
+                     public_azs: Zones,
+                     route_table_azs: Optional[Sequence[str]] = None,  # private route table keys; the public AZs by default
+                     mode: str = "per_az",
+                     nat_count: Optional[int] = None,
+                     nat_azs: Optional[Sequence[str]] = None,
+                     region: Optional[str] = None) -> Tuple[str, ...]:
+        # NatGateway (AZ-keyed): one Elastic IP and one NAT gateway per NAT AZ
+        zones = self.zones(public_azs, region)
+        placement = plan_nat_placement(zones, list(route_table_azs) if route_table_azs is not None else zones,
+                                       mode, nat_count, nat_azs)
+        self.demand("eips_per_region", len(placement.nat_azs), name, region=region)
+        for az in placement.nat_azs:
+            self.demand("nat_gateways_per_az", 1, name, az, region)
+        return placement.nat_azs
+
+    def network_acl(self,
+                    name: str,
+                    vpc: str,
+                    rules: Optional[Dict[str, Dict[str, Any]]] = None,
+                    compiled_rules: Optional[List[NaclRule]] = None,
+                    auto_number: Optional[bool] = None,
+                    merge_rules: bool = True,
+                    region: Optional[str] = None):
+        # VpcAcl; compiled like the component does, but the rule count is checked here against the quota
+        if compiled_rules is None:
+            compiled_rules = compile_rules(rules or {}, auto_number=auto_number, merge=merge_rules,
+                                           max_rules_per_direction=MAX_RULE_NUMBER)
+        scope = self._vpc_scope(vpc, region)
+        self.demand("network_acls_per_vpc", 1, name, scope, region)
+        for egress, direction in ((False, "ingress"), (True, "egress")):
+            count = sum(1 for rule in compiled_rules if rule.egress == egress)
+            self.demand("rules_per_network_acl", count, name, f"{scope}/{name} {direction}", region)
+
+    def interface_endpoints(self,
+                            name: str,
+                            vpc: str,
+                            services: Sequence[str],
+                            subnets: int,  # subnets the endpoints are placed in
+                            region: Optional[str] = None):
+        # VpcEndpoint (Interface) or VpcEndpointSet: one security group, and a network interface per endpoint and subnet
+        scope = self._vpc_scope(vpc, region)
+        self.demand("interface_endpoints_per_vpc", len(services), name, scope, region)
+        self.demand("network_interfaces_per_region", len(services) * subnets, name, region=region)
+        self.demand("security_groups_per_region", 1, name, region=region)
+
+    def gateway_endpoints(self,
+                          name: str,
+                          vpc: str,
+                          services: Sequence[str] = GATEWAY_SERVICES,
+                          region: Optional[str] = None):
+        # VpcEndpoint (Gateway) or NatBypassEndpoints
+        self.demand("gateway_endpoints_per_vpc", len(services), name, self._vpc_scope(vpc, region), region)
+
+    def ssm_parameter(self,
+                      name: str,
+                      value: str,
+                      tier: Optional[str] = "Standard",  # None picks by value size, like SsmParameter
+                      path: Optional[str] = None,
+                      envelope: Optional[str] = None,  # EnvelopeKey name when the value is sealed
+                      region: Optional[str] = None) -> str:
+        # SsmParameter; returns the tier the value is stored in
+        path = path or f"/{name}"
+        data = value.encode("utf-8")
+        size = sealed_size(data, path, envelope_context(envelope)) if envelope else len(data)
+        if tier is None:
+            tier = "Standard" if size <= STANDARD_MAX_BYTES else "Advanced"
+
+        kind = "standard" if tier == "Standard" else "advanced"
+        self.demand(f"ssm_{kind}_value_bytes", size, name, f"{region or self.region}:{path}", region)
+        self.demand(f"ssm_{kind}_parameters_per_region", 1, name, region=region)
+        return tier
+
+    def secret(self,
+               name: str,
+               value: Union[str, Mapping[str, Any]],
+               envelope: Optional[str] = None,  # EnvelopeKey name when the value is sealed
+               region: Optional[str] = None):
+        # SecretManagerSecret
+        text = json.dumps(value) if isinstance(value, Mapping) else value
+        data = text.encode("utf-8")
+        size = sealed_size(data, name, envelope_context(envelope)) if envelope else len(data)
+        self.demand("secret_value_bytes", size, name, f"{region or self.region}:{name}", region)
+
+    def vpc_plan(self, plan: VpcPlan, region: Optional[str] = None):
+        # VpcEnvironment of the VPC factory
+        name = plan.name
+        self.vpc(name, region)
+        route_table_keys = self.subnets(f"{name}-network", name, plan.azs, tuple(plan.subnet_plan.subnets),
+                                        plan.route_table_mode, plan.nat_azs, region=region)
+        if plan.nat_mode != "none":
+            self.nat_gateways(f"{name}-nat", plan.azs, list(dict.fromkeys(route_table_keys.values())),
+                              plan.nat_mode, plan.nat_count, region=region)
+        for tier, rules in plan.acl_rules.items():
+            self.network_acl(f"{name}-{tier}-acl", name, compiled_rules=rules, region=region)
+
+        for endpoint in plan.endpoints:
+            if endpoint["type"] == "Gateway":
+                self.gateway_endpoints(f"{name}-{endpoint['name']}", name, [endpoint["service"]], region)
+        interface_services = [e["service"] for e in plan.endpoints if e["type"] == "Interface"]
+        if interface_services:
+            self.interface_endpoints(f"{name}-interface-endpoints", name, interface_services, len(plan.azs), region)
+
+    def regional_networks(self,
+                          name: str,
+                          regions: Sequence[str],
+                          az_count: int = 3,
+                          subnet_prefix_lengths: Optional[Dict[str, int]] = None,
+                          nat_mode: str = "per_az"):
+        # build_regional_networks: a RegionalNetwork per region
+        for region in regions:
+            network = f"{name}-{region}"
+            self.vpc(network, region)
+            tiers = tuple(subnet_prefix_lengths or {"public": 24, "private": 20})
+            route_table_keys = self.subnets(f"{network}-network", network, az_count, tiers, region=region)
+            if nat_mode != "none":
+                self.nat_gateways(f"{network}-nat", az_count, list(dict.fromkeys(route_table_keys.values())), nat_mode,
+                                  region=region)
+                self.gateway_endpoints(f"{network}-nat-bypass", network, GATEWAY_SERVICES, region)
+
+    def check(self) -> PreflightReport:
+        violations = []
+        for (quota, region, scope), sources in self.demands.items():
+            limit = self.quotas.limit(quota, region)
+            demand = sum(sources.values())
+            if demand > limit:
+                ranked = tuple(sorted(sources.items(), key=lambda item: (-item[1], item[0])))
+                violations.append(Violation(self.quotas.quotas[quota], scope, limit, demand, ranked))
+        return PreflightReport(checked=len(self.demands), violations=tuple(violations),
+                               assumed_zones=dict(self.assumed_zones))
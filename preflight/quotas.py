@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+from ssm_parameter.tree_loader import ADVANCED_MAX_BYTES, STANDARD_MAX_BYTES
+from secret_manager.bundle import SECRET_MAX_BYTES
+from vpc_acl.rule_compiler import MAX_RULES_PER_DIRECTION
+
+# What one limit applies to, e.g. every VPC has its own subnets_per_vpc
+SCOPES = ("region", "vpc", "az", "network_acl", "parameter", "secret")
+
+
+@dataclass(frozen=True)
+class Quota:
+    name: str
+    limit: int
+    scope: str
+    description: str
+
+
+# AWS defaults; most are adjustable through Service Quotas, so stacks override them
+DEFAULT_QUOTAS: Dict[str, Quota] = {quota.name: quota for quota in (
+    Quota("vpcs_per_region", 5, "region", "VPCs per Region"),
+    Quota("internet_gateways_per_region", 5, "region", "Internet gateways per Region"),
+    Quota("egress_only_internet_gateways_per_region", 5, "region", "Egress-only internet gateways per Region"),
+    Quota("eips_per_region", 5, "region", "Elastic IP addresses per Region"),
+    Quota("security_groups_per_region", 2500, "region", "VPC security groups per Region"),
+    Quota("network_interfaces_per_region", 5000, "region", "Network interfaces per Region"),
+    Quota("ssm_standard_parameters_per_region", 10000, "region", "Standard tier SSM parameters per Region"),
+    Quota("ssm_advanced_parameters_per_region", 100000, "region", "Advanced tier SSM parameters per Region"),
+    Quota("subnets_per_vpc", 200, "vpc", "Subnets per VPC"),
+    Quota("route_tables_per_vpc", 200, "vpc", "Route tables per VPC"),
+    Quota("network_acls_per_vpc", 200, "vpc", "Network ACLs per VPC"),
+    Quota("gateway_endpoints_per_vpc", 20, "vpc", "Gateway VPC endpoints per VPC"),
+    Quota("interface_endpoints_per_vpc", 50, "vpc", "Interface VPC endpoints per VPC"),
+    Quota("nat_gateways_per_az", 5, "az", "NAT gateways per Availability Zone"),
+    Quota("rules_per_network_acl", MAX_RULES_PER_DIRECTION, "network_acl", "Inbound or outbound rules per network ACL"),
+    Quota("ssm_standard_value_bytes", STANDARD_MAX_BYTES, "parameter", "Standard tier SSM parameter value size"),
+    Quota("ssm_advanced_value_bytes", ADVANCED_MAX_BYTES, "parameter", "Advanced tier SSM parameter value size"),
+    Quota("secret_value_bytes", SECRET_MAX_BYTES, "secret", "Secrets Manager secret value size"),
+)}
+
+
+class QuotaTable:
+    # Limits by quota name, with optional per-region overrides. Overrides take
+    # the shape of the "quotas" stack config:
+    #   {"eips_per_region": 10, "us-west-2": {"eips_per_region": 20}}
+    # Quotas an account already uses part of can be set to the remaining headroom.
+    def __init__(self, overrides: Optional[Mapping[str, Any]] = None, quotas: Mapping[str, Quota] = DEFAULT_QUOTAS):
+        self.quotas = dict(quotas)
+        self.limits: Dict[str, int] = {}
+        self.region_limits: Dict[str, Dict[str, int]] = {}
+
+        for key, value in (overrides or {}).items():
+            if isinstance(value, Mapping):
+                self.region_limits[key] = {name: self._validate(name, limit) for name, limit in value.items()}
+            else:
+                self.limits[key] = self._validate(key, value)
+
+    def _validate(self, name: str, limit: Any) -> int:
+        if name not in self.quotas:
+            raise ValueError(f"Unknown quota {name!r}; known quotas: {sorted(self.quotas)}")
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+            raise ValueError(f"Quota {name!r} must be a non-negative integer, got {limit!r}")
+        return limit
+
+    def limit(self, name: str, region: Optional[str] = None) -> int:
+        regional = self.region_limits.get(region, {}) if region else {}
+        if name in regional:
+            return regional[name]
+        return self.limits.get(name, self.quotas[name].limit)
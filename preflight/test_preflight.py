@@ -0,0 +1,112 @@
+import pytest
+
+from preflight.preflight import Preflight, QuotaExceededError
+from preflight.quotas import QuotaTable
+from ssm_parameter.tree_loader import ADVANCED_MAX_BYTES, STANDARD_MAX_BYTES
+
+
+def two_vpcs_with_nat(preflight):
+    for name in ("core", "edge"):
+        preflight.vpc(name)
+        route_tables = preflight.subnets(f"{name}-network", name, azs=3)
+        preflight.nat_gateways(f"{name}-nat", 3, list(route_tables.values()))
+
+
+def test_combined_demand_over_a_quota_is_reported():
+    preflight = Preflight(region="us-east-2")
+    two_vpcs_with_nat(preflight)
+    report = preflight.check()
+
+    [violation] = report.violations
+    assert (violation.quota.name, violation.scope, violation.demand, violation.limit) == \
+        ("eips_per_region", "us-east-2", 6, 5)
+    assert str(violation) == \
+        "Elastic IP addresses per Region (eips_per_region) in us-east-2: 6 > 5 (core-nat: 3, edge-nat: 3)"
+    with pytest.raises(QuotaExceededError, match="1 of .* quota checks failed"):
+        report.raise_for_violations()
+
+
+def test_overrides_raise_limits_for_every_region_or_one():
+    preflight = Preflight(QuotaTable({"eips_per_region": 10}))
+    two_vpcs_with_nat(preflight)
+    assert preflight.check().ok
+
+    preflight = Preflight(QuotaTable({"us-west-2": {"eips_per_region": 10}}), region="us-east-2")
+    two_vpcs_with_nat(preflight)
+    assert not preflight.check().ok
+
+
+def test_regions_are_checked_separately():
+    preflight = Preflight()
+    preflight.regional_networks("edge", ["us-east-1", "us-west-2"], az_count=3)
+    report = preflight.check()
+
+    assert report.ok, report.summary()
+    assert report.summary().endswith("quota checks passed")
+
+
+def test_guessed_az_names_are_reported():
+    preflight = Preflight(region="us-east-2")
+    preflight.subnets("app-network", "core", azs=2)
+    preflight.subnets("edge-network", "edge", azs=3)
+    report = preflight.check()
+
+    assert report.assumed_zones == {"us-east-2": ("us-east-2a", "us-east-2b", "us-east-2c")}
+    assert report.summary().splitlines()[0] == (
+        "preflight: assumed the AZs of us-east-2 are us-east-2a, us-east-2b, us-east-2c; set 'preflightAzs' to the "
+        "region's AZ names to check per-AZ quotas against the real ones")
+
+
+def test_given_az_names_are_used_instead():
+    preflight = Preflight(region="us-east-1", azs={"us-east-1": ["us-east-1b", "us-east-1c", "us-east-1d"]})
+    route_tables = preflight.subnets("app-network", "core", azs=2)
+
+    assert list(route_tables) == ["us-east-1b", "us-east-1c"]
+    assert preflight.check().assumed_zones == {}
+    with pytest.raises(ValueError, match="4 AZs are needed in us-east-1"):
+        preflight.subnets("edge-network", "edge", azs=4)
+
+
+def test_acl_rules_are_counted_per_direction():
+    rules = {f"r{i}": {"action": "allow", "direction": "ingress", "ipv4_cidr": f"10.{i}.0.0/24",
+                       "protocol": "tcp", "from_port": 443, "to_port": 443} for i in range(21)}
+    preflight = Preflight(region="us-east-2")
+    preflight.network_acl("app-acl", "core", rules, merge_rules=False)
+
+    [violation] = preflight.check().violations
+    assert violation.scope == "us-east-2/core/app-acl ingress"
+    assert (violation.demand, violation.limit) == (21, 20)
+
+
+def test_parameter_tiers_and_sizes():
+    preflight = Preflight()
+    assert preflight.ssm_parameter("small", "x" * STANDARD_MAX_BYTES, tier=None) == "Standard"
+    assert preflight.ssm_parameter("large", "x" * (STANDARD_MAX_BYTES + 1), tier=None) == "Advanced"
+    assert preflight.check().ok
+
+    preflight.ssm_parameter("huge", "x" * (ADVANCED_MAX_BYTES + 1), tier="Advanced")
+    [violation] = preflight.check().violations
+    assert violation.quota.name == "ssm_advanced_value_bytes"
+
+
+def test_sealed_values_are_sized_as_sealed():
+    preflight = Preflight()
+    # Compressible values fit the standard tier once sealed
+    assert preflight.ssm_parameter("sealed", "x" * 2 * STANDARD_MAX_BYTES, tier=None, envelope="app-envelope") == \
+        "Standard"
+
+
+@pytest.mark.parametrize("overrides, message", [
+    ({"eips": 10}, "Unknown quota 'eips'"),
+    ({"us-west-2": {"nat_per_az": 1}}, "Unknown quota 'nat_per_az'"),
+    ({"eips_per_region": -1}, "must be a non-negative integer"),
+    ({"eips_per_region": True}, "must be a non-negative integer"),
+])
+def test_invalid_overrides_raise(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        QuotaTable(overrides)
+
+
+def test_unknown_demands_raise():
+    with pytest.raises(ValueError, match="Unknown quota 'buckets'"):
+        Preflight().demand("buckets", 1, "app")
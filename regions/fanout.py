@@ -0,0 +1,103 @@
+import pulumi
+import pulumi_aws as aws
+from typing import Any, Callable, Dict, List, Optional
+from invoke_cache.invoke_cache import invoke_options
+from vpc_subnet.ipam import CidrAllocator
+from vpc.vpc import VpcOnly
+from vpc_subnet.subnets import VpcSubnets
+from vpc_nat.natgw import NatGateway
+from vpc_endpoints.nat_bypass import NatBypassEndpoints
+from regions.providers import regional_provider
+
+
+def plan_region_cidrs(supernet: str, regions: List[str], prefix_length: int = 16) -> Dict[str, str]:
+    # Non-overlapping VPC CIDRs per region, so the regions can be peered later
+    allocator = CidrAllocator(supernet)
+    return {region: str(allocator.allocate(prefix_length)) for region in regions}
+
+
+def fan_out(regions: List[str],
+            build: Callable[[str, aws.Provider, List[str]], Any],
+            az_count: int = 3,
+            provider_args: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:  # see regional_provider
+    # Every region's AZs are looked up once (cached per provider) before any
+    # builder runs. After that the builders register resources without
+    # blocking, so the engine creates the regional subgraphs in parallel.
+    if len(set(regions)) != len(regions):
+        raise ValueError(f"Regions are listed more than once: {regions}")
+
+    providers = {region: regional_provider(region, provider_args) for region in regions}
+    azs = {region: VpcSubnets.resolve_azs(az_count, invoke_options(provider=providers[region])) for region in regions}
+    return {region: build(region, providers[region], azs[region]) for region in regions}
+
+
+class RegionalNetwork(pulumi.ComponentResource):
+    # The stack's VPC topology (VPC, subnets, NAT, gateway endpoints) in one region
+    def __init__(self,
+                 name: str,
+                 cidr_block: str,
+                 azs: List[str],
+                 subnet_prefix_lengths: Optional[Dict[str, int]] = None,
+                 nat_mode: str = "per_az",  # per_az, single, spread or none
+                 tags: Optional[Dict[str, str]] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__('custom:aws:RegionalNetwork', name, None, opts)
+
+        child_opts = pulumi.ResourceOptions(parent=self)
+
+        self.vpc = VpcOnly(name,
+            cidr_block=cidr_block,
+            tags=tags,
+            opts=child_opts
+        )
+
+        self.subnets = VpcSubnets(f"{name}-network",
+            vpc_id=self.vpc.vpc.id,
+            azs=azs,
+            vpc_cidr_block=cidr_block,
+            subnet_prefix_lengths=subnet_prefix_lengths or {"public": 24, "private": 20},
+            tags=tags,
+            opts=child_opts
+        )
+
+        self.nat = None
+        self.nat_bypass = None
+        if nat_mode != "none":
+            self.nat = NatGateway(f"{name}-nat",
+                public_subnet_ids_by_az=self.subnets.public_subnet_ids_by_az,
+                private_route_table_ids_by_az=self.subnets.private_route_table_ids_by_az,
+                mode=nat_mode,
+                tags=tags,
+                opts=child_opts
+            )
+            self.nat_bypass = NatBypassEndpoints(f"{name}-nat-bypass",
+                vpc=self.vpc.vpc,
+                nat_route_table_ids=self.nat.routed_route_table_ids,
+                tags=tags,
+                opts=child_opts
+            )
+
+        self.register_outputs({
+            "vpc_id": self.vpc.vpc.id,
+            "private_subnet_ids": self.subnets.private_subnet_ids,
+            "public_subnet_ids": self.subnets.public_subnet_ids,
+        })
+
+
+def build_regional_networks(name: str,
+                            regions: List[str],
+                            supernet: str = "10.0.0.0/8",
+                            az_count: int = 3,
+                            subnet_prefix_lengths: Optional[Dict[str, int]] = None,
+                            nat_mode: str = "per_az",
+                            tags: Optional[Dict[str, str]] = None,
+                            provider_args: Optional[Dict[str, Any]] = None) -> Dict[str, RegionalNetwork]:
+    cidrs = plan_region_cidrs(supernet, regions)
+    return fan_out(regions, lambda region, provider, azs: RegionalNetwork(f"{name}-{region}",
+        cidr_block=cidrs[region],
+        azs=azs,
+        subnet_prefix_lengths=subnet_prefix_lengths,
+        nat_mode=nat_mode,
+        tags={**(tags or {}), "Region": region},
+        opts=pulumi.ResourceOptions(provider=provider)
+    ), az_count=az_count, provider_args=provider_args)
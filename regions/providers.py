@@ -0,0 +1,67 @@
+import re
+import pulumi
+import pulumi_aws as aws
+from typing import Any, Dict, Optional, Tuple
+
+# aws:* stack settings the default provider reads but explicit providers do not:
+# config key -> aws.Provider argument
+INHERITED_SETTINGS = {
+    "profile": "profile",
+    "sharedConfigFiles": "shared_config_files",
+    "sharedCredentialsFiles": "shared_credentials_files",
+    "allowedAccountIds": "allowed_account_ids",
+    "forbiddenAccountIds": "forbidden_account_ids",
+    "accessKey": "access_key",
+    "secretKey": "secret_key",
+    "token": "token",
+    "assumeRole": "assume_role",
+}
+SECRET_SETTINGS = ("accessKey", "secretKey", "token")
+LIST_SETTINGS = ("sharedConfigFiles", "sharedCredentialsFiles", "allowedAccountIds", "forbiddenAccountIds")
+
+_providers: Dict[str, Tuple[aws.Provider, Optional[Dict[str, Any]]]] = {}
+
+
+def default_provider_args() -> Dict[str, Any]:
+    # The credentials the stack's default provider deploys with, as aws.Provider arguments
+    config = pulumi.Config("aws")
+    args: Dict[str, Any] = {}
+    for key, arg in INHERITED_SETTINGS.items():
+        if key in SECRET_SETTINGS:
+            value = config.get_secret(key)
+        elif key in LIST_SETTINGS:
+            value = config.get_object(key)
+        elif key == "assumeRole":
+            role = config.get_object(key)
+            value = aws.ProviderAssumeRoleArgs(**{_snake_case(k): v for k, v in role.items()}) if role else None
+        else:
+            value = config.get(key)
+        if value is not None:
+            args[arg] = value
+    return args
+
+
+def regional_provider(region: str, provider_args: Optional[Dict[str, Any]] = None) -> aws.Provider:
+    # One explicit provider per region and program. It copies provider_args
+    # (the caller's aws.Provider arguments, e.g. profile or assume_role), or
+    # by default the default provider's credentials settings, so regional
+    # resources deploy as the same identity as the rest of the stack.
+    if region in _providers:
+        provider, created_with = _providers[region]
+        if provider_args is not None and provider_args != created_with:
+            raise ValueError(f"The provider for {region} was already created with other provider_args")
+        return provider
+
+    args = dict(default_provider_args() if provider_args is None else provider_args)
+    args.pop("region", None)
+    _providers[region] = (aws.Provider(f"aws-{region}", region=region, **args), provider_args)
+    return _providers[region][0]
+
+
+def clear_providers():
+    # For code that runs several Pulumi programs in one process, e.g. benchmarks
+    _providers.clear()
+
+
+def _snake_case(key: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", key).lower()
@@ -0,0 +1,61 @@
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.fanout import fan_out, plan_region_cidrs
+from regions.providers import clear_providers, regional_provider
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    yield set_aws_mocks(AwsMocks())
+    pulumi.runtime.config.CONFIG.get().pop("aws:profile", None)
+
+
+def providers(mocks):
+    return {r.name: r.inputs for r in mocks.resources if r.typ == "pulumi:providers:aws"}
+
+
+def test_region_cidrs_do_not_overlap():
+    assert plan_region_cidrs("10.0.0.0/8", ["us-east-2", "us-west-2", "eu-west-1"]) == {
+        "us-east-2": "10.0.0.0/16", "us-west-2": "10.1.0.0/16", "eu-west-1": "10.2.0.0/16"}
+    assert plan_region_cidrs("10.0.0.0/16", ["us-east-2", "us-west-2"], prefix_length=20)["us-west-2"] == "10.0.16.0/20"
+
+
+def test_regions_must_be_listed_once(mocks):
+    with pytest.raises(ValueError, match="Regions are listed more than once"):
+        fan_out(["us-east-2", "us-west-2", "us-east-2"], lambda region, provider, azs: None)
+    assert mocks.resources == []
+
+
+def test_each_region_gets_its_provider_and_azs(mocks):
+    @pulumi.runtime.test
+    def build():
+        built = fan_out(["us-west-2", "eu-west-1"], lambda region, provider, azs: (provider, azs), az_count=2,
+                        provider_args={"profile": "deploy"})
+        assert built["eu-west-1"][1] == ["eu-west-1a", "eu-west-1b"]
+        return pulumi.Output.all(*[provider.id for provider, _ in built.values()]).apply(lambda _: check())
+
+    def check():
+        assert {name: (inputs["region"], inputs["profile"]) for name, inputs in providers(mocks).items()} == {
+            "aws-us-west-2": ("us-west-2", "deploy"), "aws-eu-west-1": ("eu-west-1", "deploy")}
+
+    build()
+
+
+def test_regional_providers_copy_the_default_provider_settings(mocks):
+    pulumi.runtime.set_config("aws:profile", "prod")
+
+    @pulumi.runtime.test
+    def build():
+        return regional_provider("us-west-2").id.apply(lambda _: check())
+
+    def check():
+        assert providers(mocks)["aws-us-west-2"]["profile"] == "prod"
+        with pytest.raises(ValueError, match="already created with other provider_args"):
+            regional_provider("us-west-2", {"profile": "other"})
+
+    build()
@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Secrets Manager limits a SecretString to 64 KiB
+SECRET_MAX_BYTES = 65536
+# Encoded shards stay below this, leaving headroom under the service limit
+DEFAULT_MAX_SHARD_BYTES = 48 * 1024
+# Keys are split over at most 2 ** MAX_SHARD_DEPTH shards by the low bits of their hash
+MAX_SHARD_DEPTH = 8
+MAX_SHARDS = 2 ** MAX_SHARD_DEPTH
+MANIFEST_VERSION = 1
+CODECS = ("zlib",)
+
+
+@dataclass(frozen=True)
+class BundleShard:
+    name: str
+    payload: str  # base64 of the compressed shard document
+    sha256: str  # of the uncompressed, canonical shard document
+    keys: List[str]
+
+
+@dataclass(frozen=True)
+class BundlePlan:
+    manifest: Dict[str, Any]
+    shards: List[BundleShard]
+
+    def manifest_json(self) -> str:
+        return json.dumps(self.manifest, sort_keys=True, separators=(",", ":"))
+
+
+def shard_name(bundle_name: str, index: int, depth: Optional[int] = None) -> str:
+    # Fixed layouts are numbered by index; split layouts by depth and hash bits
+    if depth is None:
+        return f"{bundle_name}/shard-{index:03d}"
+    return f"{bundle_name}/shard-{depth}-{index:03d}"
+
+
+def key_hash(key: str) -> int:
+    # Stable across runs and Python processes, so a changed key only rewrites its own shard
+    return zlib.crc32(key.encode("utf-8"))
+
+
+def shard_index(key: str, shard_count: int) -> int:
+    return key_hash(key) % shard_count
+
+
+def canonical_json(values: Dict[str, Any]) -> bytes:
+    return json.dumps(values, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def compress(data: bytes, codec: str = "zlib") -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data, 9)
+    raise ValueError(f"Unknown bundle codec '{codec}', expected one of {CODECS}")
+
+
+def decompress(data: bytes, codec: str = "zlib") -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(data)
+    raise ValueError(f"Unknown bundle codec '{codec}', expected one of {CODECS}")
+
+
+def encode_shard(values: Dict[str, Any], codec: str = "zlib"):
+    document = canonical_json(values)
+    payload = base64.b64encode(compress(document, codec)).decode("ascii")
+    return payload, hashlib.sha256(document).hexdigest()
+
+
+def decode_shard(payload: str, codec: str = "zlib", sha256: Optional[str] = None) -> Dict[str, Any]:
+    document = decompress(base64.b64decode(payload), codec)
+    if sha256 is not None and hashlib.sha256(document).hexdigest() != sha256:
+        raise ValueError("Bundle shard does not match the manifest hash")
+    return json.loads(document)
+
+
+def plan_bundle(name: str,
+                values: Dict[str, Any],
+                shard_count: Optional[int] = None,
+                codec: str = "zlib",
+                max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES) -> BundlePlan:
+    # Keys are spread over shards by hash. Without an explicit shard_count a
+    # shard that does not fit is split in two by the next bit of its keys'
+    # hashes, and only that shard: growing the bundle rewrites the shards
+    # that overflowed and leaves the others (and their versions) alone. An
+    # explicit shard_count fixes the layout to `hash % shard_count`, so
+    # changing it rewrites every shard. Empty shards are never written.
+    if not values:
+        raise ValueError(f"Secret bundle {name} has no values")
+    if codec not in CODECS:
+        raise ValueError(f"Unknown bundle codec '{codec}', expected one of {CODECS}")
+    if max_shard_bytes > SECRET_MAX_BYTES:
+        raise ValueError(f"max_shard_bytes cannot exceed the {SECRET_MAX_BYTES} byte secret limit")
+    if shard_count is not None and not 1 <= shard_count <= MAX_SHARDS:
+        raise ValueError(f"shard_count must be between 1 and {MAX_SHARDS}")
+
+    if shard_count:
+        shards = _encode_fixed_shards(name, values, shard_count, codec)
+        oversized = [s for s in shards if len(s.payload) > max_shard_bytes]
+        if oversized:
+            largest = max(len(s.payload) for s in oversized)
+            raise ValueError(f"Secret bundle {name} does not fit: a shard encodes to {largest} bytes with "
+                             f"{shard_count} shards (limit {max_shard_bytes})")
+    else:
+        shards = _split_shards(name, sorted(values), values, codec, max_shard_bytes)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "codec": codec,
+        "shard_count": len(shards),
+        "shards": [{"name": s.name, "sha256": s.sha256, "bytes": len(s.payload)} for s in shards],
+        # Positions in "shards"
+        "keys": {key: index for index, shard in enumerate(shards) for key in shard.keys},
+    }
+    plan = BundlePlan(manifest=manifest, shards=shards)
+    if len(plan.manifest_json()) > SECRET_MAX_BYTES:
+        raise ValueError(f"Secret bundle {name} has too many keys for its manifest to fit in one secret")
+    return plan
+
+
+def shards_for_keys(manifest: Dict[str, Any], keys: List[str]) -> List[int]:
+    missing = [key for key in keys if key not in manifest["keys"]]
+    if missing:
+        raise KeyError(f"Keys not in bundle: {missing}")
+    return sorted({manifest["keys"][key] for key in keys})
+
+
+def _shard(name: str, values: Dict[str, Any], keys: List[str], codec: str) -> BundleShard:
+    payload, sha256 = encode_shard({key: values[key] for key in keys}, codec)
+    return BundleShard(name=name, payload=payload, sha256=sha256, keys=keys)
+
+
+def _encode_fixed_shards(name: str, values: Dict[str, Any], count: int, codec: str) -> List[BundleShard]:
+    grouped: List[List[str]] = [[] for _ in range(count)]
+    for key in sorted(values):
+        grouped[shard_index(key, count)].append(key)
+    return [_shard(shard_name(name, index), values, keys, codec) for index, keys in enumerate(grouped) if keys]
+
+
+def _split_shards(name: str, keys: List[str], values: Dict[str, Any], codec: str, max_shard_bytes: int,
+                  depth: int = 0, bits: int = 0) -> List[BundleShard]:
+    # `keys` are those whose hash ends in the `depth` low bits `bits`
+    if not keys:
+        return []
+    shard = _shard(shard_name(name, bits, depth), values, keys, codec)
+    if len(shard.payload) <= max_shard_bytes:
+        return [shard]
+    if depth == MAX_SHARD_DEPTH or len(keys) == 1:
+        raise ValueError(f"Secret bundle {name} does not fit: a shard encodes to {len(shard.payload)} bytes with "
+                         f"{len(keys)} keys (limit {max_shard_bytes})")
+    low = [key for key in keys if not key_hash(key) >> depth & 1]
+    high = [key for key in keys if key_hash(key) >> depth & 1]
+    return (_split_shards(name, low, values, codec, max_shard_bytes, depth + 1, bits) +
+            _split_shards(name, high, values, codec, max_shard_bytes, depth + 1, bits | 1 << depth))
@@ -3,6 +3,8 @@ import pulumi_aws as aws
 from typing import Optional, Dict, Union
 import json
 import os
+from secret_manager.bundle import SECRET_MAX_BYTES, DEFAULT_MAX_SHARD_BYTES, plan_bundle
+from kms.kms import EnvelopeKey, select_regional_key
 
 class SecretManagerSecret(pulumi.ComponentResource):
     def __init__(self,
@@ -10,8 +12,9 @@ class SecretManagerSecret(pulumi.ComponentResource):
                  secret_value: Optional[Union[str, Dict]] = None,
                  secret_value_from_file: Optional[str] = None,
                  description: Optional[str] = None,
-                 kms_key_id: Optional[str] = None,
+                 kms_key_id: Optional[str] = None,  # or a region-keyed map, e.g. KmsModule.key_arns_by_region
                  tags: Optional[Dict[str, str]] = None,
+                 envelope: Optional[EnvelopeKey] = None,  # seal the value client-side with a cached data key
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__('custom:aws:SecretManagerSecret', name, None, opts)
 
@@ -32,12 +35,18 @@ class SecretManagerSecret(pulumi.ComponentResource):
         else:
             secret_value_str = secret_value
 
+        size = envelope.sealed_size(secret_value_str, name) if envelope else len(secret_value_str.encode("utf-8"))
+        if size > SECRET_MAX_BYTES:
+            raise ValueError(f"Secret {name} exceeds {SECRET_MAX_BYTES} bytes; use SecretBundle to shard it.")
+        if envelope is not None:
+            secret_value_str = envelope.seal(secret_value_str, name)
+
         # Create the secret (metadata)
         self.secret = aws.secretsmanager.Secret(
             f"{name}-metadata",
             name=name,
             description=description,
-            kms_key_id=kms_key_id,
+            kms_key_id=select_regional_key(kms_key_id, self),
             tags=tags,
             opts=pulumi.ResourceOptions(parent=self)
         )
@@ -54,3 +63,56 @@ class SecretManagerSecret(pulumi.ComponentResource):
             "secret": self.secret,
             "version": self.secret_version,
         })
+
+
+class SecretBundle(pulumi.ComponentResource):
+    # A large dict of secrets, compressed and sharded across several secrets
+    # behind a manifest secret named `name`. Shard contents are deterministic,
+    # so only shards whose keys changed get a new version (see plan_bundle).
+    def __init__(self,
+                 name: str,
+                 secret_values: Optional[Dict] = None,
+                 secret_values_from_file: Optional[str] = None,  # JSON object
+                 shard_count: Optional[int] = None,  # default: split shards by key hash until each fits
+                 codec: str = "zlib",
+                 max_shard_bytes: int = DEFAULT_MAX_SHARD_BYTES,
+                 description: Optional[str] = None,
+                 kms_key_id: Optional[str] = None,  # or a region-keyed map, e.g. KmsModule.key_arns_by_region
+                 tags: Optional[Dict[str, str]] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__('custom:aws:SecretBundle', name, None, opts)
+
+        if secret_values_from_file:
+            with open(secret_values_from_file, 'r') as f:
+                secret_values = json.load(f)
+
+        if not isinstance(secret_values, dict):
+            raise ValueError("Either 'secret_values' or 'secret_values_from_file' must provide a JSON object.")
+
+        self.plan = plan_bundle(name, secret_values, shard_count=shard_count, codec=codec,
+                                max_shard_bytes=max_shard_bytes)
+
+        self.shards = [
+            SecretManagerSecret(shard.name,
+                secret_value=shard.payload,
+                description=f"Shard {i} of secret bundle {name}",
+                kms_key_id=kms_key_id,
+                tags=tags,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            for i, shard in enumerate(self.plan.shards)
+        ]
+
+        # Written after the shards, so readers never see a manifest pointing at missing content
+        self.manifest = SecretManagerSecret(name,
+            secret_value=self.plan.manifest_json(),
+            description=description or f"Manifest of secret bundle {name}",
+            kms_key_id=kms_key_id,
+            tags=tags,
+            opts=pulumi.ResourceOptions(parent=self, depends_on=[s.secret_version for s in self.shards])
+        )
+
+        self.register_outputs({
+            "manifest_arn": self.manifest.secret.arn,
+            "shard_arns": [s.secret.arn for s in self.shards],
+        })
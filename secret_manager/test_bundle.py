@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from secret_manager.bundle import decode_shard, encode_shard, key_hash, plan_bundle, shards_for_keys
+
+
+def random_values(count, start=0, size=600):
+    # Incompressible values, so shard sizes follow the number of keys
+    return {f"key-{i:04d}": os.urandom(size).hex() for i in range(start, start + count)}
+
+
+def test_codec_round_trip_checks_the_hash():
+    payload, sha256 = encode_shard({"b": 2, "a": [1, "x"]})
+    assert decode_shard(payload, sha256=sha256) == {"a": [1, "x"], "b": 2}
+    with pytest.raises(ValueError, match="does not match the manifest hash"):
+        decode_shard(payload, sha256="0" * 64)
+    with pytest.raises(ValueError, match="Unknown bundle codec 'zstd'"):
+        encode_shard({"a": 1}, codec="zstd")
+
+
+def test_small_bundles_use_one_shard():
+    plan = plan_bundle("app", {"a": 1, "b": 2})
+    assert [shard.name for shard in plan.shards] == ["app/shard-0-000"]
+    assert plan.manifest["keys"] == {"a": 0, "b": 0}
+
+
+def test_every_key_maps_to_the_shard_holding_it():
+    values = random_values(200)
+    plan = plan_bundle("app", values, max_shard_bytes=16 * 1024)
+
+    assert len(plan.shards) > 1
+    assert all(len(shard.payload) <= 16 * 1024 for shard in plan.shards)
+    for key, index in plan.manifest["keys"].items():
+        assert key in plan.shards[index].keys
+        assert decode_shard(plan.shards[index].payload, sha256=plan.shards[index].sha256)[key] == values[key]
+    assert shards_for_keys(plan.manifest, ["key-0001", "key-0001"]) == [plan.manifest["keys"]["key-0001"]]
+    with pytest.raises(KeyError, match="Keys not in bundle"):
+        shards_for_keys(plan.manifest, ["missing"])
+
+
+def test_growing_a_bundle_only_rewrites_the_shards_that_split():
+    values = random_values(200)
+    before = {shard.name: shard.sha256 for shard in plan_bundle("app", values, max_shard_bytes=16 * 1024).shards}
+    # Enough new keys landing in one shard to split it
+    target = next(iter(before))
+    depth, bits = (int(part) for part in target.rsplit("/shard-", 1)[1].split("-"))
+    added = {key: value for key, value in random_values(2000, start=1000).items()
+             if key_hash(key) % 2 ** depth == bits}
+    added = dict(list(added.items())[:20])
+    after = {shard.name: shard.sha256 for shard in plan_bundle("app", {**values, **added},
+                                                                 max_shard_bytes=16 * 1024).shards}
+
+    unchanged = {name for name in before if after.get(name) == before[name]}
+    assert unchanged == set(before) - {target}
+    assert len(after) > len(before)
+
+
+def test_fixed_layouts_skip_empty_shards():
+    plan = plan_bundle("app", {"a": 1}, shard_count=8)
+    assert len(plan.shards) == 1
+    assert plan.manifest["shard_count"] == 1
+    assert plan.shards[0].name.startswith("app/shard-")
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"values": {}}, "has no values"),
+    ({"shard_count": 300}, "shard_count must be between 1 and 256"),
+    ({"values": {"big": os.urandom(40000).hex()}}, "does not fit: a shard encodes to"),
+    ({"shard_count": 1, "max_shard_bytes": 1024}, "with 1 shards"),
+])
+def test_invalid_bundles_raise(kwargs, message):
+    kwargs = {"values": random_values(10), **kwargs}
+    with pytest.raises(ValueError, match=message):
+        plan_bundle("app", **kwargs)
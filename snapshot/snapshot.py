@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import os
+import runpy
+import sys
+import pulumi
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from mocks.mocks import AwsMocks, set_aws_mocks
+from invoke_cache.invoke_cache import invoke_cache
+from regions.providers import clear_providers
+
+SNAPSHOT_VERSION = 1
+ROOT = "<stack>"
+# Inputs stored as a digest, so snapshots can be shared without leaking values
+# while still showing that they changed
+HASHED_INPUTS = {
+    "aws:ssm/parameter:Parameter": ("value", "insecureValue"),
+    "aws:secretsmanager/secretVersion:SecretVersion": ("secretString", "secretBinary"),
+}
+SECRET_CONFIG_PLACEHOLDER = "mock-secret"
+
+
+class SnapshotMocks(AwsMocks):
+    # AwsMocks that also records each registration's parent. Mocks never see
+    # parents, so a stack transformation notes them under (type, name) first.
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._keys: Dict[int, Tuple[Any, str]] = {}
+        self._pending: Dict[Tuple[str, str], Deque[Tuple[str, Optional[str]]]] = defaultdict(deque)
+
+    def transform(self, args: pulumi.ResourceTransformationArgs):
+        parent = args.opts.parent if args.opts else None
+        parent_key = self._keys[id(parent)][1] if parent is not None and id(parent) in self._keys else None
+        # Like a URN: the parent's type chain makes equal names under different parents unique
+        parent_chain = parent_key.split("::", 1)[0] + "$" if parent_key else ""
+        key = f"{parent_chain}{args.type_}::{args.name}"
+        # Keep the resource alive so its id() is never reused while recording
+        self._keys[id(args.resource)] = (args.resource, key)
+        self._pending[(args.type_, args.name)].append((key, parent_key))
+        return None
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        resource_id, outputs = super().new_resource(args)
+        pending = self._pending.get((args.typ, args.name))
+        key, parent_key = pending.popleft() if pending else (f"{args.typ}::{args.name}", None)
+        self.records[key] = {
+            "type": args.typ,
+            "name": args.name,
+            "parent": parent_key,
+            "custom": bool(args.custom),
+            "inputs": _redact(args.typ, dict(args.inputs)),
+        }
+        return resource_id, outputs
+
+
+def _redact(type_: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    for name in HASHED_INPUTS.get(type_, ()):
+        if inputs.get(name) is not None:
+            digest = hashlib.sha256(json.dumps(inputs[name], sort_keys=True).encode("utf-8")).hexdigest()
+            inputs[name] = f"sha256:{digest[:16]}"
+    return inputs
+
+
+def capture(program: Callable[[], Any],
+            config: Optional[Dict[str, str]] = None,
+            project: str = "aws-intro",
+            stack: str = "snapshot") -> Dict[str, Any]:
+    # Runs the program offline and returns its resource graph
+    if config is not None:
+        pulumi.runtime.set_all_config(config)
+    mocks = SnapshotMocks()
+    set_aws_mocks(mocks, project=project, stack=stack)
+    invoke_cache.clear()
+    clear_providers()
+
+    def run():
+        pulumi.runtime.register_stack_transformation(mocks.transform)
+        program()
+
+    pulumi.runtime.test(run)()
+    return {"version": SNAPSHOT_VERSION, "resources": mocks.records}
+
+
+def load_stack_config(project_dir: str, stack: str) -> Tuple[str, Dict[str, str]]:
+    # Pulumi.yaml and Pulumi.<stack>.yaml to the "project:key" -> string form
+    # the runtime expects; secure values become a placeholder
+    import yaml
+
+    with open(os.path.join(project_dir, "Pulumi.yaml")) as f:
+        project = yaml.safe_load(f)["name"]
+    with open(os.path.join(project_dir, f"Pulumi.{stack}.yaml")) as f:
+        values = (yaml.safe_load(f) or {}).get("config", {})
+
+    config = {}
+    for key, value in values.items():
+        if ":" not in key:
+            key = f"{project}:{key}"
+        if isinstance(value, dict) and set(value) == {"secure"}:
+            value = SECRET_CONFIG_PLACEHOLDER
+        config[key] = value if isinstance(value, str) else json.dumps(value)
+    return project, config
+
+
+def capture_project(project_dir: str = ".", stack: str = "dev",
+                    overrides: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    project, config = load_stack_config(project_dir, stack)
+    for key, value in (overrides or {}).items():
+        config[key if ":" in key else f"{project}:{key}"] = value
+
+    main_path = os.path.join(project_dir, "__main__.py")
+    return capture(lambda: runpy.run_path(main_path, run_name="__main__"), config=config, project=project, stack=stack)
+
+
+def write_snapshot(snapshot: Dict[str, Any], path: str):
+    # Valid JSON with one resource per line: compact, byte-stable and readable in a plain text diff
+    resources = snapshot["resources"]
+    lines = [f"{json.dumps(key)}:{json.dumps(resources[key], sort_keys=True, separators=(',', ':'), default=str)}"
+             for key in sorted(resources)]
+    with open(path, "w") as f:
+        f.write(f'{{"version":{snapshot["version"]},"resources":{{\n')
+        f.write(",\n".join(lines))
+        f.write("\n}}\n")
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot version {snapshot.get('version')}")
+    return snapshot
+
+
+@dataclass
+class ComponentDiff:
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    # resource -> names of the changed inputs ("parent" when it moved)
+    changed: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"added": self.added, "removed": self.removed, "changed": self.changed}
+
+
+@dataclass
+class SnapshotDiff:
+    components: Dict[str, ComponentDiff] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return not self.components
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "added": sum(len(c.added) for c in self.components.values()),
+            "removed": sum(len(c.removed) for c in self.components.values()),
+            "changed": sum(len(c.changed) for c in self.components.values()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": self.counts(),
+                "components": {name: diff.to_dict() for name, diff in self.components.items()}}
+
+    def summary(self) -> str:
+        if self.empty:
+            return "No changes"
+        lines = []
+        for component, diff in self.components.items():
+            lines.append(component)
+            lines.extend(f"  + {resource}" for resource in diff.added)
+            lines.extend(f"  - {resource}" for resource in diff.removed)
+            lines.extend(f"  ~ {resource} ({', '.join(inputs)})" for resource, inputs in diff.changed.items())
+        counts = self.counts()
+        lines.append(f"{counts['added']} to add, {counts['changed']} to change, {counts['removed']} to remove")
+        return "\n".join(lines)
+
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> SnapshotDiff:
+    old_resources, new_resources = old["resources"], new["resources"]
+    components: Dict[str, ComponentDiff] = defaultdict(ComponentDiff)
+
+    for key in sorted(old_resources.keys() | new_resources.keys()):
+        before, after = old_resources.get(key), new_resources.get(key)
+        if before is None:
+            components[_component_of(key, new_resources)].added.append(_label(after))
+        elif after is None:
+            components[_component_of(key, old_resources)].removed.append(_label(before))
+        else:
+            changed = sorted(name for name in before["inputs"].keys() | after["inputs"].keys()
+                             if before["inputs"].get(name) != after["inputs"].get(name))
+            if before["parent"] != after["parent"]:
+                changed.append("parent")
+            if changed:
+                components[_component_of(key, new_resources)].changed[_label(after)] = changed
+
+    return SnapshotDiff(components=dict(sorted(components.items())))
+
+
+def _label(record: Dict[str, Any]) -> str:
+    return f"{record['type']} {record['name']}"
+
+
+def _component_of(key: str, resources: Dict[str, Dict[str, Any]]) -> str:
+    # The nearest enclosing component resource (VpcSubnets, VpcAcl, ...), or the stack
+    parent = resources[key]["parent"]
+    while parent is not None:
+        record = resources.get(parent)
+        if record is None:
+            break
+        if not record["custom"]:
+            return _label(record)
+        parent = record["parent"]
+    return ROOT
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline resource graph snapshots of the stack (runs under mocks)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    capture_parser = commands.add_parser("capture", help="run the program under mocks and write its resource graph")
+    capture_parser.add_argument("--stack", default="dev", help="stack whose Pulumi.<stack>.yaml config is used")
+    capture_parser.add_argument("--project-dir", default=".", help="directory with Pulumi.yaml and __main__.py")
+    capture_parser.add_argument("--config", action="append", default=[], metavar="KEY=VALUE",
+                                help="override a config value (objects as JSON)")
+    capture_parser.add_argument("--output", required=True, help="snapshot file to write")
+
+    diff_parser = commands.add_parser("diff", help="compare two snapshots")
+    diff_parser.add_argument("old")
+    diff_parser.add_argument("new")
+    diff_parser.add_argument("--json", action="store_true", help="print the diff as JSON")
+    diff_parser.add_argument("--exit-code", action="store_true", help="exit with 1 when there are changes")
+    args = parser.parse_args(argv)
+
+    if args.command == "capture":
+        overrides = dict(item.split("=", 1) for item in args.config)
+        snapshot = capture_project(args.project_dir, args.stack, overrides)
+        write_snapshot(snapshot, args.output)
+        print(f"{len(snapshot['resources'])} resources written to {args.output}")
+        return 0
+
+    diff = diff_snapshots(read_snapshot(args.old), read_snapshot(args.new))
+    print(json.dumps(diff.to_dict(), indent=2, sort_keys=True) if args.json else diff.summary())
+    return 1 if args.exit_code and not diff.empty else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import pytest
+
+from snapshot.snapshot import ROOT, capture, diff_snapshots, read_snapshot, write_snapshot
+from ssm_parameter.ssm import SsmParameter
+from vpc.vpc import VpcOnly
+
+
+def program(cidr_block="10.0.0.0/16", value="secret-value"):
+    def run():
+        VpcOnly("app", cidr_block=cidr_block)
+        SsmParameter("app/db-password", value=value)
+    return run
+
+
+def test_capture_records_parents_and_hashes_values():
+    resources = capture(program())["resources"]
+
+    vpc = resources["custom:aws:VpcOnly$aws:ec2/vpc:Vpc::app-vpc"]
+    assert vpc["parent"] == "custom:aws:VpcOnly::app"
+    assert vpc["inputs"]["cidrBlock"] == "10.0.0.0/16"
+
+    [parameter] = [r for r in resources.values() if r["type"] == "aws:ssm/parameter:Parameter"]
+    assert parameter["inputs"]["value"].startswith("sha256:")
+    assert "secret-value" not in str(resources)
+
+
+def test_snapshots_are_byte_stable(tmp_path):
+    first, second = tmp_path / "first.json", tmp_path / "second.json"
+    write_snapshot(capture(program()), str(first))
+    write_snapshot(capture(program()), str(second))
+
+    assert first.read_bytes() == second.read_bytes()
+    assert read_snapshot(str(first)) == capture(program())
+
+
+def test_diff_groups_changes_by_component():
+    before = capture(program())
+    after = capture(program(cidr_block="10.1.0.0/16", value="rotated"))
+    diff = diff_snapshots(before, after)
+
+    assert diff.components["custom:aws:VpcOnly app"].changed == {"aws:ec2/vpc:Vpc app-vpc": ["cidrBlock"]}
+    assert diff.counts() == {"added": 0, "removed": 0, "changed": 2}
+    assert list(diff.components) == ["custom:aws:SsmParameter app/db-password", "custom:aws:VpcOnly app"]
+    assert diff_snapshots(before, before).summary() == "No changes"
+
+
+def test_diff_reports_added_and_removed_resources():
+    before = capture(program())
+    after = capture(lambda: VpcOnly("app", cidr_block="10.0.0.0/16"))
+    diff = diff_snapshots(after, before)
+
+    assert diff.components[ROOT].added == ["custom:aws:SsmParameter app/db-password"]
+    assert diff.components["custom:aws:SsmParameter app/db-password"].added == \
+        ["aws:ssm/parameter:Parameter app/db-password-param"]
+    assert diff_snapshots(before, after).counts() == {"added": 0, "removed": 2, "changed": 0}
+
+
+def test_unknown_versions_are_rejected(tmp_path):
+    path = tmp_path / "old.json"
+    path.write_text('{"version": 0, "resources": {}}')
+    with pytest.raises(ValueError, match="unsupported snapshot version 0"):
+        read_snapshot(str(path))
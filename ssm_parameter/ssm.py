@@ -2,6 +2,8 @@ import pulumi
 import pulumi_aws as aws
 from typing import Optional, Dict
 import os
+from ssm_parameter.tree_loader import choose_tier, iter_directory, iter_document, load_document
+from kms.kms import EnvelopeKey, select_regional_key
 
 class SsmParameter(pulumi.ComponentResource):
     def __init__(self,
@@ -9,11 +11,13 @@ class SsmParameter(pulumi.ComponentResource):
                  value: Optional[str] = None,
                  value_from_file: Optional[str] = None,
                  type: str = "String",  # Can be String, SecureString, or StringList
-                 key_id: Optional[str] = None,
+                 key_id: Optional[str] = None,  # or a region-keyed map, e.g. KmsModule.key_ids_by_region
                  description: Optional[str] = None,
                  tags: Optional[Dict[str, str]] = None,
                  overwrite: bool = True,
-                 tier: Optional[str] = "Standard",  # Can be Standard or Advanced
+                 tier: Optional[str] = "Standard",  # Can be Standard or Advanced; None picks by value size
+                 path: Optional[str] = None,  # hierarchical name, e.g. "/app/dev/db/password"; defaults to "/{name}"
+                 envelope: Optional[EnvelopeKey] = None,  # seal the value client-side instead of using SecureString
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__('custom:aws:SsmParameter', name, None, opts)
 
@@ -25,14 +29,24 @@ class SsmParameter(pulumi.ComponentResource):
         if not value:
             raise ValueError("Either 'value' or 'value_from_file' must be provided.")
 
+        path = path or f"/{name}"
+        if envelope is not None:
+            # Sealed values are plain Strings: readers decrypt with a cached data key, not a KMS call per value.
+            # Compressed before sealing, so values too large for SSM as text can still fit.
+            tier = choose_tier(envelope.sealed_size(value, path), tier)
+            value = envelope.seal(value, path)
+            type = "String"
+        else:
+            tier = tier or choose_tier(len(value.encode("utf-8")))
+
         # Create the SSM parameter
         self.parameter = aws.ssm.Parameter(
             f"{name}-param",
-            name=f"/{name}",
+            name=path,
             type=type,
             value=value,
             description=description,
-            key_id=key_id if type == "SecureString" else None,
+            key_id=select_regional_key(key_id, self) if type == "SecureString" else None,
             tags=tags,
             overwrite=overwrite,
             tier=tier,
@@ -41,4 +55,53 @@ class SsmParameter(pulumi.ComponentResource):
 
         self.register_outputs({
             "parameter": self.parameter
-        })
\ No newline at end of file
+        })
+
+class SsmParameterTree(pulumi.ComponentResource):
+    def __init__(self,
+                 name: str,
+                 prefix: str,  # e.g. "/app/dev"
+                 source_dir: Optional[str] = None,
+                 document: Optional[Dict] = None,
+                 document_file: Optional[str] = None,  # YAML or JSON
+                 type: str = "String",  # String or SecureString; lists always become StringList
+                 key_id: Optional[str] = None,  # or a region-keyed map, e.g. KmsModule.key_ids_by_region
+                 tags: Optional[Dict[str, str]] = None,
+                 overwrite: bool = True,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__('custom:aws:SsmParameterTree', name, None, opts)
+
+        if document_file:
+            document = load_document(document_file)
+
+        if source_dir:
+            entries = iter_directory(source_dir, prefix, type)
+        elif document is not None:
+            entries = iter_document(document, prefix, type)
+        else:
+            raise ValueError("One of 'source_dir', 'document' or 'document_file' must be provided.")
+
+        key_id = select_regional_key(key_id, self)
+        self.parameters = {}
+        self.manifest = {}
+
+        for entry in entries:
+            if entry.path in self.manifest:
+                raise ValueError(f"Duplicate SSM parameter path {entry.path}")
+            self.manifest[entry.path] = entry.sha256
+            self.parameters[entry.path] = aws.ssm.Parameter(
+                f"{name}{entry.path}",
+                name=entry.path,
+                type=entry.type,
+                value=entry.value,
+                key_id=key_id if entry.type == "SecureString" else None,
+                tags=tags,
+                overwrite=overwrite,
+                tier=entry.tier,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+        self.register_outputs({
+            "parameter_names": list(self.parameters),
+            "manifest": self.manifest
+        })
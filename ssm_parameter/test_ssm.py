@@ -0,0 +1,48 @@
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers
+from ssm_parameter.ssm import SsmParameterTree
+from ssm_parameter.tree_loader import build_manifest, iter_document
+
+DOCUMENT = {"db": {"host": "db.internal", "port": 5432}, "hosts": ["a", "b"]}
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def test_tree_registers_every_leaf_and_exports_its_manifest(mocks):
+    @pulumi.runtime.test
+    def build():
+        tree = SsmParameterTree("config", "/app/dev", document=DOCUMENT)
+        assert tree.manifest == build_manifest(iter_document(DOCUMENT, "/app/dev"))
+        return pulumi.Output.all(*[p.id for p in tree.parameters.values()]).apply(lambda _: check())
+
+    def check():
+        parameters = {r.inputs["name"]: r.inputs for r in mocks.resources if r.typ == "aws:ssm/parameter:Parameter"}
+        # The provider marks parameter values secret
+        assert {name: inputs["value"]["value"] for name, inputs in parameters.items()} == {
+            "/app/dev/db/host": "db.internal",
+            "/app/dev/db/port": "5432",
+            "/app/dev/hosts": "a,b",
+        }
+        assert parameters["/app/dev/hosts"]["type"] == "StringList"
+
+    build()
+
+
+def test_tree_reads_yaml_documents(mocks, tmp_path):
+    (tmp_path / "config.yaml").write_text("db:\n  host: db.internal\n")
+
+    @pulumi.runtime.test
+    def build():
+        tree = SsmParameterTree("config", "/app", document_file=str(tmp_path / "config.yaml"))
+        assert list(tree.manifest) == ["/app/db/host"]
+
+    build()
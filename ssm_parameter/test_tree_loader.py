@@ -0,0 +1,30 @@
+import hashlib
+
+import pytest
+
+from ssm_parameter.tree_loader import ADVANCED_MAX_BYTES, build_manifest, iter_directory, iter_document
+
+
+def test_directory_entries_hash_the_stripped_value(tmp_path):
+    (tmp_path / "db").mkdir()
+    (tmp_path / "db" / "host").write_text("db.internal\n")
+    (tmp_path / "large").write_text("x" * 5000)
+
+    entries = {entry.path: entry for entry in iter_directory(str(tmp_path), "/app/dev")}
+
+    assert entries["/app/dev/db/host"].value == "db.internal"
+    assert entries["/app/dev/db/host"].sha256 == hashlib.sha256(b"db.internal").hexdigest()
+    assert entries["/app/dev/large"].tier == "Advanced"
+
+
+def test_directory_and_document_entries_share_a_manifest(tmp_path):
+    (tmp_path / "port").write_text("5432\n")
+    from_files = build_manifest(iter_directory(str(tmp_path), "/app"))
+    from_document = build_manifest(iter_document({"port": 5432}, "/app"))
+    assert from_files == from_document
+
+
+def test_oversized_files_are_rejected_before_reading(tmp_path):
+    (tmp_path / "blob").write_bytes(b"x" * (ADVANCED_MAX_BYTES + 1))
+    with pytest.raises(ValueError, match="limited to"):
+        list(iter_directory(str(tmp_path), "/app"))
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+STANDARD_MAX_BYTES = 4096
+ADVANCED_MAX_BYTES = 8192
+MAX_HIERARCHY_DEPTH = 15
+MAX_NAME_LENGTH = 1011
+
+_SEGMENT = re.compile(r"^[a-zA-Z0-9_.\-]+$")
+
+
+@dataclass(frozen=True)
+class ParameterEntry:
+    path: str
+    value: str
+    type: str
+    tier: str
+    sha256: str
+
+    @property
+    def size(self) -> int:
+        return len(self.value.encode("utf-8"))
+
+
+def parameter_path(prefix: str, *parts: str) -> str:
+    segments = [s for part in (prefix,) + parts for s in str(part).split("/") if s]
+    for segment in segments:
+        if not _SEGMENT.match(segment):
+            raise ValueError(f"Invalid SSM parameter path segment {segment!r}")
+    if len(segments) > MAX_HIERARCHY_DEPTH:
+        raise ValueError(f"SSM parameter path /{'/'.join(segments)} is deeper than {MAX_HIERARCHY_DEPTH} levels")
+
+    path = "/" + "/".join(segments)
+    if len(path) > MAX_NAME_LENGTH:
+        raise ValueError(f"SSM parameter path {path[:64]}... is longer than {MAX_NAME_LENGTH} characters")
+    return path
+
+
+def choose_tier(size: int, tier: Optional[str] = None) -> str:
+    if size > ADVANCED_MAX_BYTES:
+        raise ValueError(f"SSM parameter values are limited to {ADVANCED_MAX_BYTES} bytes, got {size}")
+    if tier:
+        if tier == "Standard" and size > STANDARD_MAX_BYTES:
+            raise ValueError(f"{size} bytes exceeds the Standard tier limit of {STANDARD_MAX_BYTES}")
+        return tier
+    return "Standard" if size <= STANDARD_MAX_BYTES else "Advanced"
+
+
+def make_entry(path: str, value: str, type: str = "String", tier: Optional[str] = None) -> ParameterEntry:
+    if not value:
+        raise ValueError(f"SSM parameter {path} has an empty value")
+    encoded = value.encode("utf-8")
+    return ParameterEntry(path=path, value=value, type=type, tier=choose_tier(len(encoded), tier),
+                          sha256=hashlib.sha256(encoded).hexdigest())
+
+
+def iter_directory(root: str, prefix: str, type: str = "String") -> Iterator[ParameterEntry]:
+    # One parameter per file, named after its path relative to root. Files are
+    # checked by size before reading, so each is read in one go; the hash is
+    # taken from the stripped value in make_entry, like for documents.
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        relative = os.path.relpath(directory, root)
+        for file_name in sorted(files):
+            file_path = os.path.join(directory, file_name)
+            size = os.path.getsize(file_path)
+            if size > ADVANCED_MAX_BYTES:
+                raise ValueError(f"{file_path} is {size} bytes; SSM parameters are limited to {ADVANCED_MAX_BYTES}")
+
+            with open(file_path, "rb") as f:
+                value = f.read().decode("utf-8").strip()
+
+            parts = [] if relative == "." else relative.split(os.sep)
+            yield make_entry(parameter_path(prefix, *parts, file_name), value, type)
+
+
+def iter_document(document: Dict[str, Any], prefix: str, type: str = "String") -> Iterator[ParameterEntry]:
+    # Nested mappings become path levels; lists of scalars become StringLists
+    stack = [(prefix, document)]
+    while stack:
+        path, node = stack.pop()
+        for key in sorted(node, reverse=True):
+            value = node[key]
+            child = parameter_path(path, str(key))
+            if isinstance(value, dict):
+                stack.append((child, value))
+            elif isinstance(value, list):
+                if any(isinstance(v, (dict, list)) for v in value):
+                    raise ValueError(f"{child}: lists may only contain scalar values")
+                items = [_scalar(v) for v in value]
+                if any("," in item for item in items):
+                    raise ValueError(f"{child}: StringList items cannot contain commas")
+                yield make_entry(child, ",".join(items), "StringList" if type == "String" else type)
+            else:
+                yield make_entry(child, _scalar(value), type)
+
+
+def load_document(file_path: str) -> Dict[str, Any]:
+    with open(file_path) as f:
+        if file_path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("Loading YAML parameter documents requires PyYAML") from e
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+
+    if not isinstance(document, dict):
+        raise ValueError(f"{file_path} must contain a mapping at the top level")
+    return document
+
+
+def build_manifest(entries: Iterable[ParameterEntry]) -> Dict[str, str]:
+    return {entry.path: entry.sha256 for entry in entries}
+
+
+def _scalar(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
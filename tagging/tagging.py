@@ -0,0 +1,126 @@
+import sys
+import pulumi
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+class TagMap(dict):
+    # Interned tag maps are shared by every resource with the same tags, so they
+    # must never change. Still a dict, so Pulumi serializes it like any other.
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Tag maps are shared between resources and cannot be modified; merge into a new one")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return TagMap, (dict(self),)
+
+
+EMPTY_TAGS = TagMap()
+
+
+class TagEngine:
+    # Precedence, lowest first: stack default tags, component tags, the computed
+    # Name tag. Every merged map is interned, so resources with equal tags share
+    # one immutable TagMap. Nothing is hooked until install() is called.
+    def __init__(self):
+        self.installed = False
+        self.default_tags: TagMap = EMPTY_TAGS
+        self.required_tags: Tuple[str, ...] = ()
+        self.missing: Dict[str, List[str]] = {}  # "type name" -> missing required tags
+        self.tagged = 0
+        self._interned: Dict[Tuple, TagMap] = {}
+
+    def configure(self, default_tags: Optional[Mapping[str, Any]] = None, required_tags: Iterable[str] = ()):
+        self.default_tags = self.intern(default_tags or {})
+        self.required_tags = tuple(dict.fromkeys(required_tags))
+
+    def merge(self, tags: Optional[Mapping[str, Any]] = None, name: Optional[str] = None) -> TagMap:
+        if not self.default_tags and name is None and isinstance(tags, TagMap):
+            return tags
+        merged = {**self.default_tags, **(tags or {})}
+        if name is not None:
+            merged["Name"] = name
+        return self.intern(merged)
+
+    def intern(self, tags: Mapping[str, Any]) -> TagMap:
+        try:
+            key = tuple(sorted(tags.items(), key=lambda item: item[0]))
+            hash(key)
+        except TypeError:
+            # Unhashable values cannot be shared; the map is still frozen
+            return TagMap(tags)
+
+        interned = self._interned.get(key)
+        if interned is None:
+            interned = TagMap((sys.intern(k) if isinstance(k, str) else k,
+                               sys.intern(v) if isinstance(v, str) else v) for k, v in key)
+            self._interned[key] = interned
+        return interned
+
+    def install(self):
+        if self.installed:
+            return
+        pulumi.runtime.register_stack_transformation(self._transform)
+        self.installed = True
+
+    def uninstall(self):
+        # Stack transformations cannot be removed; once uninstalled they only pass through
+        self.installed = False
+
+    def clear(self):
+        self.missing.clear()
+        self.tagged = 0
+        self._interned.clear()
+        self.default_tags = EMPTY_TAGS
+
+    def _transform(self, args: pulumi.ResourceTransformationArgs):
+        # Only taggable resources carry a "tags" input; components and resources
+        # such as routes or aliases are left alone.
+        if not self.installed or not isinstance(args.resource, pulumi.CustomResource) or "tags" not in args.props:
+            return None
+
+        tags = args.props["tags"]
+        if isinstance(tags, pulumi.Output):
+            # Unknown until deployment, so defaults are merged late and the tags are not checked
+            merged = tags.apply(lambda resolved: self.merge(resolved))
+        else:
+            merged = self.merge(tags)
+            self._check(args.type_, args.name, merged)
+
+        self.tagged += 1
+        return pulumi.ResourceTransformationResult(props={**args.props, "tags": merged}, opts=args.opts)
+
+    def _check(self, type_: str, name: str, tags: Mapping[str, Any]):
+        missing = [tag for tag in self.required_tags if tag not in tags]
+        if missing:
+            self.missing[f"{type_} {name}"] = missing
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "tagged_resources": self.tagged,
+            "distinct_tag_maps": len(self._interned),
+            "missing_required_tags": dict(self.missing),
+        }
+
+    def summary(self) -> str:
+        lines = [f"tagged {self.tagged} resources with {len(self._interned)} distinct tag maps"]
+        if self.missing:
+            lines.append(f"{len(self.missing)} resources are missing required tags {list(self.required_tags)}:")
+            lines.extend(f"  {resource}: {', '.join(missing)}" for resource, missing in sorted(self.missing.items()))
+        return "\n".join(lines)
+
+
+# One engine per Pulumi program
+tag_engine = TagEngine()
+
+
+def resource_tags(tags: Optional[Mapping[str, Any]] = None, name: Optional[str] = None) -> TagMap:
+    # What components pass as a child's tags: caller tags with the Name on top
+    return tag_engine.merge(tags, name)
@@ -0,0 +1,78 @@
+import copy
+import pickle
+
+import pulumi
+import pulumi_aws as aws
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers
+from tagging.tagging import EMPTY_TAGS, TagEngine, TagMap
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def test_equal_tags_share_one_interned_map():
+    engine = TagEngine()
+    engine.configure({"Environment": "dev"})
+
+    first = engine.merge({"Team": "net"}, name="app-vpc")
+    second = engine.merge({"Name": "ignored", "Team": "net"}, name="app-vpc")
+    assert first is second
+    assert first == {"Environment": "dev", "Team": "net", "Name": "app-vpc"}
+    assert engine.merge({"Environment": "prod"}) == {"Environment": "prod"}
+    assert engine.report()["distinct_tag_maps"] == 3
+
+
+def test_tag_maps_cannot_change():
+    tags = TagEngine().intern({"Team": "net"})
+    with pytest.raises(TypeError, match="cannot be modified"):
+        tags["Team"] = "app"
+    with pytest.raises(TypeError, match="cannot be modified"):
+        tags.update(Owner="me")
+    assert copy.deepcopy(tags) is tags
+    assert pickle.loads(pickle.dumps(tags)) == tags
+
+
+def test_unhashable_values_are_frozen_but_not_shared():
+    engine = TagEngine()
+    first, second = engine.intern({"Owners": ["a"]}), engine.intern({"Owners": ["a"]})
+    assert isinstance(first, TagMap) and first == second and first is not second
+    assert engine.merge(EMPTY_TAGS) is EMPTY_TAGS
+
+
+def test_transformation_merges_defaults_and_reports_missing_tags(mocks):
+    engine = TagEngine()
+    engine.configure({"Environment": "dev"}, required_tags=["CostCenter", "Environment", "CostCenter"])
+
+    @pulumi.runtime.test
+    def build():
+        engine.install()
+        vpc = aws.ec2.Vpc("app-vpc", cidr_block="10.0.0.0/16", tags={"CostCenter": "42"})
+        subnet = aws.ec2.Subnet("app-subnet", vpc_id=vpc.id, cidr_block="10.0.0.0/24")
+        late = aws.ec2.Subnet("app-late", vpc_id=vpc.id, cidr_block="10.0.1.0/24",
+                              tags=vpc.id.apply(lambda vpc_id: {"Vpc": vpc_id}))
+        aws.ec2.Route("app-route", route_table_id="rtb-1", destination_cidr_block="0.0.0.0/0", gateway_id="igw-1")
+        return pulumi.Output.all(subnet.id, late.id).apply(lambda _: check())
+
+    def check():
+        tags = {r.name: r.inputs.get("tags") for r in mocks.resources}
+        assert tags["app-vpc"] == {"Environment": "dev", "CostCenter": "42"}
+        assert tags["app-subnet"] == {"Environment": "dev"}
+        assert tags["app-late"] == {"Environment": "dev", "Vpc": "app-vpc-id"}
+        assert engine.missing == {"aws:ec2/subnet:Subnet app-subnet": ["CostCenter"]}
+        assert engine.report()["tagged_resources"] == 3
+
+    try:
+        build()
+    finally:
+        engine.uninstall()
+    [route] = [r for r in mocks.resources if r.name == "app-route"]
+    assert "tags" not in route.inputs
+    assert "1 resources are missing required tags ['CostCenter', 'Environment']" in engine.summary()
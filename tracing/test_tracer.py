@@ -0,0 +1,74 @@
+import pulumi
+import pulumi_aws as aws
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from kms.kms import KmsModule
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers
+from tracing.tracer import RegistrationTracer
+from vpc_endpoints.endpoint import VpcEndpoint
+
+
+class Unfinished(pulumi.ComponentResource):
+    # Never calls register_outputs
+    def __init__(self, name: str):
+        super().__init__("custom:test:Unfinished", name)
+        aws.ec2.Vpc(f"{name}-vpc", cidr_block="10.0.0.0/16", opts=pulumi.ResourceOptions(parent=self))
+
+
+@pytest.fixture
+def tracer():
+    invoke_cache.clear()
+    clear_providers()
+    set_aws_mocks(AwsMocks())
+    tracer = RegistrationTracer()
+    yield tracer
+    tracer.uninstall()
+
+
+def traces(tracer):
+    return {trace.name: trace for trace in tracer.components}
+
+
+def test_invokes_are_attributed_through_their_parent(tracer):
+    @pulumi.runtime.test
+    def build():
+        tracer.install()
+        Unfinished("open")
+        kms = KmsModule(name="app")
+        vpc = aws.ec2.Vpc("edge-vpc", cidr_block="10.1.0.0/16")
+        endpoint = VpcEndpoint("s3", vpc, "com.amazonaws.__REGION__.s3", "Gateway")
+        return pulumi.Output.all(kms.kms_key.arn, endpoint.endpoint.id).apply(lambda _: check())
+
+    def check():
+        by_name = traces(tracer)
+        assert by_name["open"].invokes == []
+        assert by_name["open"].children == 1
+        assert [record["function"] for record in by_name["s3"].invokes] == ["pulumi_aws.get_region.get_region_output"]
+        # KmsModule is not a component: its lookups belong to the stack
+        assert sorted(record["function"].rsplit(".", 1)[-1] for record in tracer.root_invokes) == \
+            ["get_caller_identity_output", "get_partition_output", "get_region"]
+
+    build()
+
+
+def test_component_time_ends_at_its_last_child(tracer):
+    @pulumi.runtime.test
+    def build():
+        tracer.install()
+        Unfinished("open")
+        aws.ec2.Vpc("later-vpc", cidr_block="10.1.0.0/16")
+
+    build()
+    trace = traces(tracer)["open"]
+    assert trace.seconds is not None and trace.seconds >= 0
+    assert tracer.report()["totals"] == {"components": 1, "resources": 2, "invokes": 0}
+    assert tracer.folded().startswith("<stack>;custom:test:Unfinished open ")
+
+
+def test_uninstalled_tracer_records_nothing(tracer):
+    tracer.install()
+    tracer.uninstall()
+    pulumi.runtime.test(lambda: Unfinished("open"))()
+    assert tracer.components == []
@@ -0,0 +1,165 @@
+import json
+import time
+import pulumi
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from invoke_cache.invoke_cache import invoke_cache
+
+COMPONENT_PREFIX = "custom:"
+ROOT = "<stack>"
+
+
+@dataclass
+class ComponentTrace:
+    type: str
+    name: str
+    parent: Optional["ComponentTrace"] = None
+    started: float = 0.0
+    # Last registration or invoke anywhere below the component
+    finished: Optional[float] = None
+    children: int = 0
+    child_types: Counter = field(default_factory=Counter)
+    invokes: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def seconds(self) -> Optional[float]:
+        return None if self.finished is None else self.finished - self.started
+
+    @property
+    def path(self) -> List[str]:
+        frames = []
+        trace = self
+        while trace is not None:
+            frames.append(f"{trace.type} {trace.name}")
+            trace = trace.parent
+        return [ROOT] + frames[::-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": self.type,
+            "name": self.name,
+            "parent": f"{self.parent.type} {self.parent.name}" if self.parent else None,
+            "seconds": None if self.seconds is None else round(self.seconds, 6),
+            "children": self.children,
+            "child_types": dict(sorted(self.child_types.items())),
+            "invokes": self.invokes,
+        }
+
+
+class RegistrationTracer:
+    # Nothing is hooked until install() is called, so a disabled tracer costs nothing.
+    # Resources are attributed through their parent and invokes through the
+    # parent in their InvokeOptions; the SDK itself is not patched. A component's
+    # time runs from its registration to the last registration or invoke below it.
+    def __init__(self):
+        self.installed = False
+        self.components: List[ComponentTrace] = []
+        self.root_children = 0
+        self.root_invokes: List[Dict[str, Any]] = []
+        self._owners: Dict[int, Any] = {}
+
+    def install(self):
+        if self.installed:
+            return
+        pulumi.runtime.register_stack_transformation(self._transform)
+        invoke_cache.listeners.append(self._on_invoke)
+        self.installed = True
+
+    def uninstall(self):
+        # Stack transformations cannot be removed; once uninstalled they only pass through
+        if not self.installed:
+            return
+        invoke_cache.listeners.remove(self._on_invoke)
+        self.installed = False
+
+    def _transform(self, args: pulumi.ResourceTransformationArgs):
+        if not self.installed:
+            return None
+
+        now = time.perf_counter()
+        owner = self._owner_of(args.opts.parent if args.opts else None)
+        if args.type_.startswith(COMPONENT_PREFIX):
+            trace = ComponentTrace(type=args.type_, name=args.name, parent=owner, started=now, finished=now)
+            self.components.append(trace)
+            # Keep the resource alive so its id() is never reused while traced
+            self._owners[id(args.resource)] = (args.resource, trace)
+        else:
+            if owner is None:
+                self.root_children += 1
+            else:
+                owner.children += 1
+                owner.child_types[args.type_] += 1
+            self._owners[id(args.resource)] = (args.resource, owner)
+        self._touch(owner, now)
+        return None
+
+    def _on_invoke(self, name: str, hit: bool, seconds: float, parent: Optional[pulumi.Resource] = None):
+        record = {"function": name, "cached": hit, "seconds": round(seconds, 6)}
+        owner = self._owner_of(parent)
+        if owner is not None:
+            owner.invokes.append(record)
+            self._touch(owner, time.perf_counter())
+        else:
+            self.root_invokes.append(record)
+
+    @staticmethod
+    def _touch(trace: Optional[ComponentTrace], now: float):
+        while trace is not None:
+            trace.finished = now
+            trace = trace.parent
+
+    def _owner_of(self, parent) -> Optional[ComponentTrace]:
+        if parent is None:
+            return None
+        entry = self._owners.get(id(parent))
+        return entry[1] if entry else None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "components": [trace.to_dict() for trace in self.components],
+            "root": {"children": self.root_children, "invokes": self.root_invokes},
+            "totals": {
+                "components": len(self.components),
+                "resources": self.root_children + sum(t.children for t in self.components),
+                "invokes": len(self.root_invokes) + sum(len(t.invokes) for t in self.components),
+            },
+        }
+
+    def summary(self) -> str:
+        lines = [f"{'component':60} {'ms':>9} {'children':>8} {'invokes':>7}"]
+        ordered = sorted(self.components, key=lambda t: t.seconds or 0.0, reverse=True)
+        for trace in ordered:
+            ms = "-" if trace.seconds is None else f"{trace.seconds * 1000:.1f}"
+            lines.append(f"{trace.type + ' ' + trace.name:60} {ms:>9} {trace.children:>8} {len(trace.invokes):>7}")
+        totals = self.report()["totals"]
+        lines.append(f"{totals['components']} components, {totals['resources']} resources, {totals['invokes']} invokes")
+        return "\n".join(lines)
+
+    def folded(self) -> str:
+        # Flamegraph folded stacks weighted by each component's self time in microseconds
+        nested: Dict[int, float] = Counter()
+        for trace in self.components:
+            if trace.parent is not None and trace.seconds is not None:
+                nested[id(trace.parent)] += trace.seconds
+
+        lines = []
+        for trace in self.components:
+            if trace.seconds is None:
+                continue
+            self_us = max(int((trace.seconds - nested[id(trace)]) * 1_000_000), 0)
+            lines.append(f"{';'.join(trace.path)} {self_us}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path_prefix: str, folded: bool = False):
+        with open(f"{path_prefix}.json", "w") as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+        with open(f"{path_prefix}.txt", "w") as f:
+            f.write(self.summary() + "\n")
+        if folded:
+            with open(f"{path_prefix}.folded", "w") as f:
+                f.write(self.folded())
+
+
+tracer = RegistrationTracer()
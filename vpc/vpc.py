@@ -1,6 +1,7 @@
 import pulumi
 import pulumi_aws as aws
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
+from tagging.tagging import resource_tags
 
 class VpcOnly(pulumi.ComponentResource):
     def __init__(self,
@@ -9,6 +10,7 @@ class VpcOnly(pulumi.ComponentResource):
                  enable_dns_support: bool = True,
                  enable_dns_hostnames: bool = True,
                  instance_tenancy: Optional[str] = "default",  # default or dedicated
+                 flow_logs: Optional[Dict[str, Any]] = None,  # VpcFlowLogs arguments, e.g. {"kms_key_arn": ...}
                  tags: Optional[Dict[str, str]] = None,
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__('custom:aws:VpcOnly', name, None, opts)
@@ -19,10 +21,22 @@ class VpcOnly(pulumi.ComponentResource):
             enable_dns_support=enable_dns_support,
             enable_dns_hostnames=enable_dns_hostnames,
             instance_tenancy=instance_tenancy,
-            tags={**(tags or {}), "Name": name},
+            tags=resource_tags(tags, name),
             opts=pulumi.ResourceOptions(parent=self)
         )
 
+        self.flow_logs = None
+        if flow_logs is not None:
+            # Only stacks with flow logs load the module, like the opt-in component in __main__.py
+            from vpc_flow_logs.flow_logs import VpcFlowLogs
+            self.flow_logs = VpcFlowLogs(f"{name}-flow-logs",
+                vpc_id=self.vpc.id,
+                tags=tags,
+                opts=pulumi.ResourceOptions(parent=self),
+                **flow_logs
+            )
+
         self.register_outputs({
-            "vpc": self.vpc
+            "vpc": self.vpc,
+            "flow_logs_bucket_arn": self.flow_logs.destination_bucket_arn if self.flow_logs else None
         })
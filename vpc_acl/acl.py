@@ -1,6 +1,8 @@
 import pulumi
 import pulumi_aws as aws
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
+from vpc_acl.rule_compiler import NaclRule, compile_rules, MAX_RULES_PER_DIRECTION
+from tagging.tagging import resource_tags
 
 class VpcAcl(pulumi.ComponentResource):
     def __init__(self,
@@ -8,40 +10,49 @@ class VpcAcl(pulumi.ComponentResource):
                  vpc: aws.ec2.Vpc,
                  subnets: Dict[str, Dict[str, str]],  # e.g., {"subnet-a": {"id": "..."}}
                  rules: Dict[str, Dict[str, Any]],
+                 compiled_rules: Optional[List[NaclRule]] = None,  # output of compile_rules, skips compilation
+                 inline_rules: bool = False,  # emit rules on the NetworkAcl instead of one resource per rule
+                 auto_number: Optional[bool] = None,  # False requires a "number" on every rule; others get free numbers
+                 merge_rules: bool = True,
+                 max_rules_per_direction: int = MAX_RULES_PER_DIRECTION,
                  tags: Optional[Dict[str, str]] = None,
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__('custom:aws:VpcAcl', name, None, opts)
 
         subnet_ids = [subnet["id"] for subnet in subnets.values()]
 
+        # Normalize, dedupe, merge and number the rules before creating anything
+        self.rules = compiled_rules if compiled_rules is not None else compile_rules(
+            rules,
+            auto_number=auto_number,
+            merge=merge_rules,
+            max_rules_per_direction=max_rules_per_direction,
+        )
+
+        inline_args = {}
+        if inline_rules:
+            inline_args = {
+                "ingress": [aws.ec2.NetworkAclIngressArgs(**rule.inline_args()) for rule in self.rules if not rule.egress],
+                "egress": [aws.ec2.NetworkAclEgressArgs(**rule.inline_args()) for rule in self.rules if rule.egress],
+            }
+
         # Create the Network ACL
         nacl = aws.ec2.NetworkAcl(f"{name}-nacl",
             vpc_id=vpc.id,
             subnet_ids=subnet_ids,
-            tags={**(tags or {}), "Name": name},
-            opts=pulumi.ResourceOptions(parent=self)
+            tags=resource_tags(tags, name),
+            opts=pulumi.ResourceOptions(parent=self),
+            **inline_args
         )
 
         # Add rules
-        for key, rule in rules.items():
-            base_args = {
-                "network_acl_id": nacl.id,
-                "rule_number": rule["number"],
-                "rule_action": rule["action"],
-                "protocol": rule["protocol"],
-                "from_port": rule.get("from_port", 0),
-                "to_port": rule.get("to_port", 0),
-                "cidr_block": rule.get("ipv4_cidr"),
-                "ipv6_cidr_block": rule.get("ipv6_cidr"),
-                "icmp_type": rule.get("icmp_type", 0),
-                "icmp_code": rule.get("icmp_code", 0),
-                "egress": rule["direction"] == "egress",
-            }
-
-            aws.ec2.NetworkAclRule(f"{name}-rule-{key}",
-                **base_args,
-                opts=pulumi.ResourceOptions(parent=nacl)
-            )
+        if not inline_rules:
+            for rule in self.rules:
+                aws.ec2.NetworkAclRule(f"{name}-rule-{rule.key}",
+                    network_acl_id=nacl.id,
+                    **rule.rule_args(),
+                    opts=pulumi.ResourceOptions(parent=nacl)
+                )
 
         self.nacl = nacl
         self.register_outputs({"network_acl_id": self.nacl.id})
@@ -0,0 +1,323 @@
+import ipaddress
+from dataclasses import dataclass, replace
+from itertools import groupby
+from typing import Any, Dict, List, Optional
+
+PROTOCOLS = {
+    "-1": "-1", "all": "-1",
+    "1": "1", "icmp": "1",
+    "6": "6", "tcp": "6",
+    "17": "17", "udp": "17",
+    "58": "58", "icmpv6": "58",
+}
+ICMP_PROTOCOLS = ("1", "58")
+# Other IP protocol numbers are passed through without port or ICMP fields
+MAX_PROTOCOL_NUMBER = 255
+
+# AWS default quota: 20 inbound and 20 outbound rules per network ACL
+MAX_RULES_PER_DIRECTION = 20
+MIN_RULE_NUMBER = 1
+MAX_RULE_NUMBER = 32766
+
+
+class RuleConflictError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class NaclRule:
+    key: str
+    number: int
+    action: str
+    egress: bool
+    protocol: str
+    from_port: int
+    to_port: int
+    cidr_block: Optional[str] = None
+    ipv6_cidr_block: Optional[str] = None
+    icmp_type: int = 0
+    icmp_code: int = 0
+
+    @property
+    def direction(self) -> str:
+        return "egress" if self.egress else "ingress"
+
+    def rule_args(self) -> Dict[str, Any]:
+        # Arguments for a standalone aws.ec2.NetworkAclRule (minus network_acl_id)
+        return {
+            "rule_number": self.number,
+            "rule_action": self.action,
+            "protocol": self.protocol,
+            "from_port": self.from_port,
+            "to_port": self.to_port,
+            "cidr_block": self.cidr_block,
+            "ipv6_cidr_block": self.ipv6_cidr_block,
+            "icmp_type": self.icmp_type,
+            "icmp_code": self.icmp_code,
+            "egress": self.egress,
+        }
+
+    def inline_args(self) -> Dict[str, Any]:
+        # One entry of the ingress/egress lists on aws.ec2.NetworkAcl
+        return {
+            "rule_no": self.number,
+            "action": self.action,
+            "protocol": self.protocol,
+            "from_port": self.from_port,
+            "to_port": self.to_port,
+            "cidr_block": self.cidr_block,
+            "ipv6_cidr_block": self.ipv6_cidr_block,
+            "icmp_type": self.icmp_type,
+            "icmp_code": self.icmp_code,
+        }
+
+
+@dataclass(frozen=True)
+class _Entry:
+    order: tuple
+    key: str
+    number: Optional[int]
+    action: str
+    egress: bool
+    protocol: str
+    from_port: int
+    to_port: int
+    network: Any
+    icmp_type: int
+    icmp_code: int
+
+    def match_key(self):
+        return self.protocol, self.from_port, self.to_port, self.icmp_type, self.icmp_code, self.network
+
+    def covers(self, other: "_Entry") -> bool:
+        if self.network.version != other.network.version or not other.network.subnet_of(self.network):
+            return False
+        if self.protocol == "-1":
+            return True
+        if self.protocol != other.protocol:
+            return False
+        if self.protocol in ICMP_PROTOCOLS:
+            return self.icmp_type in (-1, other.icmp_type) and self.icmp_code in (-1, other.icmp_code)
+        return self.from_port <= other.from_port and other.to_port <= self.to_port
+
+
+def normalize_rule(key: str, rule: Dict[str, Any], index: int) -> _Entry:
+    action = str(rule.get("action", "")).lower()
+    if action not in ("allow", "deny"):
+        raise ValueError(f"Rule '{key}': action must be 'allow' or 'deny', got {rule.get('action')!r}")
+
+    direction = str(rule.get("direction", "")).lower()
+    if direction not in ("ingress", "egress"):
+        raise ValueError(f"Rule '{key}': direction must be 'ingress' or 'egress', got {rule.get('direction')!r}")
+
+    protocol = _protocol(rule.get("protocol", "-1"))
+    if protocol is None:
+        raise ValueError(f"Rule '{key}': unsupported protocol {rule.get('protocol')!r}")
+
+    ipv4_cidr, ipv6_cidr = rule.get("ipv4_cidr"), rule.get("ipv6_cidr")
+    if bool(ipv4_cidr) == bool(ipv6_cidr):
+        raise ValueError(f"Rule '{key}': exactly one of 'ipv4_cidr' or 'ipv6_cidr' must be set")
+    network = ipaddress.ip_network(ipv4_cidr or ipv6_cidr, strict=False)
+
+    from_port, to_port = int(rule.get("from_port", 0)), int(rule.get("to_port", 0))
+    icmp_type, icmp_code = int(rule.get("icmp_type", 0)), int(rule.get("icmp_code", 0))
+    if protocol in ("6", "17"):
+        if not 0 <= from_port <= to_port <= 65535:
+            raise ValueError(f"Rule '{key}': invalid port range {from_port}-{to_port}")
+        icmp_type = icmp_code = 0
+    elif protocol in ICMP_PROTOCOLS:
+        from_port = to_port = 0
+    else:
+        from_port = to_port = icmp_type = icmp_code = 0
+
+    number = rule.get("number")
+    if number is not None:
+        number = int(number)
+        if not MIN_RULE_NUMBER <= number <= MAX_RULE_NUMBER:
+            raise ValueError(f"Rule '{key}': rule number {number} is outside {MIN_RULE_NUMBER}-{MAX_RULE_NUMBER}")
+
+    # Unnumbered rules are placed after the numbered rule declared before them (see _place_unnumbered)
+    order = (number if number is not None else MAX_RULE_NUMBER + 1, index)
+    return _Entry(order, key, number, action, direction == "egress", protocol,
+                  from_port, to_port, network, icmp_type, icmp_code)
+
+
+def _protocol(value: Any) -> Optional[str]:
+    # Names and aliases, or any IP protocol number (e.g. "47" for GRE, "50" for ESP)
+    name = str(value).strip().lower()
+    if name in PROTOCOLS:
+        return PROTOCOLS[name]
+    if name.isdigit() and 0 <= int(name) <= MAX_PROTOCOL_NUMBER:
+        return str(int(name))
+    return None
+
+
+def compile_rules(rules: Dict[str, Dict[str, Any]],
+                  auto_number: Optional[bool] = None,  # False requires every rule to have a "number"
+                  start: int = 100,
+                  step: int = 10,
+                  merge: bool = True,
+                  max_rules_per_direction: int = MAX_RULES_PER_DIRECTION) -> List[NaclRule]:
+    # Explicit numbers are always kept: rule_number forces replacement of a
+    # NetworkAclRule, so renumbering would replace every rule of the ACL.
+    # Rules without a number get free numbers after the rule declared before them.
+    entries = [normalize_rule(key, rule, i) for i, (key, rule) in enumerate(rules.items())]
+    if auto_number is False and any(e.number is None for e in entries):
+        raise ValueError("Every rule needs a 'number' when auto_number is disabled")
+
+    compiled = []
+    for egress in (False, True):
+        direction_name = "egress" if egress else "ingress"
+        direction = [e for e in entries if e.egress == egress]
+        _check_duplicate_numbers([e for e in direction if e.number is not None], direction_name)
+        direction = sorted(_place_unnumbered(direction), key=lambda e: e.order)
+        _check_shadowed(direction, direction_name)
+
+        merged = []
+        for _, run in groupby(direction, key=lambda e: e.action):
+            run = list(run)
+            merged += _merge_run(run) if merge else run
+
+        if len(merged) > max_rules_per_direction:
+            raise RuleConflictError(
+                f"{len(merged)} {direction_name} rules exceed the limit of {max_rules_per_direction} per network ACL")
+
+        numbers = _assign_numbers(merged, start, step, direction_name)
+        for entry, number in zip(merged, numbers):
+            compiled.append(NaclRule(
+                key=entry.key,
+                number=number,
+                action=entry.action,
+                egress=egress,
+                protocol=entry.protocol,
+                from_port=entry.from_port,
+                to_port=entry.to_port,
+                cidr_block=str(entry.network) if entry.network.version == 4 else None,
+                ipv6_cidr_block=str(entry.network) if entry.network.version == 6 else None,
+                icmp_type=entry.icmp_type,
+                icmp_code=entry.icmp_code,
+            ))
+
+    return compiled
+
+
+def _place_unnumbered(entries: List[_Entry]) -> List[_Entry]:
+    # An unnumbered rule sorts right after the last numbered rule declared
+    # before it, or first when none is; declaration order breaks ties
+    placed, previous = [], 0
+    for entry in entries:
+        if entry.number is not None:
+            previous = entry.number
+            placed.append(entry)
+        else:
+            placed.append(replace(entry, order=(previous, entry.order[1])))
+    return placed
+
+
+def _assign_numbers(entries: List[_Entry], start: int, step: int, direction: str) -> List[int]:
+    # Runs of unnumbered rules take free numbers between their numbered
+    # neighbours: every step after the lower one (from start at the top)
+    # when they fit, otherwise spread evenly over the gap
+    numbers: List[Optional[int]] = [e.number for e in entries]
+    i = 0
+    while i < len(entries):
+        if numbers[i] is not None:
+            i += 1
+            continue
+        end = i
+        while end < len(entries) and numbers[end] is None:
+            end += 1
+        lower = numbers[i - 1] if i > 0 else 0
+        upper = numbers[end] if end < len(entries) else MAX_RULE_NUMBER + 1
+        count = end - i
+
+        first = lower + step if lower else start
+        if first + (count - 1) * step < upper:
+            run = [first + j * step for j in range(count)]
+        else:
+            gap = (upper - lower) // (count + 1)
+            if gap < 1:
+                keys = ", ".join(f"'{e.key}'" for e in entries[i:end])
+                raise RuleConflictError(
+                    f"No free {direction} rule numbers between {lower} and {upper} for rules {keys}")
+            run = [lower + (j + 1) * gap for j in range(count)]
+        numbers[i:end] = run
+        i = end
+    return numbers
+
+
+def _check_duplicate_numbers(entries: List[_Entry], direction: str):
+    seen = {}
+    for entry in entries:
+        if entry.number in seen:
+            raise RuleConflictError(
+                f"Rules '{seen[entry.number]}' and '{entry.key}' both use {direction} rule number {entry.number}")
+        seen[entry.number] = entry.key
+
+
+def _check_shadowed(entries: List[_Entry], direction: str):
+    # A rule fully covered by an earlier rule with the opposite action can never match
+    for i, entry in enumerate(entries):
+        for earlier in entries[:i]:
+            if earlier.action != entry.action and earlier.covers(entry):
+                raise RuleConflictError(
+                    f"{direction} rule '{entry.key}' ({entry.action}) is shadowed by '{earlier.key}' ({earlier.action})")
+
+
+def _merge_run(run: List[_Entry]) -> List[_Entry]:
+    # All rules in a run share one action, so any union of them is equivalent
+    # to the original sequence.
+    entries = list({e.match_key(): e for e in reversed(run)}.values())
+    while True:
+        size = len(entries)
+        entries = _merge_ports(_collapse_cidrs(entries))
+        if len(entries) == size:
+            return sorted(entries, key=lambda e: e.order)
+
+
+def _collapse_cidrs(entries: List[_Entry]) -> List[_Entry]:
+    result = []
+    groups: Dict[tuple, List[_Entry]] = {}
+    for entry in entries:
+        key = (entry.protocol, entry.from_port, entry.to_port, entry.icmp_type, entry.icmp_code, entry.network.version)
+        groups.setdefault(key, []).append(entry)
+
+    for group in groups.values():
+        if len(group) == 1:
+            result += group
+            continue
+        group.sort(key=lambda e: e.order)
+        for network in ipaddress.collapse_addresses(e.network for e in group):
+            members = [e for e in group if e.network.subnet_of(network)]
+            result.append(replace(members[0], network=network, number=_min_number(members)))
+    return result
+
+
+def _merge_ports(entries: List[_Entry]) -> List[_Entry]:
+    result = []
+    groups: Dict[tuple, List[_Entry]] = {}
+    for entry in entries:
+        if entry.protocol in ("6", "17"):
+            groups.setdefault((entry.protocol, entry.network), []).append(entry)
+        else:
+            result.append(entry)
+
+    for group in groups.values():
+        group.sort(key=lambda e: (e.from_port, e.to_port))
+        members = [group[0]]
+        low, high = group[0].from_port, group[0].to_port
+        for entry in group[1:] + [None]:
+            if entry is not None and entry.from_port <= high + 1:
+                members.append(entry)
+                high = max(high, entry.to_port)
+                continue
+            first = min(members, key=lambda e: e.order)
+            result.append(replace(first, from_port=low, to_port=high, number=_min_number(members)))
+            if entry is not None:
+                members, low, high = [entry], entry.from_port, entry.to_port
+    return result
+
+
+def _min_number(entries: List[_Entry]) -> Optional[int]:
+    numbers = [e.number for e in entries if e.number is not None]
+    return min(numbers) if numbers else None
@@ -0,0 +1,90 @@
+import pytest
+
+from vpc_acl.rule_compiler import RuleConflictError, compile_rules
+
+
+def rule(cidr, action="allow", direction="ingress", protocol="tcp", port=443, number=None):
+    spec = {"action": action, "direction": direction, "ipv4_cidr": cidr, "protocol": protocol,
+            "from_port": port, "to_port": port}
+    if number is not None:
+        spec["number"] = number
+    return spec
+
+
+def numbers(compiled):
+    return {r.key: r.number for r in compiled}
+
+
+def test_explicit_numbers_are_kept_when_a_rule_has_none():
+    compiled = compile_rules({
+        "deny-admin": rule("10.9.0.0/16", action="deny", number=50),
+        "ssh": rule("192.168.0.0/16", port=22),
+        "https": rule("172.16.0.0/12", number=200),
+        "late": rule("100.64.0.0/10", port=80),
+    })
+    assert numbers(compiled) == {"deny-admin": 50, "ssh": 60, "https": 200, "late": 210}
+
+
+def test_unnumbered_rules_before_any_numbered_rule_start_at_start():
+    compiled = compile_rules({
+        "a": rule("10.0.0.0/8"),
+        "b": rule("192.168.0.0/16", port=22),
+        "c": rule("172.16.0.0/12", number=500),
+    })
+    assert numbers(compiled) == {"a": 100, "b": 110, "c": 500}
+
+
+def test_unnumbered_rules_spread_over_a_narrow_gap():
+    compiled = compile_rules({
+        "a": rule("10.0.0.0/8", number=100),
+        "b": rule("192.168.0.0/16", port=22),
+        "c": rule("100.64.0.0/10", port=80),
+        "d": rule("172.16.0.0/12", number=106),
+    })
+    assert numbers(compiled) == {"a": 100, "b": 102, "c": 104, "d": 106}
+
+
+def test_no_free_number_raises():
+    with pytest.raises(RuleConflictError, match="No free ingress rule numbers between 1 and 2"):
+        compile_rules({
+            "a": rule("10.0.0.0/8", number=1),
+            "b": rule("192.168.0.0/16", port=22),
+            "c": rule("172.16.0.0/12", number=2),
+        })
+
+
+def test_auto_number_disabled_requires_numbers():
+    with pytest.raises(ValueError, match="needs a 'number'"):
+        compile_rules({"a": rule("10.0.0.0/8")}, auto_number=False)
+
+
+def test_duplicate_numbers_raise():
+    with pytest.raises(RuleConflictError, match="both use ingress rule number 100"):
+        compile_rules({"a": rule("10.0.0.0/8", number=100), "b": rule("192.168.0.0/16", port=22, number=100)})
+
+
+@pytest.mark.parametrize("protocol", ["47", "50", "51", "0", "255"])
+def test_any_ip_protocol_number_is_passed_through(protocol):
+    [compiled] = compile_rules({"tunnel": rule("10.0.0.0/8", protocol=protocol, number=100)})
+    assert compiled.protocol == protocol
+    assert (compiled.from_port, compiled.to_port, compiled.icmp_type, compiled.icmp_code) == (0, 0, 0, 0)
+
+
+@pytest.mark.parametrize("protocol, expected", [("all", "-1"), ("TCP", "6"), ("icmpv6", "58"), ("017", "17")])
+def test_protocol_aliases(protocol, expected):
+    [compiled] = compile_rules({"r": rule("10.0.0.0/8", protocol=protocol, number=100)})
+    assert compiled.protocol == expected
+
+
+@pytest.mark.parametrize("protocol", ["256", "gre", "-2"])
+def test_unknown_protocols_raise(protocol):
+    with pytest.raises(ValueError, match="unsupported protocol"):
+        compile_rules({"r": rule("10.0.0.0/8", protocol=protocol, number=100)})
+
+
+def test_same_action_runs_merge_but_keep_the_lowest_number():
+    compiled = compile_rules({
+        "a": rule("10.0.0.0/9", number=100),
+        "b": rule("10.128.0.0/9", number=110),
+    })
+    assert [(r.cidr_block, r.number) for r in compiled] == [("10.0.0.0/8", 100)]
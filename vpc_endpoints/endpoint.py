@@ -1,6 +1,8 @@
 import pulumi
 import pulumi_aws as aws
 from typing import Optional, List, Dict
+from invoke_cache.invoke_cache import get_region_output, invoke_options
+from tagging.tagging import resource_tags
 
 class VpcEndpoint(pulumi.ComponentResource):
     def __init__(self,
@@ -14,7 +16,8 @@ class VpcEndpoint(pulumi.ComponentResource):
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__("custom:network:VpcEndpoint", name, {}, opts)
 
-        region = aws.get_region()
+        # Resolved by the engine, without blocking the registrations below
+        region_name = get_region_output(invoke_options(self)).name
 
         lower_type = endpoint_type.lower()
         is_interface = lower_type == "interface"
@@ -28,12 +31,12 @@ class VpcEndpoint(pulumi.ComponentResource):
                 name=f"{name}-sg",
                 description=f"Security group for VPC endpoint {name}",
                 vpc_id=vpc.id,
-                tags={"Name": f"{name}-sg", **(tags or {})},
+                tags=resource_tags(tags, f"{name}-sg"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
         # Replace "__REGION__" with actual region
-        service_name = endpoint_service.replace("__REGION__", region.name)
+        service_name = region_name.apply(lambda region: endpoint_service.replace("__REGION__", region))
 
         endpoint = aws.ec2.VpcEndpoint(
             f"{name}-endpoint",
@@ -44,7 +47,7 @@ class VpcEndpoint(pulumi.ComponentResource):
             subnet_ids=allowed_subnets if is_interface else None,
             route_table_ids=gateway_route_tables if is_gateway else None,
             security_group_ids=[sg.id] if is_interface and sg else None,
-            tags={"Name": name, **(tags or {})},
+            tags=resource_tags(tags, name),
             opts=pulumi.ResourceOptions(parent=self)
         )
 
@@ -53,3 +56,61 @@ class VpcEndpoint(pulumi.ComponentResource):
             "endpoint": endpoint,
             "security_group": sg
         })
+
+
+class VpcEndpointSet(pulumi.ComponentResource):
+    def __init__(self,
+                 name: str,
+                 vpc: aws.ec2.Vpc,
+                 services: List[str],  # e.g. ["ssm", "ssmmessages", "ec2messages"] or full service names
+                 allowed_subnets: List[aws.ec2.Subnet],
+                 allowed_cidr_blocks: Optional[List[str]] = None,  # defaults to the VPC CIDR
+                 private_dns_enabled: bool = True,
+                 tags: Optional[Dict[str, str]] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__("custom:network:VpcEndpointSet", name, {}, opts)
+
+        # One region lookup and one security group shared by every endpoint
+        region_name = get_region_output(invoke_options(self)).name
+
+        self.security_group = aws.ec2.SecurityGroup(
+            f"{name}-sg",
+            name=f"{name}-sg",
+            description=f"HTTPS to interface endpoints {name}",
+            vpc_id=vpc.id,
+            ingress=[aws.ec2.SecurityGroupIngressArgs(
+                description="HTTPS from the VPC",
+                protocol="tcp",
+                from_port=443,
+                to_port=443,
+                cidr_blocks=allowed_cidr_blocks or [vpc.cidr_block],
+            )],
+            tags=resource_tags(tags, f"{name}-sg"),
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        self.endpoints: Dict[str, aws.ec2.VpcEndpoint] = {}
+        for service in services:
+            short_name = service.split(".", 3)[-1] if service.startswith("com.amazonaws.") else service
+            if short_name in self.endpoints:
+                raise ValueError(f"Service '{short_name}' is listed more than once")
+            service_name = region_name.apply(lambda region, short_name=short_name: f"com.amazonaws.{region}.{short_name}")
+            endpoint_name = f"{name}-{short_name.replace('.', '-')}"
+
+            # Nothing blocks between registrations, so the engine creates these in parallel
+            self.endpoints[short_name] = aws.ec2.VpcEndpoint(
+                f"{endpoint_name}-endpoint",
+                vpc_id=vpc.id,
+                vpc_endpoint_type="Interface",
+                service_name=service_name,
+                private_dns_enabled=private_dns_enabled,
+                subnet_ids=allowed_subnets,
+                security_group_ids=[self.security_group.id],
+                tags=resource_tags(tags, endpoint_name),
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+        self.register_outputs({
+            "endpoint_ids": {service: endpoint.id for service, endpoint in self.endpoints.items()},
+            "security_group": self.security_group
+        })
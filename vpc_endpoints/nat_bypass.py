@@ -0,0 +1,87 @@
+import pulumi
+import pulumi_aws as aws
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from vpc_endpoints.endpoint import VpcEndpoint
+
+# The only services AWS offers gateway endpoints for
+GATEWAY_SERVICES = ("s3", "dynamodb")
+
+
+@dataclass(frozen=True)
+class NatBypassPlan:
+    route_tables: Tuple[str, ...]  # keys of the route tables with a NAT default route
+    attach: Dict[str, Tuple[str, ...]]  # service -> tables that get this planner's gateway endpoint
+    already_covered: Dict[str, Tuple[str, ...]]  # service -> tables routed by another endpoint
+
+    def uncovered(self) -> Dict[str, Tuple[str, ...]]:
+        return {service: tuple(t for t in self.route_tables
+                               if t not in self.attach[service] and t not in self.already_covered[service])
+                for service in self.attach}
+
+    def report(self) -> str:
+        lines = [f"NAT bypass: {len(self.route_tables)} route table(s) egress through NAT"]
+        for service in self.attach:
+            lines.append(f"  {service:9} attached: {', '.join(self.attach[service]) or '-'}"
+                         f"; already covered: {', '.join(self.already_covered[service]) or '-'}")
+        return "\n".join(lines)
+
+
+def plan_nat_bypass(nat_route_tables: Iterable[str],
+                    services: Iterable[str] = GATEWAY_SERVICES,
+                    existing_coverage: Optional[Dict[str, Iterable[str]]] = None) -> NatBypassPlan:
+    # A route table may only hold one route per prefix list, so tables already
+    # attached to another endpoint for a service are left alone for that service
+    route_tables = tuple(dict.fromkeys(nat_route_tables))
+    services = tuple(dict.fromkeys(services))
+    unknown = set(services) - set(GATEWAY_SERVICES)
+    if unknown:
+        raise ValueError(f"Gateway endpoints only exist for {GATEWAY_SERVICES}, got {sorted(unknown)}")
+
+    existing_coverage = existing_coverage or {}
+    attach, already_covered = {}, {}
+    for service in services:
+        covered = set(existing_coverage.get(service, ()))
+        already_covered[service] = tuple(t for t in route_tables if t in covered)
+        attach[service] = tuple(t for t in route_tables if t not in covered)
+    return NatBypassPlan(route_tables=route_tables, attach=attach, already_covered=already_covered)
+
+
+class NatBypassEndpoints(pulumi.ComponentResource):
+    # Attaches S3/DynamoDB gateway endpoints to every route table a NatGateway
+    # routes, so that traffic skips NAT throughput limits and per-GB processing.
+    def __init__(self,
+                 name: str,
+                 vpc: aws.ec2.Vpc,
+                 nat_route_table_ids: Dict[str, pulumi.Input[str]],  # e.g. NatGateway.routed_route_table_ids
+                 services: Iterable[str] = GATEWAY_SERVICES,
+                 existing_coverage: Optional[Dict[str, List[str]]] = None,  # service -> route table keys
+                 endpoint_names: Optional[Dict[str, str]] = None,  # service -> VpcEndpoint name, default "{name}-{service}"
+                 endpoint_opts: Optional[Dict[str, pulumi.ResourceOptions]] = None,  # e.g. aliases for adopted endpoints
+                 tags: Optional[Dict[str, str]] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__("custom:network:NatBypassEndpoints", name, {}, opts)
+
+        self.plan = plan_nat_bypass(nat_route_table_ids, services, existing_coverage)
+        self.report = self.plan.report()
+        pulumi.log.info(self.report, resource=self)
+
+        self.endpoints: Dict[str, VpcEndpoint] = {}
+        for service, table_keys in self.plan.attach.items():
+            if not table_keys:
+                continue
+            endpoint_name = (endpoint_names or {}).get(service, f"{name}-{service}")
+            self.endpoints[service] = VpcEndpoint(endpoint_name,
+                vpc=vpc,
+                endpoint_service=f"com.amazonaws.__REGION__.{service}",
+                endpoint_type="Gateway",
+                gateway_route_tables=[nat_route_table_ids[key] for key in table_keys],
+                tags=tags,
+                opts=pulumi.ResourceOptions.merge(pulumi.ResourceOptions(parent=self),
+                                                  (endpoint_opts or {}).get(service))
+            )
+
+        self.register_outputs({
+            "endpoint_ids": {service: endpoint.endpoint.id for service, endpoint in self.endpoints.items()},
+            "covered_route_tables": {service: list(keys) for service, keys in self.plan.attach.items()},
+        })
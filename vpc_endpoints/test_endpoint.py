@@ -0,0 +1,67 @@
+import pulumi
+import pulumi_aws as aws
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers, regional_provider
+from vpc_endpoints.endpoint import VpcEndpointSet
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def registered(mocks, typ):
+    return {r.name: r.inputs for r in mocks.resources if r.typ == typ}
+
+
+def test_endpoints_share_one_security_group_and_region_lookup(mocks):
+    @pulumi.runtime.test
+    def build():
+        vpc = aws.ec2.Vpc("core-vpc", cidr_block="10.0.0.0/16")
+        endpoints = VpcEndpointSet("core", vpc, ["ssm", "com.amazonaws.us-east-2.ecr.api", "kms"],
+                                   allowed_subnets=["subnet-a", "subnet-b"])
+        assert list(endpoints.endpoints) == ["ssm", "ecr.api", "kms"]
+        return pulumi.Output.all(*[e.id for e in endpoints.endpoints.values()]).apply(lambda _: check())
+
+    def check():
+        endpoints = registered(mocks, "aws:ec2/vpcEndpoint:VpcEndpoint")
+        assert {name: inputs["serviceName"] for name, inputs in endpoints.items()} == {
+            "core-ssm-endpoint": "com.amazonaws.us-east-2.ssm",
+            "core-ecr-api-endpoint": "com.amazonaws.us-east-2.ecr.api",
+            "core-kms-endpoint": "com.amazonaws.us-east-2.kms",
+        }
+        assert {tuple(inputs["securityGroupIds"]) for inputs in endpoints.values()} == {("core-sg-id",)}
+        [group] = registered(mocks, "aws:ec2/securityGroup:SecurityGroup").values()
+        assert group["ingress"][0]["cidrBlocks"] == ["10.0.0.0/16"]
+        assert [call.token for call in mocks.calls] == ["aws:index/getRegion:getRegion"]
+
+    build()
+
+
+def test_service_names_follow_the_provider_region(mocks):
+    @pulumi.runtime.test
+    def build():
+        west = regional_provider("us-west-2")
+        vpc = aws.ec2.Vpc("west-vpc", cidr_block="10.1.0.0/16", opts=pulumi.ResourceOptions(provider=west))
+        endpoints = VpcEndpointSet("west", vpc, ["sts"], allowed_subnets=[], allowed_cidr_blocks=["10.1.0.0/20"],
+                                   opts=pulumi.ResourceOptions(provider=west))
+        return endpoints.endpoints["sts"].service_name.apply(check)
+
+    def check(service_name):
+        assert service_name == "com.amazonaws.us-west-2.sts"
+        [group] = registered(mocks, "aws:ec2/securityGroup:SecurityGroup").values()
+        assert group["ingress"][0]["cidrBlocks"] == ["10.1.0.0/20"]
+
+    build()
+
+
+def test_duplicate_services_raise(mocks):
+    with pytest.raises(ValueError, match="Service 'ssm' is listed more than once"):
+        pulumi.runtime.test(lambda: VpcEndpointSet(
+            "core", aws.ec2.Vpc("core-vpc", cidr_block="10.0.0.0/16"), ["ssm", "com.amazonaws.us-east-2.ssm"],
+            allowed_subnets=[]))()
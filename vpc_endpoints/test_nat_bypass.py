@@ -0,0 +1,55 @@
+import pulumi
+import pulumi_aws as aws
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers
+from vpc_endpoints.nat_bypass import NatBypassEndpoints, plan_nat_bypass
+
+TABLES = {"us-east-2a": "rtb-a", "us-east-2b": "rtb-b", "us-east-2c": "rtb-c"}
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def test_plan_leaves_tables_covered_by_other_endpoints_alone():
+    plan = plan_nat_bypass(["a", "b", "a", "c"], existing_coverage={"s3": ["b", "z"]})
+
+    assert plan.route_tables == ("a", "b", "c")
+    assert plan.attach == {"s3": ("a", "c"), "dynamodb": ("a", "b", "c")}
+    assert plan.already_covered == {"s3": ("b",), "dynamodb": ()}
+    assert plan.uncovered() == {"s3": (), "dynamodb": ()}
+    assert plan.report().splitlines() == [
+        "NAT bypass: 3 route table(s) egress through NAT",
+        "  s3        attached: a, c; already covered: b",
+        "  dynamodb  attached: a, b, c; already covered: -",
+    ]
+
+
+def test_only_gateway_services_are_accepted():
+    with pytest.raises(ValueError, match=r"Gateway endpoints only exist for .*, got \['ssm'\]"):
+        plan_nat_bypass(["a"], services=["s3", "ssm"])
+
+
+def test_endpoints_attach_to_the_nat_route_tables(mocks):
+    @pulumi.runtime.test
+    def build():
+        vpc = aws.ec2.Vpc("core-vpc", cidr_block="10.0.0.0/16")
+        bypass = NatBypassEndpoints("core", vpc, TABLES, existing_coverage={"dynamodb": list(TABLES)},
+                                    endpoint_names={"s3": "core-s3-gateway"})
+        assert list(bypass.endpoints) == ["s3"]
+        return bypass.endpoints["s3"].endpoint.id.apply(lambda _: check())
+
+    def check():
+        [(name, inputs)] = [(r.name, r.inputs) for r in mocks.resources if r.typ == "aws:ec2/vpcEndpoint:VpcEndpoint"]
+        assert name == "core-s3-gateway-endpoint"
+        assert inputs["serviceName"] == "com.amazonaws.us-east-2.s3"
+        assert inputs["vpcEndpointType"] == "Gateway"
+        assert inputs["routeTableIds"] == ["rtb-a", "rtb-b", "rtb-c"]
+
+    build()
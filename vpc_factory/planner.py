@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from vpc_subnet.ipam import SubnetPlan, find_overlaps, plan_subnets
+from vpc_acl.rule_compiler import NaclRule, compile_rules
+from vpc_nat.placement import plan_nat_placement
+from vpc_subnet.routing import ROUTE_TABLE_MODES, plan_route_tables
+
+NAT_MODES = ("per_az", "single", "spread", "none")
+ENDPOINT_TYPES = ("Gateway", "Interface")
+DEFAULT_PREFIX_LENGTHS = {"public": 24, "private": 20}
+# VpcSubnets always builds the private tier
+REQUIRED_TIERS = ("private",)
+
+
+@dataclass(frozen=True)
+class VpcPlan:
+    name: str
+    cidr_block: str
+    azs: Tuple[str, ...]
+    subnet_plan: SubnetPlan
+    nat_mode: str = "per_az"
+    nat_count: Optional[int] = None
+    nat_azs: Tuple[str, ...] = ()
+    route_table_mode: str = "per_az"
+    # tier -> compiled rules; inline tiers emit the rules on the NetworkAcl
+    acl_rules: Dict[str, List[NaclRule]] = field(default_factory=dict)
+    inline_acl_tiers: Tuple[str, ...] = ()
+    endpoints: Tuple[Dict[str, str], ...] = ()
+    enable_dns_support: bool = True
+    enable_dns_hostnames: bool = True
+    tags: Dict[str, str] = field(default_factory=dict)
+
+
+def normalize_spec(definitions: Any) -> List[Dict[str, Any]]:
+    # subnetDefinitions: {"defaults": {...}, "vpcs": [{"name": ..., "cidr_block": ..., ...}, ...]}
+    if not isinstance(definitions, dict) or not isinstance(definitions.get("vpcs"), list):
+        raise ValueError("subnetDefinitions must be a mapping with a 'vpcs' list")
+
+    defaults = definitions.get("defaults", {})
+    specs = []
+    for vpc in definitions["vpcs"]:
+        spec = {**defaults, **vpc, "tags": {**defaults.get("tags", {}), **vpc.get("tags", {})}}
+        for required in ("name", "cidr_block", "azs"):
+            if not spec.get(required):
+                raise ValueError(f"VPC definition {vpc.get('name', vpc)!r} is missing '{required}'")
+        specs.append(spec)
+
+    names = [spec["name"] for spec in specs]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate VPC names in subnetDefinitions: {duplicates}")
+    return specs
+
+
+def plan_vpc(spec: Dict[str, Any]) -> VpcPlan:
+    name = spec["name"]
+    tiers = spec.get("tiers", DEFAULT_PREFIX_LENGTHS)
+    missing = [tier for tier in REQUIRED_TIERS if tier not in tiers]
+    if missing:
+        raise ValueError(f"VPC '{name}': tiers must include {missing}")
+    nat_mode = spec.get("nat", "per_az" if "public" in tiers else "none")
+    if nat_mode not in NAT_MODES:
+        raise ValueError(f"VPC '{name}': nat must be one of {NAT_MODES}, got {nat_mode!r}")
+    if nat_mode != "none" and "public" not in tiers:
+        raise ValueError(f"VPC '{name}': NAT gateways need a public tier")
+    nat_azs = ()
+    if nat_mode != "none":
+        nat_azs = plan_nat_placement(spec["azs"], spec["azs"], nat_mode, spec.get("nat_count")).nat_azs
+
+    route_table_mode = spec.get("route_tables", "per_az")
+    if route_table_mode not in ROUTE_TABLE_MODES:
+        raise ValueError(f"VPC '{name}': route_tables must be one of {ROUTE_TABLE_MODES}, got {route_table_mode!r}")
+    plan_route_tables(spec["azs"], route_table_mode, nat_azs)
+
+    acl_rules = {}
+    inline_acl_tiers = []
+    for tier, acl in spec.get("acls", {}).items():
+        if tier not in tiers:
+            raise ValueError(f"VPC '{name}': ACL for unknown tier '{tier}'")
+        acl_rules[tier] = compile_rules(acl["rules"], auto_number=acl.get("auto_number"))
+        if acl.get("inline", False):
+            inline_acl_tiers.append(tier)
+
+    endpoints = []
+    for endpoint in spec.get("endpoints", []):
+        endpoint_type = endpoint.get("type", "Interface").title()
+        if endpoint_type not in ENDPOINT_TYPES:
+            raise ValueError(f"VPC '{name}': endpoint type must be one of {ENDPOINT_TYPES}")
+        service = endpoint["service"]
+        short_name = service.split(".", 3)[-1] if service.startswith("com.amazonaws.") else service
+        endpoints.append({"name": endpoint.get("name", short_name.replace(".", "-")),
+                          "service": f"com.amazonaws.__REGION__.{short_name}", "type": endpoint_type})
+
+    return VpcPlan(
+        name=name,
+        cidr_block=spec["cidr_block"],
+        azs=tuple(spec["azs"]),
+        subnet_plan=plan_subnets(spec["cidr_block"], spec["azs"], tiers, spec.get("reserved", ())),
+        nat_mode=nat_mode,
+        nat_count=spec.get("nat_count"),
+        nat_azs=nat_azs,
+        route_table_mode=route_table_mode,
+        acl_rules=acl_rules,
+        inline_acl_tiers=tuple(inline_acl_tiers),
+        endpoints=tuple(endpoints),
+        enable_dns_support=spec.get("enable_dns_support", True),
+        enable_dns_hostnames=spec.get("enable_dns_hostnames", True),
+        tags=dict(spec.get("tags", {})),
+    )
+
+
+def plan_vpcs(definitions: Any, allow_overlapping_vpcs: bool = True) -> List[VpcPlan]:
+    # Planned in-process: each VPC takes well under a millisecond, and worker
+    # processes must not be forked from a running Pulumi program
+    specs = normalize_spec(definitions)
+
+    if not allow_overlapping_vpcs:
+        overlaps = find_overlaps(spec["cidr_block"] for spec in specs)
+        if overlaps:
+            raise ValueError("Overlapping VPCs: " + ", ".join(f"{a} <> {b}" for a, b in overlaps))
+
+    return [plan_vpc(spec) for spec in specs]
@@ -0,0 +1,68 @@
+import pytest
+
+from vpc_factory.planner import normalize_spec, plan_vpc, plan_vpcs
+
+AZS = ["us-east-2a", "us-east-2b", "us-east-2c"]
+
+
+def definitions(*vpcs, **defaults):
+    return {"defaults": {"azs": AZS, **defaults}, "vpcs": list(vpcs)}
+
+
+def test_defaults_merge_into_each_vpc():
+    [app] = normalize_spec(definitions({"name": "app", "cidr_block": "10.0.0.0/16", "tags": {"Team": "a"}},
+                                       tags={"Environment": "dev"}))
+    assert app["azs"] == AZS
+    assert app["tags"] == {"Environment": "dev", "Team": "a"}
+
+
+def test_plan_covers_subnets_nat_and_endpoints():
+    plan = plan_vpc({"name": "app", "cidr_block": "10.0.0.0/16", "azs": AZS, "nat": "single",
+                     "endpoints": [{"service": "com.amazonaws.us-east-2.s3", "type": "gateway"}, {"service": "ssm"}]})
+
+    assert plan.subnet_plan.cidrs("private")[0] == "10.0.0.0/20"
+    assert plan.nat_azs == ("us-east-2a",)
+    assert plan.endpoints == (
+        {"name": "s3", "service": "com.amazonaws.__REGION__.s3", "type": "Gateway"},
+        {"name": "ssm", "service": "com.amazonaws.__REGION__.ssm", "type": "Interface"},
+    )
+
+
+def test_private_tier_is_required():
+    with pytest.raises(ValueError, match=r"VPC 'edge': tiers must include \['private'\]"):
+        plan_vpc({"name": "edge", "cidr_block": "10.0.0.0/16", "azs": AZS, "tiers": {"public": 24}})
+
+
+def test_exhausted_vpc_cidr_raises():
+    with pytest.raises(ValueError, match="No free /24 left in 10.0.0.0/24"):
+        plan_vpc({"name": "tiny", "cidr_block": "10.0.0.0/24", "azs": AZS, "tiers": {"private": 24}})
+
+
+def test_overlapping_vpcs_raise_when_not_allowed():
+    spec = definitions({"name": "a", "cidr_block": "10.0.0.0/16"}, {"name": "b", "cidr_block": "10.0.128.0/17"})
+
+    assert [plan.name for plan in plan_vpcs(spec)] == ["a", "b"]
+    with pytest.raises(ValueError, match="Overlapping VPCs: 10.0.0.0/16 <> 10.0.128.0/17"):
+        plan_vpcs(spec, allow_overlapping_vpcs=False)
+
+
+@pytest.mark.parametrize("vpc, message", [
+    ({"name": "a", "cidr_block": "10.0.0.0/16", "nat": "many"}, "nat must be one of"),
+    ({"name": "a", "cidr_block": "10.0.0.0/16", "tiers": {"private": 20}, "nat": "single"}, "need a public tier"),
+    ({"name": "a", "cidr_block": "10.0.0.0/16", "route_tables": "per_vpc"}, "route_tables must be one of"),
+    ({"name": "a", "cidr_block": "10.0.0.0/16", "acls": {"isolated": {"rules": {}}}}, "ACL for unknown tier"),
+    ({"name": "a"}, "is missing 'cidr_block'"),
+])
+def test_invalid_definitions_raise(vpc, message):
+    with pytest.raises(ValueError, match=message):
+        plan_vpcs(definitions(vpc))
+
+
+def test_duplicate_names_raise():
+    with pytest.raises(ValueError, match=r"Duplicate VPC names in subnetDefinitions: \['a'\]"):
+        plan_vpcs(definitions({"name": "a", "cidr_block": "10.0.0.0/16"}, {"name": "a", "cidr_block": "10.1.0.0/16"}))
+
+
+def test_planning_is_deterministic():
+    spec = definitions(*({"name": f"vpc-{i}", "cidr_block": f"10.{i}.0.0/16"} for i in range(50)), nat="spread")
+    assert plan_vpcs(spec) == plan_vpcs(spec)
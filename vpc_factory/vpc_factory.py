@@ -0,0 +1,102 @@
+import pulumi
+from typing import Any, Dict, List, Optional
+
+from vpc.vpc import VpcOnly
+from vpc_subnet.subnets import VpcSubnets
+from vpc_nat.natgw import NatGateway
+from vpc_acl.acl import VpcAcl
+from vpc_endpoints.endpoint import VpcEndpoint, VpcEndpointSet
+from vpc_factory.planner import VpcPlan, plan_vpcs
+
+
+class VpcEnvironment(pulumi.ComponentResource):
+    # Groups one planned VPC and everything built for it under a single component
+    def __init__(self, plan: VpcPlan, opts: Optional[pulumi.ResourceOptions] = None):
+        name = plan.name
+        super().__init__('custom:aws:VpcEnvironment', name, None, opts)
+        self.plan = plan
+        child_opts = pulumi.ResourceOptions(parent=self)
+
+        self.vpc = VpcOnly(name,
+            cidr_block=plan.cidr_block,
+            enable_dns_support=plan.enable_dns_support,
+            enable_dns_hostnames=plan.enable_dns_hostnames,
+            tags=plan.tags,
+            opts=child_opts
+        )
+
+        self.subnets = VpcSubnets(f"{name}-network",
+            vpc_id=self.vpc.vpc.id,
+            azs=list(plan.azs),
+            subnet_plan=plan.subnet_plan,
+            route_table_mode=plan.route_table_mode,
+            nat_azs=list(plan.nat_azs),
+            tags=plan.tags,
+            opts=child_opts
+        )
+
+        self.nat = None
+        if plan.nat_mode != "none":
+            self.nat = NatGateway(f"{name}-nat",
+                public_subnet_ids_by_az=self.subnets.public_subnet_ids_by_az,
+                private_route_table_ids_by_az=self.subnets.private_route_table_ids_by_az,
+                mode=plan.nat_mode,
+                nat_count=plan.nat_count,
+                # A shared private route table spans AZs by design
+                allow_cross_az=True if plan.route_table_mode != "per_az" else None,
+                tags=plan.tags,
+                opts=child_opts
+            )
+
+        subnet_ids_by_tier = {
+            "public": self.subnets.public_subnet_ids,
+            "private": self.subnets.private_subnet_ids,
+            "isolated": self.subnets.isolated_subnet_ids,
+        }
+        self.acls = {}
+        for tier, rules in plan.acl_rules.items():
+            self.acls[tier] = VpcAcl(f"{name}-{tier}-acl",
+                vpc=self.vpc.vpc,
+                subnets={f"subnet-{i}": {"id": subnet} for i, subnet in enumerate(subnet_ids_by_tier[tier])},
+                rules={},
+                compiled_rules=rules,
+                inline_rules=tier in plan.inline_acl_tiers,
+                tags=plan.tags,
+                opts=child_opts
+            )
+
+        self.endpoints = {}
+        for endpoint in plan.endpoints:
+            if endpoint["type"] == "Gateway":
+                self.endpoints[endpoint["name"]] = VpcEndpoint(f"{name}-{endpoint['name']}",
+                    vpc=self.vpc.vpc,
+                    endpoint_service=endpoint["service"],
+                    endpoint_type=endpoint["type"],
+                    gateway_route_tables=self.subnets.private_route_table_ids,
+                    tags=plan.tags,
+                    opts=child_opts
+                )
+
+        # Interface endpoints share one security group and one region lookup
+        interface_services = [e["service"] for e in plan.endpoints if e["type"] == "Interface"]
+        self.interface_endpoints = None
+        if interface_services:
+            self.interface_endpoints = VpcEndpointSet(f"{name}-interface-endpoints",
+                vpc=self.vpc.vpc,
+                services=interface_services,
+                allowed_subnets=self.subnets.private_subnet_ids,
+                tags=plan.tags,
+                opts=child_opts
+            )
+
+        self.register_outputs({
+            "vpc_id": self.vpc.vpc.id,
+            "private_subnet_ids": self.subnets.private_subnet_ids,
+            "public_subnet_ids": self.subnets.public_subnet_ids,
+        })
+
+
+def build_vpcs(definitions: Any, opts: Optional[pulumi.ResourceOptions] = None) -> Dict[str, VpcEnvironment]:
+    # All CIDR math and rule compilation happens up front, before any registration
+    plans: List[VpcPlan] = plan_vpcs(definitions)
+    return {plan.name: VpcEnvironment(plan, opts=opts) for plan in plans}
@@ -0,0 +1,171 @@
+import pulumi
+import pulumi_aws as aws
+from typing import Any, Dict, List, Optional
+from kms.policy import PolicyDocument, statement
+from invoke_cache.invoke_cache import get_caller_identity_output, get_partition_output, invoke_options
+from tagging.tagging import resource_tags
+
+# Version 5 fields; pkt-* show the original addresses behind NAT gateways and
+# flow-direction/traffic-path tell where traffic entered or left the VPC
+DEFAULT_FIELDS = [
+    "version", "account-id", "interface-id", "srcaddr", "dstaddr", "srcport", "dstport", "protocol",
+    "packets", "bytes", "start", "end", "action", "log-status",
+    "vpc-id", "subnet-id", "instance-id", "az-id", "tcp-flags", "type",
+    "pkt-srcaddr", "pkt-dstaddr", "pkt-src-aws-service", "pkt-dst-aws-service",
+    "flow-direction", "traffic-path",
+]
+TRAFFIC_TYPES = ("ACCEPT", "REJECT", "ALL")
+AGGREGATION_INTERVALS = (60, 600)
+
+
+def log_format(fields: List[str]) -> str:
+    if not fields:
+        raise ValueError("Flow logs need at least one field")
+    return " ".join(f"${{{field}}}" for field in fields)
+
+
+class VpcFlowLogs(pulumi.ComponentResource):
+    # Flow logs delivered to S3 as Parquet with hourly, Hive-compatible
+    # partitions (aws-account-id=/aws-service=/aws-region=/year=/month=/day=/hour=),
+    # so Athena can prune by partition instead of scanning text logs.
+    def __init__(self,
+                 name: str,
+                 vpc_id: Optional[pulumi.Input[str]] = None,  # VPC-wide flow log, if set
+                 subnet_ids: Optional[Dict[str, pulumi.Input[str]]] = None,  # e.g. VpcSubnets.subnet_ids_by_key
+                 eni_ids: Optional[Dict[str, pulumi.Input[str]]] = None,
+                 subnet_overrides: Optional[Dict[str, Dict[str, Any]]] = None,  # key -> {"fields", "traffic_type", "max_aggregation_interval"}
+                 eni_overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                 destination_bucket_arn: Optional[pulumi.Input[str]] = None,  # created when omitted
+                 kms_key_arn: Optional[pulumi.Input[str]] = None,  # SSE-KMS for the created bucket
+                 fields: Optional[List[str]] = None,
+                 traffic_type: str = "ALL",
+                 max_aggregation_interval: int = 600,
+                 log_prefix: Optional[str] = None,
+                 tags: Optional[Dict[str, str]] = None,
+                 opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__('custom:aws:VpcFlowLogs', name, None, opts)
+
+        self.flow_logs = {}
+        self.bucket = None
+
+        if destination_bucket_arn is None:
+            self.bucket = self._create_bucket(name, kms_key_arn, tags)
+            destination_bucket_arn = self.bucket.arn
+        self.destination_bucket_arn = destination_bucket_arn
+
+        defaults = {
+            "fields": fields or DEFAULT_FIELDS,
+            "traffic_type": traffic_type,
+            "max_aggregation_interval": max_aggregation_interval,
+        }
+
+        if vpc_id is not None:
+            self._create_flow_log(f"{name}-vpc", {"vpc_id": vpc_id}, defaults, log_prefix, tags)
+
+        # Subnets and ENIs only get their own flow log when their settings differ from the VPC's
+        for kind, ids, overrides in (("subnet", subnet_ids or {}, subnet_overrides or {}),
+                                     ("eni", eni_ids or {}, eni_overrides or {})):
+            unknown = set(overrides) - set(ids)
+            if unknown:
+                raise ValueError(f"Flow log overrides for unknown {kind}s: {sorted(unknown)}")
+            for key, override in overrides.items():
+                target = {"subnet_id" if kind == "subnet" else "eni_id": ids[key]}
+                self._create_flow_log(f"{name}-{kind}-{key}", target, {**defaults, **override}, log_prefix, tags)
+
+        self.register_outputs({
+            "destination_bucket_arn": self.destination_bucket_arn,
+            "flow_log_ids": {key: flow_log.id for key, flow_log in self.flow_logs.items()},
+        })
+
+    def _create_flow_log(self, resource_name, target, settings, log_prefix, tags):
+        unknown = set(settings) - {"fields", "traffic_type", "max_aggregation_interval"}
+        if unknown:
+            raise ValueError(f"{resource_name}: unsupported flow log settings {sorted(unknown)}")
+        if settings["traffic_type"] not in TRAFFIC_TYPES:
+            raise ValueError(f"{resource_name}: traffic_type must be one of {TRAFFIC_TYPES}")
+        if settings["max_aggregation_interval"] not in AGGREGATION_INTERVALS:
+            raise ValueError(f"{resource_name}: max_aggregation_interval must be one of {AGGREGATION_INTERVALS}")
+
+        destination = self.destination_bucket_arn
+        if log_prefix:
+            destination = pulumi.Output.concat(destination, "/", log_prefix.strip("/"), "/")
+
+        self.flow_logs[resource_name] = aws.ec2.FlowLog(resource_name,
+            log_destination_type="s3",
+            log_destination=destination,
+            log_format=log_format(settings["fields"]),
+            traffic_type=settings["traffic_type"],
+            max_aggregation_interval=settings["max_aggregation_interval"],
+            destination_options=aws.ec2.FlowLogDestinationOptionsArgs(
+                file_format="parquet",
+                hive_compatible_partitions=True,
+                per_hour_partition=True,
+            ),
+            tags=resource_tags(tags, resource_name),
+            opts=pulumi.ResourceOptions(parent=self),
+            **target
+        )
+
+    def _create_bucket(self, name, kms_key_arn, tags):
+        bucket = aws.s3.BucketV2(f"{name}-bucket",
+            bucket_prefix=f"{name[:36]}-",
+            tags=resource_tags(tags, f"{name}-bucket"),
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        aws.s3.BucketPublicAccessBlock(f"{name}-bucket-public-access",
+            bucket=bucket.id,
+            block_public_acls=True,
+            block_public_policy=True,
+            ignore_public_acls=True,
+            restrict_public_buckets=True,
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        aws.s3.BucketServerSideEncryptionConfigurationV2(f"{name}-bucket-encryption",
+            bucket=bucket.id,
+            rules=[aws.s3.BucketServerSideEncryptionConfigurationV2RuleArgs(
+                apply_server_side_encryption_by_default=aws.s3.BucketServerSideEncryptionConfigurationV2RuleApplyServerSideEncryptionByDefaultArgs(
+                    sse_algorithm="aws:kms" if kms_key_arn is not None else "AES256",
+                    kms_master_key_id=kms_key_arn,
+                ),
+                bucket_key_enabled=kms_key_arn is not None,
+            )],
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+
+        # Non-blocking lookups: they resolve together with the bucket ARN
+        identity = get_caller_identity_output(invoke_options(self))
+        partition = get_partition_output(invoke_options(self))
+
+        def delivery_policy(bucket_arn, account_id, partition_name):
+            source_conditions = [
+                {"test": "StringEquals", "variable": "aws:SourceAccount", "values": [account_id]},
+                {"test": "ArnLike", "variable": "aws:SourceArn", "values": [f"arn:{partition_name}:logs:*:{account_id}:*"]},
+            ]
+            document = PolicyDocument()
+            document.add(statement(
+                sid="AWSLogDeliveryWrite",
+                actions=["s3:PutObject"],
+                resources=[f"{bucket_arn}/*"],
+                principals={"Service": ["delivery.logs.amazonaws.com"]},
+                conditions=source_conditions + [
+                    {"test": "StringEquals", "variable": "s3:x-amz-acl", "values": ["bucket-owner-full-control"]}
+                ]
+            ))
+            document.add(statement(
+                sid="AWSLogDeliveryAclCheck",
+                actions=["s3:GetBucketAcl", "s3:ListBucket"],
+                resources=[bucket_arn],
+                principals={"Service": ["delivery.logs.amazonaws.com"]},
+                conditions=source_conditions
+            ))
+            return document.to_json()
+
+        aws.s3.BucketPolicy(f"{name}-bucket-policy",
+            bucket=bucket.id,
+            policy=pulumi.Output.all(bucket.arn, identity.account_id, partition.partition).apply(
+                lambda values: delivery_policy(*values)),
+            opts=pulumi.ResourceOptions(parent=self)
+        )
+        return bucket
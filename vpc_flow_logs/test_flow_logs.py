@@ -0,0 +1,68 @@
+import json
+
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from regions.providers import clear_providers
+from vpc_flow_logs.flow_logs import DEFAULT_FIELDS, VpcFlowLogs, log_format
+
+SUBNETS = {"private-us-east-2a": "subnet-a", "private-us-east-2b": "subnet-b"}
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    clear_providers()
+    return set_aws_mocks(AwsMocks())
+
+
+def registered(mocks, typ):
+    return {r.name: r.inputs for r in mocks.resources if r.typ == typ}
+
+
+def test_log_format_lists_the_fields_in_order():
+    assert log_format(["srcaddr", "pkt-srcaddr"]) == "${srcaddr} ${pkt-srcaddr}"
+    assert log_format(DEFAULT_FIELDS).startswith("${version} ${account-id} ")
+    with pytest.raises(ValueError, match="at least one field"):
+        log_format([])
+
+
+def test_only_overridden_subnets_get_their_own_flow_log(mocks):
+    @pulumi.runtime.test
+    def build():
+        logs = VpcFlowLogs("app", vpc_id="vpc-1", subnet_ids=SUBNETS, log_prefix="/vpc/",
+                           subnet_overrides={"private-us-east-2b": {"traffic_type": "REJECT", "fields": ["srcaddr"],
+                                                                    "max_aggregation_interval": 60}})
+        assert list(logs.flow_logs) == ["app-vpc", "app-subnet-private-us-east-2b"]
+        return pulumi.Output.all(*[f.id for f in logs.flow_logs.values()], logs.bucket.policy).apply(lambda _: check())
+
+    def check():
+        flow_logs = registered(mocks, "aws:ec2/flowLog:FlowLog")
+        vpc, subnet = flow_logs["app-vpc"], flow_logs["app-subnet-private-us-east-2b"]
+        assert (vpc["vpcId"], vpc["trafficType"], vpc["maxAggregationInterval"]) == ("vpc-1", "ALL", 600)
+        assert vpc["logFormat"] == log_format(DEFAULT_FIELDS)
+        assert (subnet["subnetId"], subnet["trafficType"], subnet["logFormat"]) == ("subnet-b", "REJECT", "${srcaddr}")
+        assert subnet["maxAggregationInterval"] == 60
+        assert vpc["logDestination"].endswith(":bucketv2/app-bucket-id/vpc/")
+        assert vpc["destinationOptions"] == {"fileFormat": "parquet", "hiveCompatiblePartitions": True,
+                                             "perHourPartition": True}
+        [policy] = registered(mocks, "aws:s3/bucketPolicy:BucketPolicy").values()
+        write, acl_check = json.loads(policy["policy"])["Statement"]
+        assert write["Sid"] == "AWSLogDeliveryWrite" and acl_check["Sid"] == "AWSLogDeliveryAclCheck"
+
+    build()
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"subnet_overrides": {"public-us-east-2a": {}}}, r"overrides for unknown subnets: \['public-us-east-2a'\]"),
+    ({"subnet_overrides": {"private-us-east-2a": {"format": "text"}}}, r"unsupported flow log settings \['format'\]"),
+    ({"subnet_overrides": {"private-us-east-2a": {"traffic_type": "DENY"}}}, "traffic_type must be one of"),
+    ({"max_aggregation_interval": 300}, "max_aggregation_interval must be one of"),
+    ({"eni_overrides": {"eni-1": {}}}, r"overrides for unknown enis: \['eni-1'\]"),
+])
+def test_invalid_settings_raise(mocks, kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        pulumi.runtime.test(lambda: VpcFlowLogs("app", vpc_id="vpc-1", subnet_ids=SUBNETS,
+                                                destination_bucket_arn="arn:aws:s3:::logs", **kwargs))()
@@ -1,32 +1,57 @@
 import pulumi
 import pulumi_aws as aws
 from typing import List, Dict, Optional
+from vpc_nat.placement import plan_nat_placement, validate_az_affinity
+from tagging.tagging import resource_tags
 
 class NatGateway(pulumi.ComponentResource):
     def __init__(self,
                  name: str,
-                 public_subnet_ids: List[str],
-                 private_route_table_ids: List[str],
+                 public_subnet_ids: Optional[List[str]] = None,
+                 private_route_table_ids: Optional[List[str]] = None,
+                 public_subnet_ids_by_az: Optional[Dict[str, str]] = None,
+                 private_route_table_ids_by_az: Optional[Dict[str, str]] = None,
+                 mode: str = "per_az",  # per_az, single or spread
+                 nat_count: Optional[int] = None,  # spread mode: number of NAT gateways
+                 nat_azs: Optional[List[str]] = None,  # explicit NAT AZs for single/spread modes
+                 allow_cross_az: Optional[bool] = None,  # defaults to False in per_az mode
                  tags: Optional[Dict[str, str]] = None,
                  opts: Optional[pulumi.ResourceOptions] = None):
         super().__init__('custom:aws:NatGateway', name, None, opts)
 
-        if len(public_subnet_ids) != len(private_route_table_ids):
-            raise ValueError("Length of public_subnet_ids and private_route_table_ids must match (1:1 mapping)")
-
         self.eips = []
         self.nat_gateways = []
+        self.nat_gateway_ids_by_az = {}
+        # Route tables this component points at a NAT gateway, keyed by AZ (or position for the list arguments)
+        self.routed_route_table_ids = {}
+        self.placement = None
+
+        if public_subnet_ids_by_az is not None or private_route_table_ids_by_az is not None:
+            self._create_by_az(name, public_subnet_ids_by_az or {}, private_route_table_ids_by_az or {},
+                               mode, nat_count, nat_azs, allow_cross_az, tags)
+        else:
+            self._create_by_position(name, public_subnet_ids or [], private_route_table_ids or [], tags)
+
+        self.register_outputs({
+            "eip_ids": [e.id for e in self.eips],
+            "nat_gateway_ids": [n.id for n in self.nat_gateways],
+            "routed_route_table_ids": self.routed_route_table_ids
+        })
+
+    def _create_by_position(self, name, public_subnet_ids, private_route_table_ids, tags):
+        if len(public_subnet_ids) != len(private_route_table_ids):
+            raise ValueError("Length of public_subnet_ids and private_route_table_ids must match (1:1 mapping)")
 
         for i in range(len(public_subnet_ids)):
             eip = aws.ec2.Eip(f"{name}-eip-{i}",
-                tags={**(tags or {}), "Name": f"{name}-eip-{i}"},
+                tags=resource_tags(tags, f"{name}-eip-{i}"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
             natgw = aws.ec2.NatGateway(f"{name}-natgw-{i}",
                 subnet_id=public_subnet_ids[i],
                 allocation_id=eip.id,
-                tags={**(tags or {}), "Name": f"{name}-natgw-{i}"},
+                tags=resource_tags(tags, f"{name}-natgw-{i}"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
@@ -36,11 +61,52 @@ class NatGateway(pulumi.ComponentResource):
                 nat_gateway_id=natgw.id,
                 opts=pulumi.ResourceOptions(parent=self)
             )
+            self.routed_route_table_ids[str(i)] = private_route_table_ids[i]
 
             self.eips.append(eip)
             self.nat_gateways.append(natgw)
 
-        self.register_outputs({
-            "eip_ids": [e.id for e in self.eips],
-            "nat_gateway_ids": [n.id for n in self.nat_gateways]
-        })
+    def _create_by_az(self, name, public_subnet_ids_by_az, private_route_table_ids_by_az,
+                      mode, nat_count, nat_azs, allow_cross_az, tags):
+        self.placement = plan_nat_placement(
+            public_azs=list(public_subnet_ids_by_az),
+            route_table_azs=list(private_route_table_ids_by_az),
+            mode=mode,
+            nat_count=nat_count,
+            nat_azs=nat_azs,
+        )
+        if allow_cross_az is None:
+            allow_cross_az = mode != "per_az"
+        self.cross_az_findings = validate_az_affinity(self.placement, allow_cross_az=allow_cross_az)
+        for finding in self.cross_az_findings:
+            pulumi.log.warn(f"{name}: {finding}", resource=self)
+
+        # Alias the positional names so stacks moving from the list arguments keep their NAT gateways
+        positions = {az: i for i, az in enumerate(public_subnet_ids_by_az)}
+
+        for az in self.placement.nat_azs:
+            eip = aws.ec2.Eip(f"{name}-eip-{az}",
+                tags=resource_tags(tags, f"{name}-eip-{az}"),
+                opts=pulumi.ResourceOptions(parent=self, aliases=[pulumi.Alias(name=f"{name}-eip-{positions[az]}")])
+            )
+
+            natgw = aws.ec2.NatGateway(f"{name}-natgw-{az}",
+                subnet_id=public_subnet_ids_by_az[az],
+                allocation_id=eip.id,
+                tags=resource_tags(tags, f"{name}-natgw-{az}"),
+                opts=pulumi.ResourceOptions(parent=self, aliases=[pulumi.Alias(name=f"{name}-natgw-{positions[az]}")])
+            )
+
+            self.eips.append(eip)
+            self.nat_gateways.append(natgw)
+            self.nat_gateway_ids_by_az[az] = natgw.id
+
+        route_positions = {az: i for i, az in enumerate(private_route_table_ids_by_az)}
+        for rt_az, nat_az in self.placement.routes.items():
+            aws.ec2.Route(f"{name}-nat-route-{rt_az}",
+                route_table_id=private_route_table_ids_by_az[rt_az],
+                destination_cidr_block="0.0.0.0/0",
+                nat_gateway_id=self.nat_gateway_ids_by_az[nat_az],
+                opts=pulumi.ResourceOptions(parent=self, aliases=[pulumi.Alias(name=f"{name}-nat-route-{route_positions[rt_az]}")])
+            )
+            self.routed_route_table_ids[rt_az] = private_route_table_ids_by_az[rt_az]
@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from vpc_subnet.routing import SHARED_ROUTE_TABLE
+
+NAT_MODES = ("per_az", "single", "spread")
+
+
+class NatPlacementError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class NatPlacement:
+    mode: str
+    # AZs that get a NAT gateway, in creation order
+    nat_azs: Tuple[str, ...]
+    # private route table AZ -> AZ of the NAT its default route points at
+    routes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def cross_az_routes(self) -> List[Tuple[str, str]]:
+        return [(rt_az, nat_az) for rt_az, nat_az in self.routes.items() if rt_az != nat_az]
+
+
+def plan_nat_placement(public_azs: Sequence[str],
+                       route_table_azs: Sequence[str],
+                       mode: str = "per_az",
+                       nat_count: Optional[int] = None,
+                       nat_azs: Optional[Sequence[str]] = None) -> NatPlacement:
+    if mode not in NAT_MODES:
+        raise NatPlacementError(f"NAT mode must be one of {NAT_MODES}, got {mode!r}")
+    if not public_azs:
+        raise NatPlacementError("NAT gateways need at least one public subnet")
+
+    if nat_azs:
+        missing = [az for az in nat_azs if az not in public_azs]
+        if missing:
+            raise NatPlacementError(f"No public subnet in NAT AZs {missing}")
+        chosen = list(dict.fromkeys(nat_azs))
+    elif mode == "per_az":
+        # Tables not keyed by an AZ (e.g. a shared private table) only need as many NAT gateways as there are tables
+        chosen = [az for az in public_azs if az in route_table_azs] or list(public_azs)[:len(route_table_azs)] or list(public_azs)
+    elif mode == "single":
+        chosen = [public_azs[0]]
+    else:
+        count = nat_count or 1
+        if count > len(public_azs):
+            raise NatPlacementError(f"Cannot spread {count} NAT gateways over {len(public_azs)} AZs")
+        # Prefer AZs that actually carry private route tables
+        ranked = [az for az in public_azs if az in route_table_azs] + [az for az in public_azs if az not in route_table_azs]
+        chosen = ranked[:count]
+
+    if mode == "single" and len(chosen) != 1:
+        raise NatPlacementError("Single NAT mode takes exactly one NAT AZ")
+    if mode == "spread" and nat_count and len(chosen) != nat_count:
+        raise NatPlacementError(f"Spread mode expected {nat_count} NAT AZs, got {len(chosen)}")
+
+    routes = {}
+    remote = 0
+    for rt_az in route_table_azs:
+        if rt_az in chosen:
+            routes[rt_az] = rt_az
+        elif rt_az == SHARED_ROUTE_TABLE:
+            # A shared private table serves subnets in every AZ, so no NAT is
+            # local to it; it always routes through the first NAT gateway
+            routes[rt_az] = chosen[0]
+        else:
+            # No AZ-local NAT: round-robin over the NAT AZs
+            routes[rt_az] = chosen[remote % len(chosen)]
+            remote += 1
+
+    return NatPlacement(mode=mode, nat_azs=tuple(chosen), routes=routes)
+
+
+def validate_az_affinity(placement: NatPlacement, allow_cross_az: bool = False) -> List[str]:
+    findings = [
+        f"the shared private route table routes every AZ through the NAT gateway in {nat_az}"
+        if rt_az == SHARED_ROUTE_TABLE else
+        f"private route table in {rt_az} routes through the NAT gateway in {nat_az}"
+        for rt_az, nat_az in placement.cross_az_routes
+    ]
+    if findings and not allow_cross_az:
+        if SHARED_ROUTE_TABLE in placement.routes:
+            raise NatPlacementError(
+                "Cross-AZ NAT routing: a shared private route table cannot keep NAT traffic in its AZ. Use "
+                "route_table_mode='per_az' for AZ-local NAT, or mode='single'/'spread' (or allow_cross_az=True) "
+                "to accept " + "; ".join(findings))
+        raise NatPlacementError("Cross-AZ NAT routing: " + "; ".join(findings))
+    return findings
@@ -0,0 +1,69 @@
+import pytest
+
+from vpc_nat.placement import NatPlacementError, plan_nat_placement, validate_az_affinity
+from vpc_subnet.routing import SHARED_ROUTE_TABLE, plan_route_tables
+
+AZS = ("us-east-2a", "us-east-2b", "us-east-2c")
+A, B, C = AZS
+
+
+def test_per_az_keeps_every_route_in_its_az():
+    placement = plan_nat_placement(AZS, AZS)
+
+    assert placement.nat_azs == AZS
+    assert placement.routes == {A: A, B: B, C: C}
+    assert validate_az_affinity(placement) == []
+
+
+def test_per_az_without_a_local_public_subnet_is_cross_az():
+    placement = plan_nat_placement((A, B), AZS)
+
+    assert placement.routes[C] == A
+    with pytest.raises(NatPlacementError, match=f"private route table in {C} routes through the NAT gateway in {A}"):
+        validate_az_affinity(placement)
+
+
+def test_single_routes_everything_through_one_nat():
+    placement = plan_nat_placement(AZS, AZS, mode="single")
+
+    assert placement.nat_azs == (A,)
+    assert placement.routes == {A: A, B: A, C: A}
+    assert len(validate_az_affinity(placement, allow_cross_az=True)) == 2
+    assert plan_nat_placement(AZS, AZS, mode="single", nat_azs=[C]).nat_azs == (C,)
+
+
+def test_spread_prefers_azs_with_route_tables_and_round_robins_the_rest():
+    placement = plan_nat_placement(AZS, (B, C, "us-east-2d"), mode="spread", nat_count=2)
+
+    assert placement.nat_azs == (B, C)
+    assert placement.routes == {B: B, C: C, "us-east-2d": B}
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"mode": "spread", "nat_count": 4}, "Cannot spread 4 NAT gateways over 3 AZs"),
+    ({"mode": "single", "nat_azs": [A, B]}, "exactly one NAT AZ"),
+    ({"nat_azs": ["us-east-2d"]}, r"No public subnet in NAT AZs \['us-east-2d'\]"),
+    ({"mode": "zonal"}, "NAT mode must be one of"),
+])
+def test_invalid_placements_raise(kwargs, message):
+    with pytest.raises(NatPlacementError, match=message):
+        plan_nat_placement(AZS, AZS, **kwargs)
+
+
+def test_shared_route_table_uses_the_first_nat():
+    route_tables = list(dict.fromkeys(plan_route_tables(AZS, "shared").values()))
+    placement = plan_nat_placement(AZS, route_tables)
+
+    assert placement.nat_azs == (A,)
+    assert placement.routes == {SHARED_ROUTE_TABLE: A}
+    assert validate_az_affinity(placement, allow_cross_az=True) == \
+        [f"the shared private route table routes every AZ through the NAT gateway in {A}"]
+    with pytest.raises(NatPlacementError, match="shared private route table cannot keep NAT traffic in its AZ"):
+        validate_az_affinity(placement)
+
+
+def test_nat_az_route_tables_share_the_first_nat():
+    route_tables = list(dict.fromkeys(plan_route_tables(AZS, "nat_az", nat_azs=[B, C]).values()))
+    placement = plan_nat_placement(AZS, route_tables, mode="spread", nat_count=2)
+
+    assert placement.routes == {SHARED_ROUTE_TABLE: B, B: B, C: C}
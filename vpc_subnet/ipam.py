@@ -0,0 +1,251 @@
+import ipaddress
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+TIERS = ("public", "private", "isolated")
+IPV6_SUBNET_PREFIX = 64
+# /64 numbers reserved per tier inside the VPC's IPv6 block (a /56 holds 256),
+# so adding AZs or enabling a tier never renumbers another tier's subnets
+IPV6_TIER_STRIDE = 64
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+class CidrAllocationError(ValueError):
+    pass
+
+
+class IntervalIndex:
+    # Sorted, coalesced [start, end] integer intervals of already-allocated space.
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        i = bisect_right(self._starts, end) - 1
+        return i >= 0 and self._ends[i] >= start
+
+    def add(self, start: int, end: int):
+        if self.overlaps(start, end):
+            raise CidrAllocationError(
+                f"Interval {start}-{end} overlaps an existing allocation")
+
+        i = bisect_right(self._starts, start)
+        merge_left = i > 0 and self._ends[i - 1] + 1 == start
+        merge_right = i < len(self._starts) and self._starts[i] == end + 1
+
+        if merge_left and merge_right:
+            self._ends[i - 1] = self._ends[i]
+            del self._starts[i]
+            del self._ends[i]
+        elif merge_left:
+            self._ends[i - 1] = end
+        elif merge_right:
+            self._starts[i] = start
+        else:
+            self._starts.insert(i, start)
+            self._ends.insert(i, end)
+
+    def first_fit(self, size: int, lo: int, hi: int) -> Optional[int]:
+        # Lowest size-aligned start in [lo, hi] whose block does not overlap anything.
+        candidate = _align_up(lo, size)
+        i = max(bisect_right(self._starts, candidate) - 1, 0)
+
+        while candidate + size - 1 <= hi:
+            while i < len(self._starts) and self._ends[i] < candidate:
+                i += 1
+            if i == len(self._starts) or self._starts[i] > candidate + size - 1:
+                return candidate
+            candidate = _align_up(self._ends[i] + 1, size)
+
+        return None
+
+
+class CidrAllocator:
+    def __init__(self, cidr: str):
+        self.network = ipaddress.ip_network(cidr)
+        self._first = int(self.network.network_address)
+        self._last = int(self.network.broadcast_address)
+        self._index = IntervalIndex()
+        self.allocated: List[Network] = []
+
+    def reserve(self, cidr: str) -> Network:
+        subnet = ipaddress.ip_network(cidr)
+        if subnet.version != self.network.version or not subnet.subnet_of(self.network):
+            raise CidrAllocationError(f"{subnet} is not inside {self.network}")
+
+        start, end = int(subnet.network_address), int(subnet.broadcast_address)
+        if self._index.overlaps(start, end):
+            raise CidrAllocationError(f"{subnet} overlaps an existing allocation in {self.network}")
+
+        self._index.add(start, end)
+        self.allocated.append(subnet)
+        return subnet
+
+    def allocate(self, prefix_length: int) -> Network:
+        if prefix_length < self.network.prefixlen or prefix_length > self.network.max_prefixlen:
+            raise CidrAllocationError(
+                f"Cannot carve a /{prefix_length} out of {self.network}")
+
+        size = 1 << (self.network.max_prefixlen - prefix_length)
+        start = self._index.first_fit(size, self._first, self._last)
+        if start is None:
+            raise CidrAllocationError(
+                f"No free /{prefix_length} left in {self.network}")
+
+        self._index.add(start, start + size - 1)
+        subnet = ipaddress.ip_network((start, prefix_length))
+        self.allocated.append(subnet)
+        return subnet
+
+
+@dataclass(frozen=True)
+class SubnetPlan:
+    vpc_cidr: str
+    azs: Tuple[str, ...]
+    # tier -> az -> cidr
+    subnets: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+    def cidrs(self, tier: str) -> List[str]:
+        by_az = self.subnets.get(tier, {})
+        return [by_az[az] for az in self.azs if az in by_az]
+
+    def all_cidrs(self) -> List[str]:
+        return [cidr for tier in self.subnets for cidr in self.cidrs(tier)]
+
+
+def plan_subnets(vpc_cidr: str,
+                 azs: Sequence[str],
+                 prefix_lengths: Dict[str, int],
+                 reserved: Iterable[str] = ()) -> SubnetPlan:
+    unknown = set(prefix_lengths) - set(TIERS)
+    if unknown:
+        raise CidrAllocationError(f"Unknown subnet tiers: {sorted(unknown)}")
+
+    allocator = CidrAllocator(vpc_cidr)
+    for cidr in reserved:
+        allocator.reserve(cidr)
+
+    # Largest blocks first keeps every block aligned without leaving holes;
+    # ties keep tier then AZ order so the layout is stable between runs.
+    requests = sorted(
+        ((prefix_lengths[tier], TIERS.index(tier), i, tier, az)
+         for tier in prefix_lengths
+         for i, az in enumerate(azs)),
+    )
+
+    subnets: Dict[str, Dict[str, str]] = {tier: {} for tier in TIERS if tier in prefix_lengths}
+    for prefix_length, _, _, tier, az in requests:
+        subnets[tier][az] = str(allocator.allocate(prefix_length))
+
+    return SubnetPlan(vpc_cidr=vpc_cidr, azs=tuple(azs), subnets=subnets)
+
+
+def plan_subnets_from_bases(bases: Dict[str, str],
+                            azs: Sequence[str],
+                            vpc_cidr: Optional[str] = None) -> SubnetPlan:
+    # Legacy layout: each tier starts at its base block and takes the next
+    # same-sized block for every following AZ.
+    subnets: Dict[str, Dict[str, str]] = {}
+    for tier, base in bases.items():
+        network = ipaddress.ip_network(base)
+        subnets[tier] = {
+            az: str(ipaddress.ip_network((int(network.network_address) + i * network.num_addresses,
+                                          network.prefixlen)))
+            for i, az in enumerate(azs)
+        }
+
+    plan = SubnetPlan(vpc_cidr=vpc_cidr or "", azs=tuple(azs), subnets=subnets)
+    validate_plan(plan)
+    return plan
+
+
+def ipv6_subnet_numbers(plan: SubnetPlan, stride: int = IPV6_TIER_STRIDE) -> Dict[str, Dict[str, int]]:
+    # Pure part of the IPv6 layout: tier -> az -> index of the subnet's /64,
+    # known before the VPC's IPv6 block is allocated
+    numbers: Dict[str, Dict[str, int]] = {}
+    for tier_index, tier in enumerate(TIERS):
+        by_az = plan.subnets.get(tier)
+        if not by_az:
+            continue
+        if len(plan.azs) > stride:
+            raise CidrAllocationError(f"At most {stride} AZs fit in the IPv6 range of tier '{tier}'")
+        numbers[tier] = {az: tier_index * stride + i for i, az in enumerate(plan.azs) if az in by_az}
+    return numbers
+
+
+def ipv6_subnet_cidr(ipv6_cidr: str, number: int, prefix_length: int = IPV6_SUBNET_PREFIX) -> str:
+    # The `number`th /prefix_length of the resolved VPC block
+    block = ipaddress.IPv6Network(ipv6_cidr)
+    if block.prefixlen > prefix_length:
+        raise CidrAllocationError(f"{ipv6_cidr} is smaller than a /{prefix_length}")
+    if number >= 1 << (prefix_length - block.prefixlen):
+        raise CidrAllocationError(f"{ipv6_cidr} has no /{prefix_length} number {number}")
+    address = ipaddress.IPv6Address(int(block.network_address) + (number << (128 - prefix_length)))
+    return f"{address}/{prefix_length}"
+
+
+def assign_ipv6_subnets(ipv6_cidr: str,
+                        numbers: Dict[str, Dict[str, int]],
+                        prefix_length: int = IPV6_SUBNET_PREFIX) -> Dict[str, Dict[str, str]]:
+    # tier -> az -> IPv6 CIDR for every subnet at once, from the resolved VPC block
+    return {tier: {az: ipv6_subnet_cidr(ipv6_cidr, number, prefix_length) for az, number in by_az.items()}
+            for tier, by_az in numbers.items()}
+
+
+def validate_plan(plan: SubnetPlan):
+    cidrs = plan.all_cidrs()
+    if plan.vpc_cidr:
+        vpc_network = ipaddress.ip_network(plan.vpc_cidr)
+        outside = [c for c in cidrs if not ipaddress.ip_network(c).subnet_of(vpc_network)]
+        if outside:
+            raise CidrAllocationError(f"Subnets outside {plan.vpc_cidr}: {outside}")
+
+    overlaps = find_overlaps(cidrs)
+    if overlaps:
+        raise CidrAllocationError(
+            "Overlapping subnets: " + ", ".join(f"{a} <> {b}" for a, b in overlaps))
+
+
+def find_overlaps(cidrs: Iterable[str]) -> List[Tuple[str, str]]:
+    # Sort-and-sweep: O(n log n) in the number of blocks.
+    networks = sorted(
+        (ipaddress.ip_network(c) for c in cidrs),
+        key=lambda n: (n.version, int(n.network_address), -n.num_addresses),
+    )
+
+    overlaps = []
+    widest = None
+    for network in networks:
+        if (widest is not None and widest.version == network.version
+                and int(network.network_address) <= int(widest.broadcast_address)):
+            overlaps.append((str(widest), str(network)))
+            if int(network.broadcast_address) > int(widest.broadcast_address):
+                widest = network
+        else:
+            widest = network
+    return overlaps
+
+
+def plan_many(specs: Dict[str, Dict], allow_overlapping_vpcs: bool = True) -> Dict[str, SubnetPlan]:
+    # specs: {vpc_name: {"cidr_block": ..., "azs": [...], "prefix_lengths": {...}, "reserved": [...]}}
+    plans = {
+        name: plan_subnets(spec["cidr_block"], spec["azs"], spec["prefix_lengths"], spec.get("reserved", ()))
+        for name, spec in specs.items()
+    }
+
+    if not allow_overlapping_vpcs:
+        overlaps = find_overlaps(spec["cidr_block"] for spec in specs.values())
+        if overlaps:
+            raise CidrAllocationError(
+                "Overlapping VPCs: " + ", ".join(f"{a} <> {b}" for a, b in overlaps))
+
+    return plans
+
+
+def _align_up(value: int, size: int) -> int:
+    return (value + size - 1) // size * size
@@ -0,0 +1,33 @@
+from typing import Dict, Optional, Sequence
+
+# per_az: one private route table per AZ
+# shared: one private route table for the whole tier
+# nat_az: own tables only in AZs with an AZ-local NAT gateway, the rest share one
+ROUTE_TABLE_MODES = ("per_az", "shared", "nat_az")
+# Key of the shared private route table in the AZ-keyed route table maps
+SHARED_ROUTE_TABLE = "shared"
+
+
+class RouteTablePlanError(ValueError):
+    pass
+
+
+def plan_route_tables(azs: Sequence[str],
+                      mode: str = "per_az",
+                      nat_azs: Optional[Sequence[str]] = None) -> Dict[str, str]:
+    # AZ -> key of the private route table its subnet is associated with. Keys
+    # are AZs for per-AZ tables and SHARED_ROUTE_TABLE for the shared one.
+    if mode not in ROUTE_TABLE_MODES:
+        raise RouteTablePlanError(f"Route table mode must be one of {ROUTE_TABLE_MODES}, got {mode!r}")
+
+    if mode == "per_az":
+        return {az: az for az in azs}
+    if mode == "shared":
+        return {az: SHARED_ROUTE_TABLE for az in azs}
+
+    if nat_azs is None:
+        raise RouteTablePlanError("The nat_az route table mode needs the NAT gateway AZs ('nat_azs')")
+    unknown = [az for az in nat_azs if az not in azs]
+    if unknown:
+        raise RouteTablePlanError(f"NAT AZs {unknown} have no subnets")
+    return {az: az if az in nat_azs else SHARED_ROUTE_TABLE for az in azs}
@@ -1,39 +1,101 @@
 import pulumi
 import pulumi_aws as aws
 from typing import List, Optional, Dict
+from invoke_cache.invoke_cache import get_availability_zones, invoke_options
+from vpc_subnet.ipam import SubnetPlan, ipv6_subnet_cidr, ipv6_subnet_numbers, plan_subnets, plan_subnets_from_bases
+from vpc_subnet.routing import SHARED_ROUTE_TABLE, plan_route_tables
+from tagging.tagging import resource_tags
 
 class VpcSubnets(pulumi.ComponentResource):
     def __init__(self,
                  name: str,
                  vpc_id: str,
-                 cidr_block_public: str,
-                 cidr_block_private: str,
-                 azs: List[str],
+                 cidr_block_public: Optional[str] = None,
+                 cidr_block_private: Optional[str] = None,
+                 azs: Optional[List[str]] = None,  # resolved once per provider/region when omitted
                  create_public_subnets: bool = True,
                  enable_ipv6: bool = False,
                  tags: Optional[Dict[str, str]] = None,
-                 opts: Optional[pulumi.ResourceOptions] = None):
+                 opts: Optional[pulumi.ResourceOptions] = None,
+                 *,
+                 vpc_cidr_block: Optional[str] = None,
+                 subnet_prefix_lengths: Optional[Dict[str, int]] = None,  # e.g. {"public": 24, "private": 20, "isolated": 26}
+                 subnet_plan: Optional[SubnetPlan] = None,  # precomputed layout, skips planning
+                 az_count: int = 3,  # AZs to use when 'azs' is omitted
+                 route_table_mode: str = "per_az",  # per_az, shared or nat_az
+                 nat_azs: Optional[List[str]] = None,  # nat_az mode: AZs that get a NAT gateway
+                 private_main_route_table: bool = False):  # shared mode: make it the VPC's main table, no associations
         super().__init__('custom:aws:VpcSubnets', name, None, opts)
 
+        if subnet_plan is not None:
+            azs = list(subnet_plan.azs)
+        elif azs is None:
+            azs = self.resolve_azs(az_count, invoke_options(self))
+
+        self.subnet_plan = subnet_plan or self.plan(
+            azs=azs,
+            cidr_block_public=cidr_block_public,
+            cidr_block_private=cidr_block_private,
+            vpc_cidr_block=vpc_cidr_block,
+            subnet_prefix_lengths=subnet_prefix_lengths,
+            create_public_subnets=create_public_subnets,
+        )
+        create_public_subnets = create_public_subnets and "public" in self.subnet_plan.subnets
+        public_cidrs = self.subnet_plan.subnets.get("public", {})
+        private_cidrs = self.subnet_plan.subnets["private"]
+        isolated_cidrs = self.subnet_plan.subnets.get("isolated", {})
+
+        # az -> key of the private route table its subnet uses
+        self.private_route_table_keys = plan_route_tables(azs, route_table_mode, nat_azs)
+        if private_main_route_table and route_table_mode != "shared":
+            raise ValueError("'private_main_route_table' needs route_table_mode='shared'.")
+
         self.public_subnet_ids = []
         self.private_subnet_ids = []
+        self.isolated_subnet_ids = []
         self.private_route_table_ids = []
+        # AZ-keyed views of the same resources, e.g. for AZ-affine NAT routing
+        self.public_subnet_ids_by_az = {}
+        self.private_subnet_ids_by_az = {}
+        self.isolated_subnet_ids_by_az = {}
+        # Only the private route tables that exist, keyed by AZ or SHARED_ROUTE_TABLE;
+        # NatGateway and gateway endpoints consume exactly these
+        self.private_route_table_ids_by_az = {}
+        # "{tier}-{az}" -> subnet id, e.g. for per-subnet VpcFlowLogs overrides
+        self.subnet_ids_by_key = {}
 
-        ipv6_cidr_block = None
+        # tier -> az -> /64, each computed by one apply on the VPC's IPv6 block
+        self.ipv6_cidr_blocks = None
+        ipv6_subnet_blocks = {}
         if enable_ipv6:
             ipv6_assoc = aws.ec2.VpcIpv6CidrBlockAssociation(
                 f"{name}-ipv6-assoc",
                 vpc_id=vpc_id,
-                amazon_provided_ipv6_cidr_block=True,
+                assign_generated_ipv6_cidr_block=True,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            ipv6_subnet_blocks = {
+                tier: {
+                    az: ipv6_assoc.ipv6_cidr_block.apply(lambda block, number=number: ipv6_subnet_cidr(block, number))
+                    for az, number in by_az.items()
+                }
+                for tier, by_az in ipv6_subnet_numbers(self.subnet_plan).items()
+            }
+            self.ipv6_cidr_blocks = pulumi.Output.from_input(ipv6_subnet_blocks)
+
+            # IPv6 egress for private subnets bypasses the NAT gateways
+            self.egress_only_igw = aws.ec2.EgressOnlyInternetGateway(
+                f"{name}-eigw",
+                vpc_id=vpc_id,
+                tags=resource_tags(tags, f"{name}-eigw"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
-            ipv6_cidr_block = ipv6_assoc.ipv6_cidr_block
 
         if create_public_subnets:
             self.igw = aws.ec2.InternetGateway(
                 f"{name}-igw",
                 vpc_id=vpc_id,
-                tags={**(tags or {}), "Name": f"{name}-igw"},
+                tags=resource_tags(tags, f"{name}-igw"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
@@ -47,24 +109,57 @@ class VpcSubnets(pulumi.ComponentResource):
                     "ipv6_cidr_block": "::/0",
                     "gateway_id": self.igw.id,
                 }] if enable_ipv6 else []),
-                tags={**(tags or {}), "Name": f"{name}-public-rt"},
+                tags=resource_tags(tags, f"{name}-public-rt"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
-        for i, az in enumerate(azs):
+        private_route_tables = {}
+        for key in dict.fromkeys(self.private_route_table_keys.values()):
+            table_name = f"{name}-private-rt" if key == SHARED_ROUTE_TABLE else f"{name}-private-rt-{key}"
+            private_rt = aws.ec2.RouteTable(
+                table_name,
+                vpc_id=vpc_id,
+                tags=resource_tags(tags, table_name),
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+            private_route_tables[key] = private_rt
+            self.private_route_table_ids.append(private_rt.id)
+            self.private_route_table_ids_by_az[key] = private_rt.id
+
+            if enable_ipv6:
+                aws.ec2.Route(
+                    f"{name}-private-ipv6-route-{key}",
+                    route_table_id=private_rt.id,
+                    destination_ipv6_cidr_block="::/0",
+                    egress_only_gateway_id=self.egress_only_igw.id,
+                    opts=pulumi.ResourceOptions(parent=self)
+                )
+
+        if private_main_route_table:
+            # Subnets without an explicit association use the main route table
+            aws.ec2.MainRouteTableAssociation(
+                f"{name}-private-main-rt",
+                vpc_id=vpc_id,
+                route_table_id=private_route_tables[SHARED_ROUTE_TABLE].id,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+        for az in azs:
             if create_public_subnets:
                 public_subnet = aws.ec2.Subnet(
                     f"{name}-public-subnet-{az}",
                     vpc_id=vpc_id,
-                    cidr_block=self._cidr_offset(cidr_block_public, i),
+                    cidr_block=public_cidrs[az],
                     availability_zone=az,
                     map_public_ip_on_launch=True,
                     assign_ipv6_address_on_creation=enable_ipv6,
-                    ipv6_cidr_block=(f"{ipv6_cidr_block.split('::')[0]}:{i * 10}::/64" if enable_ipv6 else None),
-                    tags={**(tags or {}), "Name": f"{name}-public-{az}"},
+                    ipv6_cidr_block=ipv6_subnet_blocks["public"][az] if enable_ipv6 else None,
+                    tags=resource_tags(tags, f"{name}-public-{az}"),
                     opts=pulumi.ResourceOptions(parent=self)
                 )
                 self.public_subnet_ids.append(public_subnet.id)
+                self.public_subnet_ids_by_az[az] = public_subnet.id
+                self.subnet_ids_by_key[f"public-{az}"] = public_subnet.id
 
                 aws.ec2.RouteTableAssociation(
                     f"{name}-public-rt-assoc-{az}",
@@ -76,38 +171,100 @@ class VpcSubnets(pulumi.ComponentResource):
             private_subnet = aws.ec2.Subnet(
                 f"{name}-private-subnet-{az}",
                 vpc_id=vpc_id,
-                cidr_block=self._cidr_offset(cidr_block_private, i),
+                cidr_block=private_cidrs[az],
                 availability_zone=az,
                 map_public_ip_on_launch=False,
                 assign_ipv6_address_on_creation=enable_ipv6,
-                ipv6_cidr_block=(f"{ipv6_cidr_block.split('::')[0]}:{100 + i * 10}::/64" if enable_ipv6 else None),
-                tags={**(tags or {}), "Name": f"{name}-private-{az}"},
+                ipv6_cidr_block=ipv6_subnet_blocks["private"][az] if enable_ipv6 else None,
+                tags=resource_tags(tags, f"{name}-private-{az}"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
             self.private_subnet_ids.append(private_subnet.id)
+            self.private_subnet_ids_by_az[az] = private_subnet.id
+            self.subnet_ids_by_key[f"private-{az}"] = private_subnet.id
 
-            private_rt = aws.ec2.RouteTable(
-                f"{name}-private-rt-{az}",
+            if not private_main_route_table:
+                aws.ec2.RouteTableAssociation(
+                    f"{name}-private-rt-assoc-{az}",
+                    subnet_id=private_subnet.id,
+                    route_table_id=private_route_tables[self.private_route_table_keys[az]].id,
+                    opts=pulumi.ResourceOptions(parent=self)
+                )
+
+        if isolated_cidrs:
+            # Isolated subnets share a route table without any default route
+            self.isolated_route_table = aws.ec2.RouteTable(
+                f"{name}-isolated-rt",
                 vpc_id=vpc_id,
-                tags={**(tags or {}), "Name": f"{name}-private-rt-{az}"},
+                tags=resource_tags(tags, f"{name}-isolated-rt"),
                 opts=pulumi.ResourceOptions(parent=self)
             )
-            self.private_route_table_ids.append(private_rt.id)
 
-            aws.ec2.RouteTableAssociation(
-                f"{name}-private-rt-assoc-{az}",
-                subnet_id=private_subnet.id,
-                route_table_id=private_rt.id,
-                opts=pulumi.ResourceOptions(parent=self)
-            )
+            for az in azs:
+                isolated_subnet = aws.ec2.Subnet(
+                    f"{name}-isolated-subnet-{az}",
+                    vpc_id=vpc_id,
+                    cidr_block=isolated_cidrs[az],
+                    availability_zone=az,
+                    map_public_ip_on_launch=False,
+                    assign_ipv6_address_on_creation=enable_ipv6,
+                    ipv6_cidr_block=ipv6_subnet_blocks["isolated"][az] if enable_ipv6 else None,
+                    tags=resource_tags(tags, f"{name}-isolated-{az}"),
+                    opts=pulumi.ResourceOptions(parent=self)
+                )
+                self.isolated_subnet_ids.append(isolated_subnet.id)
+                self.isolated_subnet_ids_by_az[az] = isolated_subnet.id
+                self.subnet_ids_by_key[f"isolated-{az}"] = isolated_subnet.id
+
+                aws.ec2.RouteTableAssociation(
+                    f"{name}-isolated-rt-assoc-{az}",
+                    subnet_id=isolated_subnet.id,
+                    route_table_id=self.isolated_route_table.id,
+                    opts=pulumi.ResourceOptions(parent=self)
+                )
 
         self.register_outputs({
             "public_subnet_ids": self.public_subnet_ids,
             "private_subnet_ids": self.private_subnet_ids,
-            "private_route_table_ids": self.private_route_table_ids
+            "isolated_subnet_ids": self.isolated_subnet_ids,
+            "private_route_table_ids": self.private_route_table_ids,
+            "public_subnet_ids_by_az": self.public_subnet_ids_by_az,
+            "private_route_table_ids_by_az": self.private_route_table_ids_by_az,
+            "private_route_table_keys": self.private_route_table_keys,
+            "ipv6_cidr_blocks": self.ipv6_cidr_blocks
         })
 
-    def _cidr_offset(self, base_cidr: str, index: int) -> str:
-        parts = base_cidr.split(".")
-        parts[2] = str(int(parts[2]) + index)
-        return ".".join(parts)
\ No newline at end of file
+    @staticmethod
+    def resolve_azs(az_count: int, opts: Optional[pulumi.InvokeOptions] = None) -> List[str]:
+        # Cached per provider, so every VpcSubnets in a region shares one lookup
+        names = sorted(get_availability_zones(opts).names)
+        if len(names) < az_count:
+            raise ValueError(f"Only {len(names)} availability zones are available, {az_count} requested.")
+        return names[:az_count]
+
+    @staticmethod
+    def plan(azs: List[str],
+             cidr_block_public: Optional[str] = None,
+             cidr_block_private: Optional[str] = None,
+             vpc_cidr_block: Optional[str] = None,
+             subnet_prefix_lengths: Optional[Dict[str, int]] = None,
+             create_public_subnets: bool = True) -> SubnetPlan:
+        # Pure CIDR planning, usable without registering any resources
+        if subnet_prefix_lengths:
+            if not vpc_cidr_block:
+                raise ValueError("'vpc_cidr_block' is required when 'subnet_prefix_lengths' is set.")
+            prefix_lengths = dict(subnet_prefix_lengths)
+            if not create_public_subnets:
+                prefix_lengths.pop("public", None)
+            if "private" not in prefix_lengths:
+                raise ValueError("'subnet_prefix_lengths' must include a 'private' tier.")
+            return plan_subnets(vpc_cidr_block, azs, prefix_lengths)
+
+        if not cidr_block_private or (create_public_subnets and not cidr_block_public):
+            raise ValueError("Either 'subnet_prefix_lengths' with 'vpc_cidr_block', or the "
+                             "'cidr_block_public'/'cidr_block_private' base blocks must be provided.")
+
+        bases = {"private": cidr_block_private}
+        if create_public_subnets:
+            bases["public"] = cidr_block_public
+        return plan_subnets_from_bases(bases, azs, vpc_cidr_block)
\ No newline at end of file
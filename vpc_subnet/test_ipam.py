@@ -0,0 +1,125 @@
+import pytest
+
+from vpc_subnet.ipam import (CidrAllocationError, CidrAllocator, IntervalIndex, assign_ipv6_subnets, find_overlaps,
+                             ipv6_subnet_numbers, plan_many, plan_subnets, plan_subnets_from_bases)
+
+AZS = ["us-east-2a", "us-east-2b", "us-east-2c"]
+
+
+def test_interval_index_coalesces_neighbours():
+    index = IntervalIndex()
+    index.add(0, 9)
+    index.add(20, 29)
+    index.add(10, 19)
+
+    assert len(index) == 1
+    assert index.overlaps(29, 40) and not index.overlaps(30, 40)
+    with pytest.raises(CidrAllocationError, match="overlaps"):
+        index.add(5, 5)
+
+
+def test_first_fit_skips_holes_too_small_or_misaligned():
+    index = IntervalIndex()
+    index.add(0, 3)
+    index.add(12, 15)
+
+    assert index.first_fit(4, 0, 63) == 4
+    assert index.first_fit(8, 0, 63) == 16
+    assert index.first_fit(64, 0, 63) is None
+
+
+def test_allocator_packs_blocks_in_order():
+    allocator = CidrAllocator("10.0.0.0/16")
+    assert str(allocator.allocate(24)) == "10.0.0.0/24"
+    assert str(allocator.allocate(20)) == "10.0.16.0/20"
+    # The /24 left a hole below the /20 that smaller blocks fill first
+    assert str(allocator.allocate(24)) == "10.0.1.0/24"
+
+
+def test_allocator_reserves_and_rejects_overlaps():
+    allocator = CidrAllocator("10.0.0.0/16")
+    allocator.reserve("10.0.0.0/17")
+
+    assert str(allocator.allocate(17)) == "10.0.128.0/17"
+    with pytest.raises(CidrAllocationError, match="overlaps an existing allocation"):
+        allocator.reserve("10.0.200.0/24")
+    with pytest.raises(CidrAllocationError, match="is not inside"):
+        allocator.reserve("10.1.0.0/24")
+
+
+def test_allocator_reports_exhaustion():
+    allocator = CidrAllocator("10.0.0.0/23")
+    allocator.allocate(24)
+    allocator.allocate(24)
+
+    with pytest.raises(CidrAllocationError, match="No free /24 left in 10.0.0.0/23"):
+        allocator.allocate(24)
+    with pytest.raises(CidrAllocationError, match="Cannot carve a /22"):
+        allocator.allocate(22)
+
+
+def test_fragmented_space_still_fits_smaller_blocks():
+    allocator = CidrAllocator("10.0.0.0/22")
+    for cidr in ("10.0.0.0/24", "10.0.2.0/24"):
+        allocator.reserve(cidr)
+
+    with pytest.raises(CidrAllocationError, match="No free /23"):
+        allocator.allocate(23)
+    assert [str(allocator.allocate(24)) for _ in range(2)] == ["10.0.1.0/24", "10.0.3.0/24"]
+
+
+def test_plan_subnets_places_larger_tiers_first():
+    plan = plan_subnets("10.0.0.0/16", AZS, {"public": 24, "private": 20, "isolated": 26})
+
+    assert plan.cidrs("private") == ["10.0.0.0/20", "10.0.16.0/20", "10.0.32.0/20"]
+    assert plan.cidrs("public") == ["10.0.48.0/24", "10.0.49.0/24", "10.0.50.0/24"]
+    assert plan.cidrs("isolated")[0] == "10.0.51.0/26"
+    assert find_overlaps(plan.all_cidrs()) == []
+
+
+def test_plan_subnets_rejects_unknown_tiers():
+    with pytest.raises(CidrAllocationError, match="Unknown subnet tiers"):
+        plan_subnets("10.0.0.0/16", AZS, {"dmz": 24})
+
+
+def test_find_overlaps_reports_nested_and_partial_overlaps():
+    assert find_overlaps(["10.0.0.0/16", "10.0.5.0/24", "10.1.0.0/16", "192.168.0.0/24"]) == \
+        [("10.0.0.0/16", "10.0.5.0/24")]
+    assert find_overlaps(["10.0.0.0/24", "fd00::/64"]) == []
+
+
+def test_legacy_bases_that_overlap_are_rejected():
+    with pytest.raises(CidrAllocationError, match="Overlapping subnets"):
+        plan_subnets_from_bases({"public": "10.0.1.0/24", "private": "10.0.2.0/24"}, AZS)
+    with pytest.raises(CidrAllocationError, match="outside 10.0.0.0/24"):
+        plan_subnets_from_bases({"private": "10.0.0.0/25"}, AZS, "10.0.0.0/24")
+
+
+def test_plan_many_checks_vpc_overlaps_on_request():
+    specs = {
+        "a": {"cidr_block": "10.0.0.0/16", "azs": AZS, "prefix_lengths": {"private": 20}},
+        "b": {"cidr_block": "10.0.0.0/17", "azs": AZS, "prefix_lengths": {"private": 20}},
+    }
+    assert set(plan_many(specs)) == {"a", "b"}
+    with pytest.raises(CidrAllocationError, match="Overlapping VPCs: 10.0.0.0/16 <> 10.0.0.0/17"):
+        plan_many(specs, allow_overlapping_vpcs=False)
+
+
+def test_ipv6_numbers_give_each_tier_its_own_range():
+    numbers = ipv6_subnet_numbers(plan_subnets("10.0.0.0/16", AZS, {"public": 24, "private": 20}))
+    assert numbers == {"public": {"us-east-2a": 0, "us-east-2b": 1, "us-east-2c": 2},
+                       "private": {"us-east-2a": 64, "us-east-2b": 65, "us-east-2c": 66}}
+    with pytest.raises(CidrAllocationError, match="At most 2 AZs fit in the IPv6 range of tier 'public'"):
+        ipv6_subnet_numbers(plan_subnets("10.0.0.0/16", AZS, {"public": 24}), stride=2)
+
+
+def test_ipv6_subnets_are_numbered_64s_of_the_vpc_block():
+    numbers = {"public": {"us-east-2a": 0, "us-east-2b": 1}, "private": {"us-east-2a": 64}}
+    assert assign_ipv6_subnets("2600:1f16:abc:de00::/56", numbers) == {
+        "public": {"us-east-2a": "2600:1f16:abc:de00::/64", "us-east-2b": "2600:1f16:abc:de01::/64"},
+        "private": {"us-east-2a": "2600:1f16:abc:de40::/64"},
+    }
+    with pytest.raises(CidrAllocationError, match="has no /64 number 256"):
+        assign_ipv6_subnets("2600:1f16:abc:de00::/56", {"public": {"us-east-2a": 256}})
+    with pytest.raises(CidrAllocationError, match="smaller than a /64"):
+        assign_ipv6_subnets("2600:1f16:abc:de00::/72", numbers)
@@ -0,0 +1,57 @@
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from vpc_subnet.routing import SHARED_ROUTE_TABLE, RouteTablePlanError, plan_route_tables
+from vpc_subnet.subnets import VpcSubnets
+
+AZS = ("us-east-2a", "us-east-2b", "us-east-2c")
+A, B, C = AZS
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    return set_aws_mocks(AwsMocks())
+
+
+def test_per_az_tables_are_keyed_by_az():
+    assert plan_route_tables(AZS) == {A: A, B: B, C: C}
+
+
+def test_shared_mode_uses_one_table():
+    assert plan_route_tables(AZS, "shared") == {A: SHARED_ROUTE_TABLE, B: SHARED_ROUTE_TABLE, C: SHARED_ROUTE_TABLE}
+
+
+def test_nat_az_mode_shares_a_table_outside_the_nat_azs():
+    assert plan_route_tables(AZS, "nat_az", nat_azs=[B]) == {A: SHARED_ROUTE_TABLE, B: B, C: SHARED_ROUTE_TABLE}
+
+
+@pytest.mark.parametrize("mode, nat_azs, message", [
+    ("per_vpc", None, "Route table mode must be one of"),
+    ("nat_az", None, "needs the NAT gateway AZs"),
+    ("nat_az", ["us-east-2d"], r"NAT AZs \['us-east-2d'\] have no subnets"),
+])
+def test_invalid_route_table_plans_raise(mode, nat_azs, message):
+    with pytest.raises(RouteTablePlanError, match=message):
+        plan_route_tables(AZS, mode, nat_azs=nat_azs)
+
+
+def test_subnets_associate_with_their_planned_tables(mocks):
+    @pulumi.runtime.test
+    def build():
+        subnets = VpcSubnets("app", "vpc-1", azs=list(AZS), vpc_cidr_block="10.0.0.0/16",
+                             subnet_prefix_lengths={"public": 24, "private": 20},
+                             route_table_mode="nat_az", nat_azs=[A])
+        assert list(subnets.private_route_table_ids_by_az) == [A, SHARED_ROUTE_TABLE]
+
+    # Checked once the test runner has waited for every registration
+    build()
+    tables = {r.name for r in mocks.resources if r.typ == "aws:ec2/routeTable:RouteTable"}
+    assert tables == {"app-public-rt", f"app-private-rt-{A}", "app-private-rt"}
+    associations = {r.name: r.inputs["routeTableId"] for r in mocks.resources
+                    if r.typ == "aws:ec2/routeTableAssociation:RouteTableAssociation" and "private" in r.name}
+    assert associations == {f"app-private-rt-assoc-{A}": f"app-private-rt-{A}-id",
+                            f"app-private-rt-assoc-{B}": "app-private-rt-id",
+                            f"app-private-rt-assoc-{C}": "app-private-rt-id"}
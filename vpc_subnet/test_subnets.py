@@ -0,0 +1,53 @@
+import pulumi
+import pytest
+
+from invoke_cache.invoke_cache import invoke_cache
+from mocks.mocks import AwsMocks, set_aws_mocks
+from vpc_subnet.subnets import VpcSubnets
+
+AZS = ["us-east-2a", "us-east-2b"]
+
+
+@pytest.fixture
+def mocks():
+    invoke_cache.clear()
+    return set_aws_mocks(AwsMocks())
+
+
+def subnet_cidrs(mocks):
+    return {r.name: r.inputs["cidrBlock"] for r in mocks.resources if r.typ == "aws:ec2/subnet:Subnet"}
+
+
+def test_positional_arguments_keep_their_original_order(mocks):
+    @pulumi.runtime.test
+    def build():
+        subnets = VpcSubnets("app", "vpc-1", "10.0.1.0/24", "10.0.101.0/24", AZS)
+        return pulumi.Output.all(*subnets.private_subnet_ids).apply(lambda _: check())
+
+    def check():
+        assert subnet_cidrs(mocks) == {
+            "app-public-subnet-us-east-2a": "10.0.1.0/24", "app-public-subnet-us-east-2b": "10.0.2.0/24",
+            "app-private-subnet-us-east-2a": "10.0.101.0/24", "app-private-subnet-us-east-2b": "10.0.102.0/24",
+        }
+
+    build()
+
+
+def test_ipv6_blocks_follow_the_subnet_numbers(mocks):
+    @pulumi.runtime.test
+    def build():
+        subnets = VpcSubnets("app", "vpc-1", azs=AZS, enable_ipv6=True, vpc_cidr_block="10.0.0.0/16",
+                             subnet_prefix_lengths={"public": 24, "private": 20, "isolated": 24})
+        return subnets.ipv6_cidr_blocks.apply(check)
+
+    def check(blocks):
+        assert blocks == {
+            "public": {"us-east-2a": "2600:1f16:abc:de00::/64", "us-east-2b": "2600:1f16:abc:de01::/64"},
+            "private": {"us-east-2a": "2600:1f16:abc:de40::/64", "us-east-2b": "2600:1f16:abc:de41::/64"},
+            "isolated": {"us-east-2a": "2600:1f16:abc:de80::/64", "us-east-2b": "2600:1f16:abc:de81::/64"},
+        }
+
+    build()
+    ipv6 = {r.name: r.inputs["ipv6CidrBlock"] for r in mocks.resources if r.typ == "aws:ec2/subnet:Subnet"}
+    assert ipv6["app-private-subnet-us-east-2b"] == "2600:1f16:abc:de41::/64"
+    assert ipv6["app-isolated-subnet-us-east-2a"] == "2600:1f16:abc:de80::/64"